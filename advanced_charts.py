@@ -1,8 +1,12 @@
+import re
+import weakref
+
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 from decision_terminology import TERMS
+from numeric_parser import parse_numeric
 
 
 class AdvancedCharts:
@@ -42,7 +46,31 @@ class AdvancedCharts:
         return df is not None and all(col in df.columns for col in cols)
 
     def _numeric(self, s):
-        return pd.to_numeric(s, errors="coerce")
+        return parse_numeric(s)
+
+    def _district_rows(self, df, district):
+        """
+        صفوف الحي بنفس نتيجة str.contains(district, case=False) بدون مسح كل الصفوف:
+        مواقع كل قيمة district تُجمع مرة واحدة لكل إطار، والمطابقة على القيم المميزة فقط
+        (إطار المدينة نفسه يُمرر لكل أحيائها، فكل حي بعد الأول قص مباشر)
+        """
+        index = getattr(self, "_district_index", None)
+        if index is None or index["frame"]() is not df:
+            index = {
+                "frame": weakref.ref(df),
+                "groups": df.groupby(df["district"].astype(str), sort=False).indices,
+                "matches": {},
+            }
+            self._district_index = index
+
+        positions = index["matches"].get(district)
+        if positions is None:
+            pattern = re.compile(district, re.IGNORECASE)
+            matched = [rows for name, rows in index["groups"].items() if pattern.search(name)]
+            positions = np.sort(np.concatenate(matched)) if matched else np.array([], dtype=np.intp)
+            index["matches"][district] = positions
+
+        return df.iloc[positions].copy()
     
     def _remove_outliers(self, df, column, quantile=0.99):
         """
@@ -123,25 +151,13 @@ class AdvancedCharts:
             
         df = df.copy()
 
-        # معالجة عمود السعر - إزالة الفواصل العربية والعادية
+        # معالجة عمود السعر - فواصل الآلاف والفاصلة العشرية والأرقام العربية
         if "price" in df.columns:
-            # تحويل إلى نص أولاً
-            df["price"] = df["price"].astype(str)
-            # إزالة الفواصل
-            df["price"] = df["price"].str.replace(",", "", regex=False)
-            df["price"] = df["price"].str.replace("٬", "", regex=False)
-            # تحويل إلى رقم
-            df["price"] = pd.to_numeric(df["price"], errors="coerce")
-
-        # معالجة عمود المساحة - إزالة الفواصل العربية والعادية
+            df["price"] = parse_numeric(df["price"])
+
+        # معالجة عمود المساحة - "619,7" و "17 875,00" تُقرأ كأرقام عشرية
         if "area" in df.columns:
-            # تحويل إلى نص أولاً
-            df["area"] = df["area"].astype(str)
-            # إزالة الفواصل
-            df["area"] = df["area"].str.replace(",", "", regex=False)
-            df["area"] = df["area"].str.replace("٬", "", regex=False)
-            # تحويل إلى رقم
-            df["area"] = pd.to_numeric(df["area"], errors="coerce")
+            df["area"] = parse_numeric(df["area"])
 
         # ✅ التاريخ ميلادي من وزارة العدل - نحتفظ به كنص ثم نحوله عند التحليل الزمني
         if "date" in df.columns:
@@ -251,7 +267,7 @@ class AdvancedCharts:
 
         agg = (
             tmp
-            .groupby(district_col)["price_per_sqm"]
+            .groupby(district_col, observed=True)["price_per_sqm"]
             .mean()
             .sort_values(ascending=False)
             .head(10)
@@ -800,11 +816,9 @@ class AdvancedCharts:
         if not self._has_columns(df, ["price", "area", "district", "date"]):
             return None
 
-        df = df.copy()
-
         # ✅ تعديل رئيسي: استخدام contains بدلاً من المساواة التامة
         # للتعامل مع تنسيق "الرياض / الصفاء"
-        df = df[df["district"].astype(str).str.contains(district, case=False, na=False)]
+        df = self._district_rows(df, district)
 
         if df.empty:
             return None
@@ -876,9 +890,10 @@ class AdvancedCharts:
     # =====================
     # DISTRICT COMPARISON
     # =====================
-    def generate_district_comparison(self, df, districts=None):
+    def district_comparison_table(self, df, districts=None):
         """
-        مقارنة أسعار الأحياء
+        جدول مقارنة الأحياء (district, price_per_sqm) كما يرسمه generate_district_comparison
+        (بدون districts: أشهر 5 أحياء) - يعيد None إذا لم تكفِ البيانات
         """
         if df is None or df.empty:
             return None
@@ -922,13 +937,23 @@ class AdvancedCharts:
             return None
 
         # إعادة حساب المتوسطات بعد الفلترة
-        comparison = (
-            df.groupby("district")["price_per_sqm"]
+        return (
+            df.groupby("district", observed=True)["price_per_sqm"]
             .mean()
             .reset_index()
             .sort_values("price_per_sqm", ascending=False)
         )
 
+    def generate_district_comparison(self, df, districts=None, comparison=None):
+        """
+        مقارنة أسعار الأحياء
+        comparison: جدول district_comparison_table محسوب مسبقاً لنفس df و districts (لا يُعاد حسابه)
+        """
+        if comparison is None:
+            comparison = self.district_comparison_table(df, districts)
+        if comparison is None:
+            return None
+
         fig = px.bar(
             comparison,
             x="district",
@@ -961,10 +986,8 @@ class AdvancedCharts:
         if not self._has_columns(df, ["district", "date"]):
             return None
 
-        df = df.copy()
-        
         # ✅ تعديل رئيسي: استخدام contains بدلاً من المساواة التامة
-        df = df[df["district"].astype(str).str.contains(district, case=False, na=False)]
+        df = self._district_rows(df, district)
 
         if df.empty:
             return None
@@ -1025,10 +1048,8 @@ class AdvancedCharts:
         if "price" not in df.columns or "district" not in df.columns:
             return None
 
-        df = df.copy()
-        
         # ✅ تعديل رئيسي: استخدام contains بدلاً من المساواة التامة
-        df = df[df["district"].astype(str).str.contains(district, case=False, na=False)]
+        df = self._district_rows(df, district)
 
         if df.empty:
             return None
@@ -1039,7 +1060,7 @@ class AdvancedCharts:
         if df.empty:
             return None
 
-        prices = pd.to_numeric(df["price"], errors="coerce")
+        prices = parse_numeric(df["price"])
         
         # التحقق من وجود بيانات صالحة
         if prices.notna().sum() == 0:
@@ -1092,19 +1113,17 @@ class AdvancedCharts:
         if not self._has_columns(df, ["district", "property_type"]):
             return None
 
-        df = df.copy()
-        
         # ✅ تعديل رئيسي: استخدام contains بدلاً من المساواة التامة
-        df = df[df["district"].astype(str).str.contains(district, case=False, na=False)]
+        df = self._district_rows(df, district)
 
         if df.empty:
             return None
 
         # ✅ تعبئة أنواع العقارات الفارغة بقيمة "غير محدد"
-        df["property_type"] = df["property_type"].fillna("غير محدد")
+        df["property_type"] = df["property_type"].astype(object).fillna("غير محدد")
 
         analysis = (
-            df.groupby("property_type")
+            df.groupby("property_type", observed=True)
             .size()
             .reset_index(name="transactions")
         )
@@ -1142,17 +1161,29 @@ class AdvancedCharts:
     # =====================
     # DISTRICT CHARTS ENGINE
     # =====================
-    def generate_all_district_charts(self, df, district, nearby_districts=None):
+    def prepare_market_frame(self, df):
+        """
+        توحيد الأعمدة وتنظيف الأرقام مرة واحدة لبيانات المدينة
+        (يُمرر الناتج لاحقاً مع prepared=True لكل أحياء المدينة)
+        """
+        if df is None or df.empty:
+            return pd.DataFrame()
+        df = self._normalize_market_columns(df)
+        return self._ensure_numeric_core(df)
+
+    def generate_all_district_charts(self, df, district, nearby_districts=None, prepared=False, comparison=None):
         """
         محرك توليد جميع رسومات الحي
         يعيد قاموس يحتوي على كل الرسومات الجاهزة للاستخدام في PDF أو الواجهة
+        prepared: df ناتج prepare_market_frame (لا يُعاد توحيده - حذف القيم المتطرفة لا يتكرر)
+        comparison: جدول مقارنة الأحياء للمدينة محسوب مرة واحدة (مشترك بين كل أحيائها)
         """
         if df is None or df.empty:
             return {}
 
         # توحيد الأعمدة أولاً
-        df = self._normalize_market_columns(df)
-        df = self._ensure_numeric_core(df)
+        if not prepared:
+            df = self.prepare_market_frame(df)
 
         charts = {}
 
@@ -1160,7 +1191,7 @@ class AdvancedCharts:
         charts["price_trend"] = self.generate_district_price_trend(df, district)
 
         # 2️⃣ مقارنة الأحياء
-        charts["district_comparison"] = self.generate_district_comparison(df, nearby_districts)
+        charts["district_comparison"] = self.generate_district_comparison(df, nearby_districts, comparison=comparison)
 
         # 3️⃣ عدد الصفقات عبر الزمن
         charts["transactions_over_time"] = self.generate_district_transactions_over_time(df, district)
@@ -8,6 +8,7 @@
 import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression
+from numeric_parser import parse_numeric
 
 
 REQUIRED_COLUMNS = ["price", "area", "date"]
@@ -80,13 +81,9 @@ def analyze_results(df):
             "message": "التواريخ غير صالحة للتحليل"
         }
 
-    # تحويل المساحة إلى أرقام
-    df["area"] = (
-        df["area"]
-        .astype(str)
-        .str.extract(r"(\d+\.?\d*)")[0]
-        .astype(float)
-    )
+    # تحويل المساحة والسعر إلى أرقام (يدعم "619,7" و "17 875,00" والأرقام العربية)
+    df["area"] = parse_numeric(df["area"])
+    df["price"] = parse_numeric(df["price"])
 
     df = df.dropna(subset=["area", "price"])
     if df.empty:
@@ -9,9 +9,12 @@
 # 5️⃣ التخزين المؤقت للواجهة
 # =========================================
 
+import os
 import json
 import random
 import hashlib
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 import pandas as pd
@@ -19,8 +22,10 @@ import pandas as pd
 # ==============================
 # استيرادات ذاكرة السوق للمقارنة الزمنية
 # ==============================
-from market_memory import load_last_snapshots
-from snapshot_runner import collect_and_store
+from market_memory import (
+    load_last_snapshots, load_last_summaries, histogram_share_below, diff_district_summaries
+)
+from snapshot_runner import collect_and_store, collect_and_store_all
 
 # ==============================
 # 1️⃣ القواعد والثوابت (Alert Rules)
@@ -35,9 +40,17 @@ PROPERTY_TYPES = ["شقة", "فيلا", "أرض"]
 # الحد الأدنى للخصم لاعتبارها فرصة (5% كحد أدنى للظهور)
 MIN_DISCOUNT_PERCENT = 5
 
-# مسار ملف التخزين الدائم
+# تنبيهات الأحياء: أقل عدد صفقات في اللقطة السابقة ليُعتد بتغير الحي،
+# وأقصى عدد تنبيهات لكل نوع (الأقوى أولاً) في كل جولة
+MIN_DISTRICT_COUNT = 10
+MAX_DISTRICT_ALERTS = 5
+
+# مسار ملف التخزين الدائم (النسخة القديمة JSON - تُرحّل تلقائياً إلى قاعدة البيانات)
 ALERTS_FILE = Path("alerts/alerts_db.json")
 
+# قاعدة بيانات التنبيهات المفهرسة (البصمة مفتاح أساسي + فهارس للوقت والمدينة والنوع)
+ALERTS_DB = Path("alerts/alerts.db")
+
 # أنواع التنبيهات
 ALERT_TYPES = {
     "GOLDEN_OPPORTUNITY": "💰 فرصة ذهبية - خصم قوي عن السوق",
@@ -72,8 +85,10 @@ def compute_confidence(score, rules=None):
 # ==============================
 
 def alert_fingerprint(alert):
-    """إنشاء بصمة فريدة للتنبيه بناءً على النوع والمدينة والحي ووقت الحدث"""
-    key = f"{alert.get('type')}-{alert.get('city')}-{alert.get('district', '')}-{alert.get('property_type', '')}"
+    """إنشاء بصمة فريدة للتنبيه بناءً على النوع والنطاق والمدينة والحي ووقت الحدث"""
+    # النطاق يميز تنبيه المدينة الذي يذكر حياً واحداً عن تنبيه الحي نفسه في نفس اليوم
+    scope = (alert.get("signal") or {}).get("scope", "city")
+    key = f"{alert.get('type')}-{scope}-{alert.get('city')}-{alert.get('district', '')}-{alert.get('property_type', '')}"
     # استخدام تاريخ التنبيه نفسه، وليس وقت التنفيذ
     date_str = alert.get("generated_at", datetime.now().strftime("%Y-%m-%d"))[:10]
     return hashlib.md5(f"{key}-{date_str}".encode()).hexdigest()
@@ -129,60 +144,183 @@ def build_human_message(alert):
 
 def ensure_alerts_directory():
     """التأكد من وجود مجلد التنبيهات"""
-    ALERTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    ALERTS_DB.parent.mkdir(parents=True, exist_ok=True)
+
+_ALERTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    fingerprint   TEXT PRIMARY KEY,
+    type          TEXT,
+    city          TEXT,
+    district      TEXT,
+    property_type TEXT,
+    generated_at  TEXT,
+    saved_at      TEXT,
+    payload       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_generated_at ON alerts (generated_at);
+CREATE INDEX IF NOT EXISTS idx_alerts_city ON alerts (city, generated_at);
+CREATE INDEX IF NOT EXISTS idx_alerts_type ON alerts (type, generated_at);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# قواعد البيانات التي تم تجهيز جداولها في هذه العملية
+_initialized_dbs = set()
+
+def _alert_row(alert):
+    return (
+        alert["fingerprint"],
+        alert.get("type"),
+        alert.get("city"),
+        alert.get("district", ""),
+        alert.get("property_type", ""),
+        alert.get("generated_at", ""),
+        alert.get("saved_at"),
+        json.dumps(alert, ensure_ascii=False, default=str),
+    )
+
+def _insert_alerts(conn, alerts):
+    """إدخال دفعة تنبيهات مع تجاهل المكرر (البصمة مفتاح أساسي) - يعيد عدد المُدخل فعلاً"""
+    before = conn.total_changes
+    conn.executemany(
+        "INSERT OR IGNORE INTO alerts "
+        "(fingerprint, type, city, district, property_type, generated_at, saved_at, payload) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [_alert_row(alert) for alert in alerts],
+    )
+    return conn.total_changes - before
+
+def _migrate_legacy_alerts(conn):
+    """ترحيل ملف alerts_db.json القديم مرة واحدة"""
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone():
+        return
+    
+    migrated = 0
+    if ALERTS_FILE.exists():
+        try:
+            legacy = json.loads(ALERTS_FILE.read_text(encoding="utf-8"))
+        except Exception:
+            legacy = []
+        for alert in legacy:
+            alert.setdefault("fingerprint", alert_fingerprint(alert))
+        migrated = _insert_alerts(conn, legacy)
+    
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_migrated', ?)",
+        (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),),
+    )
+    if migrated:
+        print(f"📦 تم ترحيل {migrated} تنبيه من {ALERTS_FILE} إلى {ALERTS_DB}")
+
+def _connect():
+    """فتح اتصال بقاعدة التنبيهات (مع تجهيز الجداول والترحيل عند أول استخدام)"""
+    ensure_alerts_directory()
+    db_key = str(ALERTS_DB.resolve())
+    is_ready = db_key in _initialized_dbs and ALERTS_DB.exists()
+    conn = sqlite3.connect(ALERTS_DB, timeout=30)
+    if not is_ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_ALERTS_SCHEMA)
+        with conn:
+            _migrate_legacy_alerts(conn)
+        _initialized_dbs.add(db_key)
+    return conn
+
+def _query_alerts(where="", params=(), order="rowid", limit=None):
+    """قراءة التنبيهات المطابقة كقواميس"""
+    sql = f"SELECT payload FROM alerts {('WHERE ' + where) if where else ''} ORDER BY {order}"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    conn = _connect()
+    try:
+        return [json.loads(row[0]) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
 
 def load_alerts():
     """تحميل جميع التنبيهات المخزنة"""
-    ensure_alerts_directory()
-    if not ALERTS_FILE.exists():
-        return []
     try:
-        return json.loads(ALERTS_FILE.read_text(encoding="utf-8"))
-    except:
+        return _query_alerts()
+    except Exception as e:
+        print(f"⚠️ تعذر قراءة التنبيهات: {e}")
         return []
 
 def save_alert(alert: dict):
     """
     حفظ تنبيه جديد في الملف الدائم مع منع التكرار
-    ✅ لا يتم حفظ نفس التنبيه أكثر من مرة باستخدام fingerprint
+    ✅ لا يتم حفظ نفس التنبيه أكثر من مرة باستخدام fingerprint (مفتاح أساسي)
     """
-    alerts = load_alerts()
-
     # إضافة بصمة فريدة للتنبيه (تعتمد على generated_at)
     alert["fingerprint"] = alert_fingerprint(alert)
-    
-    # 🔥 منع التكرار: نفس البصمة خلال نفس اليوم
-    for existing in alerts:
-        if existing.get("fingerprint") == alert["fingerprint"]:
-            print(f"⚠️ تنبيه مكرر تجاهل: {alert.get('type')} - {alert.get('city')} - {alert.get('district', '')}")
-            return
-
     alert["saved_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    alerts.append(alert)
 
-    ensure_alerts_directory()
-    ALERTS_FILE.write_text(
-        json.dumps(alerts, ensure_ascii=False, indent=2),
-        encoding="utf-8"
-    )
+    conn = _connect()
+    try:
+        with conn:
+            inserted = _insert_alerts(conn, [alert])
+    finally:
+        conn.close()
+
+    # 🔥 منع التكرار: نفس البصمة خلال نفس اليوم
+    if not inserted:
+        alert.pop("saved_at", None)
+        print(f"⚠️ تنبيه مكرر تجاهل: {alert.get('type')} - {alert.get('city')} - {alert.get('district', '')}")
+        return
+
     print(f"✅ تم حفظ تنبيه جديد: {alert.get('city')} - {alert.get('type')}")
 
+def save_alerts(alerts):
+    """
+    حفظ دفعة تنبيهات في معاملة واحدة (للتشغيل الدفعي / المتوازي)
+    التكرار داخل الدفعة أو مع المخزن يُتجاهل بالبصمة - يعيد التنبيهات المحفوظة فعلاً
+    """
+    if not alerts:
+        return []
+    
+    saved_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    batch = {}
+    for alert in alerts:
+        alert["fingerprint"] = alert_fingerprint(alert)
+        if alert["fingerprint"] not in batch:
+            batch[alert["fingerprint"]] = dict(alert, saved_at=saved_at)
+    
+    conn = _connect()
+    try:
+        existing = set()
+        fingerprints = list(batch)
+        for start in range(0, len(fingerprints), 500):
+            chunk = fingerprints[start:start + 500]
+            existing.update(row[0] for row in conn.execute(
+                f"SELECT fingerprint FROM alerts WHERE fingerprint IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        new_alerts = [alert for fingerprint, alert in batch.items() if fingerprint not in existing]
+        with conn:
+            _insert_alerts(conn, new_alerts)
+    finally:
+        conn.close()
+    
+    skipped = len(alerts) - len(new_alerts)
+    print(f"✅ تم حفظ {len(new_alerts)} تنبيه جديد" + (f" (تجاهل {skipped} مكرر)" if skipped else ""))
+    return new_alerts
+
 def get_today_stored_alerts(city: str = None):
     """جلب تنبيهات اليوم من الملف الدائم (للمدينة المحددة أو الكل)"""
     today = datetime.now().strftime("%Y-%m-%d")
-    all_alerts = load_alerts()
-    
-    # تصفية حسب اليوم
-    today_alerts = [
-        a for a in all_alerts
-        if a.get("generated_at", "").startswith(today)
-    ]
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
     
-    # تصفية حسب المدينة إذا طلبت
+    # تصفية حسب اليوم (نطاق على الفهرس) والمدينة إذا طلبت
+    where = "generated_at >= ? AND generated_at < ?"
+    params = [today, tomorrow]
     if city:
-        today_alerts = [a for a in today_alerts if a.get("city") == city]
+        where += " AND city = ?"
+        params.append(city)
     
-    return today_alerts
+    return _query_alerts(where, params)
+
+def _parse_alert_time(alert):
+    try:
+        return datetime.strptime(alert.get("generated_at", "2000-01-01 00:00"), "%Y-%m-%d %H:%M")
+    except:
+        return None
 
 def get_alerts_history(days=7, city=None, alert_type=None):
     """
@@ -193,26 +331,25 @@ def get_alerts_history(days=7, city=None, alert_type=None):
     """
     cutoff = datetime.now() - timedelta(days=days)
     
-    all_alerts = load_alerts()
-    history_alerts = []
-    
-    for alert in all_alerts:
-        try:
-            # تحويل النص إلى كائن datetime للمقارنة الدقيقة
-            alert_time = datetime.strptime(alert.get("generated_at", "2000-01-01 00:00"), "%Y-%m-%d %H:%M")
-            if alert_time >= cutoff:
-                history_alerts.append(alert)
-        except:
-            # إذا فشل التحويل، نتجاهل هذا التنبيه
-            continue
+    where = "generated_at >= ?"
+    params = [cutoff.strftime("%Y-%m-%d %H:%M")]
     
     # تصفية حسب المدينة إذا طلبت
     if city:
-        history_alerts = [a for a in history_alerts if a.get("city") == city]
+        where += " AND city = ?"
+        params.append(city)
     
     # تصفية حسب نوع التنبيه إذا طلب
     if alert_type:
-        history_alerts = [a for a in history_alerts if a.get("type") == alert_type]
+        where += " AND type = ?"
+        params.append(alert_type)
+    
+    history_alerts = []
+    for alert in _query_alerts(where, params):
+        # إذا فشل التحويل، نتجاهل هذا التنبيه
+        alert_time = _parse_alert_time(alert)
+        if alert_time is not None and alert_time >= cutoff:
+            history_alerts.append(alert)
     
     return history_alerts
 
@@ -222,21 +359,17 @@ def get_latest_alert_by_city(city, alert_type=None):
     city: اسم المدينة
     alert_type: نوع التنبيه المطلوب (اختياري)
     """
-    all_alerts = load_alerts()
-    
-    # تصفية حسب المدينة
-    city_alerts = [a for a in all_alerts if a.get("city") == city]
+    where = "city = ?"
+    params = [city]
     
     # تصفية حسب النوع إذا طلب
     if alert_type:
-        city_alerts = [a for a in city_alerts if a.get("type") == alert_type]
-    
-    if not city_alerts:
-        return None
+        where += " AND type = ?"
+        params.append(alert_type)
     
     # ترتيب تنازلي حسب الوقت وأخذ الأحدث
-    city_alerts.sort(key=lambda x: x.get("generated_at", ""), reverse=True)
-    return city_alerts[0]
+    latest = _query_alerts(where, params, order="generated_at DESC, rowid", limit=1)
+    return latest[0] if latest else None
 
 def get_latest_alerts_summary():
     """
@@ -262,29 +395,70 @@ def get_latest_alerts_summary():
     
     return summary
 
+def record_watcher_heartbeat(report=None):
+    """💓 تسجيل آخر دورة لمراقب البيانات (market_watcher) مع ملخصها"""
+    payload = dict(report or {})
+    payload["heartbeat_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('watcher_heartbeat', ?)",
+                (json.dumps(payload, ensure_ascii=False, default=str),)
+            )
+    finally:
+        conn.close()
+    return payload
+
+def get_watcher_status():
+    """آخر نبضة من مراقب البيانات (أو None إذا لم يعمل بعد)"""
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'watcher_heartbeat'").fetchone()
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row else None
+
+def is_watcher_active(max_age_minutes=10):
+    """
+    هل مراقب البيانات يعمل؟ (نبضة خلال آخر max_age_minutes دقيقة)
+    عندها تكتفي الواجهة بقراءة التنبيهات المحسوبة مسبقاً
+    """
+    try:
+        status = get_watcher_status()
+        if not status:
+            return False
+        last = datetime.strptime(status["heartbeat_at"], "%Y-%m-%d %H:%M:%S")
+        return datetime.now() - last <= timedelta(minutes=max_age_minutes)
+    except Exception:
+        return False
+
 def clear_old_alerts(days=365):
     """حذف التنبيهات الأقدم من عدد محدد من الأيام (افتراضي: سنة كاملة)"""
-    alerts = load_alerts()
     cutoff = datetime.now() - timedelta(days=days)
     
-    new_alerts = []
-    for alert in alerts:
-        try:
-            alert_time = datetime.strptime(alert.get("generated_at", "2000-01-01 00:00"), "%Y-%m-%d %H:%M")
-            if alert_time >= cutoff:
-                new_alerts.append(alert)
-        except:
-            # إذا فشل التحويل، نحتفظ بالتنبيه
-            new_alerts.append(alert)
-    
-    if len(new_alerts) != len(alerts):
-        ALERTS_FILE.write_text(
-            json.dumps(new_alerts, ensure_ascii=False, indent=2),
-            encoding="utf-8"
-        )
-        print(f"🧹 تم حذف {len(alerts) - len(new_alerts)} تنبيه قديم (أقدم من {days} يوم)")
+    conn = _connect()
+    try:
+        candidates = conn.execute(
+            "SELECT fingerprint, payload FROM alerts WHERE generated_at < ?",
+            (cutoff.strftime("%Y-%m-%d %H:%M"),),
+        ).fetchall()
+        
+        # إذا فشل تحويل الوقت، نحتفظ بالتنبيه
+        expired = []
+        for fingerprint, payload in candidates:
+            alert_time = _parse_alert_time(json.loads(payload))
+            if alert_time is not None and alert_time < cutoff:
+                expired.append((fingerprint,))
+        
+        if expired:
+            with conn:
+                conn.executemany("DELETE FROM alerts WHERE fingerprint = ?", expired)
+            print(f"🧹 تم حذف {len(expired)} تنبيه قديم (أقدم من {days} يوم)")
+    finally:
+        conn.close()
     
-    return new_alerts
+    return load_alerts()
 
 # ==============================
 # 3️⃣ محرك التنبيهات (Alert Engine)
@@ -302,9 +476,18 @@ class AlertEngine:
     def is_valid_time_gap(self, prev_df, curr_df, min_minutes=180):
         """
         التحقق من أن الفرق الزمني بين اللقطتين كافٍ لإصدار تنبيه
+        prev_df / curr_df: اللقطتان أو ملخصاهما
         min_minutes: الحد الأدنى بالدقائق (افتراضي: 180 دقيقة = 3 ساعات)
         """
         try:
+            # ملخصات اللقطات تحمل وقتها مباشرة
+            if isinstance(prev_df, dict) and isinstance(curr_df, dict):
+                if prev_df.get("snapshot_time") and curr_df.get("snapshot_time"):
+                    t1 = pd.to_datetime(prev_df["snapshot_time"])
+                    t2 = pd.to_datetime(curr_df["snapshot_time"])
+                    return (t2 - t1).total_seconds() / 60 >= min_minutes
+                return True
+
             # محاولة قراءة وقت اللقطة من العمود المخصص
             if "__snapshot_time__" in prev_df.columns and "__snapshot_time__" in curr_df.columns:
                 t1 = pd.to_datetime(prev_df["__snapshot_time__"].iloc[0])
@@ -317,38 +500,146 @@ class AlertEngine:
         # إذا لم نتمكن من قراءة الوقت، نسمح بالتحليل (للأمان)
         return True
 
+    def detect_district_alerts(self, city, property_type, previous_summary, current_summary):
+        """
+        اختفاء المعروض ودخول السيولة لكل حي على حدة
+        جدول الفروقات يُحسب لكل الأحياء مرة واحدة، والشروط أقنعة على أعمدته،
+        والقواميس تُبنى فقط للأحياء التي تجاوزت الشروط
+        """
+        diff = diff_district_summaries(previous_summary, current_summary)
+        if diff.empty:
+            return []
+
+        eligible = diff["prev_count"] >= MIN_DISTRICT_COUNT
+        count_change = diff["count_change_pct"]
+        # بدون سعر في أحد الطرفين نعتمد على الحجم فقط (نفس منطق مستوى المدينة)
+        price_change = diff["price_change_pct"].fillna(0)
+        share_change = diff["curr_share"] - diff["prev_share"]
+
+        # 🔥 اختفاء المعروض: انخفاض العدد 20% فأكثر (+ دعم إذا تراجعت حصة الحي)
+        supply_score = (
+            (count_change <= -20).astype(int) + (count_change <= -30) + (count_change <= -50)
+            + (share_change <= -0.05)
+        )
+        supply = diff[eligible & (count_change <= -20)]
+
+        # 💧 دخول السيولة: ارتفاع العدد 15% فأكثر بسعر شبه ثابت (+ دعم إذا زادت حصة الحي)
+        liquidity_score = (
+            (count_change >= 15).astype(int) + (count_change >= 20) + (count_change >= 30)
+            + (share_change >= 0.05)
+        )
+        liquidity = diff[eligible & (count_change >= 15) & price_change.between(-2, 1)]
+
+        generated_at = datetime.now().strftime("%Y-%m-%d %H:%M")
+        alerts = []
+
+        for district, row in supply.nsmallest(MAX_DISTRICT_ALERTS, "count_change_pct").iterrows():
+            drop = -row["count_change_pct"]
+            confidence = compute_confidence(int(supply_score[district]))
+            priority = "GOLD" if confidence == "HIGH" else "MID" if confidence == "MEDIUM" else "LOW"
+            alerts.append({
+                "type": "SUPPLY_ABSORPTION",
+                "city": city,
+                "district": district,
+                "title": f"🔥 اختفاء معروض في {district} - {city}",
+                "description": (
+                    f"انخفض عدد عقارات {property_type} في حي {district} بنسبة "
+                    f"{drop:.1f}% خلال الفترة الأخيرة، ما يدل على امتصاص قوي من السوق."
+                ),
+                "signal": {
+                    "scope": "district",
+                    "supply_drop_percent": round(drop, 1),
+                    "previous_count": int(row["prev_count"]),
+                    "current_count": int(row["curr_count"]),
+                    "districts_lost": [district],
+                    "share_change_percent": round(share_change[district] * 100, 1),
+                    "window_hours": 24,
+                    "property_type": property_type
+                },
+                "confidence": confidence,
+                "priority": priority,
+                "generated_at": generated_at,
+                "source": "MarketMemory",
+                "property_type": property_type,
+                "is_exclusive": True
+            })
+            print(f"🔥 {city} | {district} | {property_type}: اختفاء معروض {drop:.1f}% ({confidence}) [{priority}]")
+
+        for district, row in liquidity.nlargest(MAX_DISTRICT_ALERTS, "count_change_pct").iterrows():
+            inflow = row["count_change_pct"]
+            confidence = compute_confidence(int(liquidity_score[district]))
+            priority = "GOLD" if confidence == "HIGH" else "MID" if confidence == "MEDIUM" else "LOW"
+            alerts.append({
+                "type": "LIQUIDITY_INFLOW",
+                "city": city,
+                "district": district,
+                "title": f"💧 دخول سيولة ذكية في {district} - {city}",
+                "description": (
+                    f"ارتفع حجم التداول لعقارات {property_type} في حي {district} بنسبة "
+                    f"{inflow:.1f}% بينما بقي السعر شبه ثابت ({price_change[district]:.1f}%)."
+                ),
+                "signal": {
+                    "scope": "district",
+                    "liquidity_change_percent": round(inflow, 1),
+                    "price_change_percent": round(price_change[district], 2),
+                    "active_districts": [district],
+                    "previous_count": int(row["prev_count"]),
+                    "current_count": int(row["curr_count"]),
+                    "share_change_percent": round(share_change[district] * 100, 1),
+                    "window_hours": 24,
+                    "property_type": property_type
+                },
+                "confidence": confidence,
+                "priority": priority,
+                "generated_at": generated_at,
+                "source": "MarketMemory",
+                "property_type": property_type,
+                "is_exclusive": True
+            })
+            print(f"💧 {city} | {district} | {property_type}: دخول سيولة {inflow:.1f}% ({confidence}) [{priority}]")
+
+        return alerts
+
     def generate_city_alerts(self, city, property_type):
         """
-        يولد جميع الفرص الذهبية لمدينة واحدة ونوع عقار محدد
+        يولد جميع الفرص الذهبية لمدينة واحدة ونوع عقار محدد ويحفظها دفعة واحدة
+        """
+        alerts = self.detect_city_alerts(city, property_type)
+        save_alerts(alerts)
+        return alerts
+
+    def detect_city_alerts(self, city, property_type):
+        """
+        اكتشاف التنبيهات لمدينة ونوع عقار بدون حفظها (آمنة للتشغيل المتوازي)
         يعتمد على مقارنة زمنية بين آخر لقطتين من ذاكرة السوق
+        ⚡ فحوصات المعروض والسيولة والسلوك تعمل على ملخصات اللقطات المحفوظة،
+        والبيانات الكاملة تُقرأ فقط لاستخراج الفرص الذهبية
         """
         try:
-            # 🔹 تحميل آخر لقطتين من ذاكرة السوق للمقارنة الزمنية
-            snapshots = load_last_snapshots(city, property_type, limit=2)
+            # 🔹 تحميل ملخص آخر لقطتين من ذاكرة السوق للمقارنة الزمنية
+            summaries = load_last_summaries(city, property_type, limit=2)
 
             # 🔒 إذا لم تتوفر لقطتان، لا نولد تنبيهات (لا توجد ذاكرة كافية)
-            if len(snapshots) < 2:
+            if len(summaries) < 2:
                 print(f"ℹ️ {city} | {property_type}: لا توجد بيانات زمنية كافية بعد")
                 return []
 
-            previous_df, current_df = snapshots[1], snapshots[0]
+            previous_summary, current_summary = summaries[1], summaries[0]
             
             # 🛑 حارس زمني: لا نحلل فروقات تافهة (أقل من 3 ساعات)
-            if not self.is_valid_time_gap(previous_df, current_df):
+            if not self.is_valid_time_gap(previous_summary, current_summary):
                 print(f"⏱️ {city} | {property_type}: فرق زمني ضعيف – تجاهل التنبيهات")
                 return []
-            
-            real_data = current_df
 
             # ==============================
             # متغيرات مشتركة (مرة واحدة فقط)
             # ==============================
-            prev_count = len(previous_df)
-            curr_count = len(current_df)
+            prev_count = previous_summary["count"]
+            curr_count = current_summary["count"]
 
             # تحليل الأحياء (للتنبيهات التي تحتاجه)
-            prev_districts = set(previous_df.get("الحي", [])) if "الحي" in previous_df.columns else set()
-            curr_districts = set(current_df.get("الحي", [])) if "الحي" in current_df.columns else set()
+            prev_districts = set(previous_summary["district_counts"])
+            curr_districts = set(current_summary["district_counts"])
 
             alerts = []
 
@@ -422,7 +713,6 @@ class AlertEngine:
                 }
 
                 alerts.append(alert)
-                save_alert(alert)
 
                 print(
                     f"🔥 {city} | {property_type}: اختفاء معروض "
@@ -439,11 +729,10 @@ class AlertEngine:
             else:
                 liquidity_change_pct = 0
 
-            # حساب تغير السعر (مع التحقق من وجود العمود)
-            if ("سعر_المتر" in previous_df.columns and "سعر_المتر" in current_df.columns 
-                and len(previous_df["سعر_المتر"].dropna()) > 0 and len(current_df["سعر_المتر"].dropna()) > 0):
-                prev_price = previous_df["سعر_المتر"].mean()
-                curr_price = current_df["سعر_المتر"].mean()
+            # حساب تغير السعر (مع التحقق من وجود بيانات سعر)
+            if previous_summary["price_count"] > 0 and current_summary["price_count"] > 0:
+                prev_price = previous_summary["mean_price_per_sqm"]
+                curr_price = current_summary["mean_price_per_sqm"]
                 price_change_pct = ((curr_price - prev_price) / prev_price) * 100 if prev_price else 0
             else:
                 price_change_pct = 0
@@ -503,13 +792,18 @@ class AlertEngine:
                 }
 
                 alerts.append(alert)
-                save_alert(alert)
 
                 print(
                     f"💧 {city} | {property_type}: دخول سيولة "
                     f"{liquidity_change_pct:.1f}% ({confidence}) [{priority}]"
                 )
 
+            # ==============================
+            # 🏘️ تنبيهات على مستوى الحي (فروقات كل الأحياء بدمج واحد)
+            # ==============================
+
+            alerts.extend(self.detect_district_alerts(city, property_type, previous_summary, current_summary))
+
             # ==============================
             # 🧠 تنبيه تغير سلوك الشراء (Buyer Behavior Shift)
             # ==============================
@@ -518,11 +812,13 @@ class AlertEngine:
             confidence_score = 0
 
             # ---- 1. تغير نوع العقار المهيمن ----
-            def dominant_type(df):
-                return df["نوع_العقار"].value_counts(normalize=True).to_dict() if "نوع_العقار" in df.columns else {}
+            def dominant_type(summary):
+                counts = summary["type_counts"]
+                total = sum(counts.values())
+                return {t: n / total for t, n in counts.items()} if total else {}
 
-            prev_types = dominant_type(previous_df)
-            curr_types = dominant_type(current_df)
+            prev_types = dominant_type(previous_summary)
+            curr_types = dominant_type(current_summary)
 
             for t, pct in curr_types.items():
                 prev_pct = prev_types.get(t, 0)
@@ -531,28 +827,33 @@ class AlertEngine:
                     confidence_score += 1
 
             # ---- 2. انتقال الشراء بين الشرائح السعرية ----
-            if "سعر_المتر" in previous_df.columns and "سعر_المتر" in current_df.columns:
-                prev_prices = previous_df["سعر_المتر"].dropna()
-                curr_prices = current_df["سعر_المتر"].dropna()
-
-                if len(prev_prices) > 10 and len(curr_prices) > 10:
-                    p_low, p_high = prev_prices.quantile([0.33, 0.66])
-                    prev_segment = pd.cut(prev_prices, [-1, p_low, p_high, 1e9], labels=["منخفض", "متوسط", "مرتفع"])
-                    curr_segment = pd.cut(curr_prices, [-1, p_low, p_high, 1e9], labels=["منخفض", "متوسط", "مرتفع"])
-
-                    prev_dist = prev_segment.value_counts(normalize=True)
-                    curr_dist = curr_segment.value_counts(normalize=True)
+            # الشرائح تُحدد بربيعيات اللقطة السابقة، وتوزيع الحالية عليها يُقدّر من مدرجها
+            if previous_summary["price_count"] > 10 and current_summary["price_count"] > 10:
+                p_low, p_high = previous_summary["price_quantiles"]
+                prev_dist = dict(zip(["منخفض", "متوسط", "مرتفع"], previous_summary["segment_shares"]))
+
+                below_low = histogram_share_below(current_summary, p_low)
+                below_high = histogram_share_below(current_summary, p_high)
+                curr_dist = {
+                    "منخفض": below_low,
+                    "متوسط": below_high - below_low,
+                    "مرتفع": 1 - below_high,
+                }
 
-                    for seg in curr_dist.index:
-                        if curr_dist[seg] - prev_dist.get(seg, 0) >= 0.15:
-                            behavior_signals.append(f"انتقال الشراء نحو الشريحة {seg}")
-                            confidence_score += 1
+                for seg in curr_dist:
+                    if curr_dist[seg] - prev_dist.get(seg, 0) >= 0.15:
+                        behavior_signals.append(f"انتقال الشراء نحو الشريحة {seg}")
+                        confidence_score += 1
 
             # ---- 3. تركّز الشراء في أحياء محددة ----
             dominant_districts = []
-            if "الحي" in current_df.columns:
-                district_dist = current_df["الحي"].value_counts(normalize=True)
-                dominant_districts = district_dist[district_dist >= 0.15].index.tolist()
+            district_counts = current_summary["district_counts"]
+            if district_counts:
+                total_districts = sum(district_counts.values())
+                dominant_districts = [
+                    d for d, n in sorted(district_counts.items(), key=lambda item: item[1], reverse=True)
+                    if n / total_districts >= 0.15
+                ]
 
                 if len(dominant_districts) >= 3:
                     behavior_signals.append("تركيز الشراء في أحياء محددة")
@@ -561,15 +862,13 @@ class AlertEngine:
             # ---- 4. سلوك الصفقة (حجم الصفقة) ----
             # نراقب هل السوق يتجه لصفقات أصغر (أفراد) أو أكبر (مستثمرين)
             
-            def avg_transaction_size(df):
-                if "المساحة" in df.columns and df["المساحة"].dropna().any():
-                    return df["المساحة"].mean()
-                elif "السعر" in df.columns and df["السعر"].dropna().any():
-                    return df["السعر"].mean()
-                return None
+            def avg_transaction_size(summary):
+                if summary["mean_area"] is not None:
+                    return summary["mean_area"]
+                return summary["mean_price"]
 
-            prev_tx_size = avg_transaction_size(previous_df)
-            curr_tx_size = avg_transaction_size(current_df)
+            prev_tx_size = avg_transaction_size(previous_summary)
+            curr_tx_size = avg_transaction_size(current_summary)
 
             if prev_tx_size and curr_tx_size:
                 change_pct = ((curr_tx_size - prev_tx_size) / prev_tx_size) * 100
@@ -611,7 +910,6 @@ class AlertEngine:
                 }
 
                 alerts.append(alert)
-                save_alert(alert)
 
                 print(f"🧠 {city} | {property_type}: تغير سلوك الشراء ({confidence}) [{priority}]")
 
@@ -625,6 +923,10 @@ class AlertEngine:
                 "LIQUIDITY_INFLOW": any(a.get("type") == "LIQUIDITY_INFLOW" for a in alerts),
             }
 
+            # البيانات الكاملة مطلوبة هنا فقط (آخر لقطة)
+            latest = load_last_snapshots(city, property_type, limit=1)
+            real_data = latest[0] if latest else pd.DataFrame()
+
             undervalued = self.opportunity_finder.find_undervalued_properties(
                 real_data, city
             )
@@ -635,11 +937,13 @@ class AlertEngine:
 
             for prop in undervalued:
                 # ---- قراءة الخصم بأمان ----
-                discount_raw = prop.get("الخصم", "0").replace("%", "")
-                try:
-                    discount = float(discount_raw)
-                except:
-                    discount = 0.0
+                discount = prop.get("نسبة_الخصم")
+                if discount is None:
+                    discount_raw = prop.get("الخصم", "0").replace("%", "")
+                    try:
+                        discount = float(discount_raw)
+                    except:
+                        discount = 0.0
 
                 # فلتر الظهور
                 if discount < MIN_DISCOUNT_PERCENT:
@@ -703,7 +1007,6 @@ class AlertEngine:
                 }
 
                 alerts.append(alert)
-                save_alert(alert)
 
                 print(f"💰 {city} | {property_type}: فرصة {confidence} بخصم {discount:.1f}% (score={confidence_score}) [{priority}]")
 
@@ -752,26 +1055,69 @@ def update_market_and_check_alerts(city, property_type):
     
     return alerts
 
+def update_all_markets_and_check_alerts():
+    """
+    تحديث كل المدن والأنواع دفعة واحدة:
+    - تحميل وتطبيع البيانات مرة واحدة فقط
+    - حفظ لقطات كل الأزواج بالتوازي
+    - تشغيل التنبيهات لكل الأزواج
+    """
+    print(f"🔄 تحديث السوق الشامل: {len(CITIES)} مدن × {len(PROPERTY_TYPES)} أنواع")
+    
+    collect_and_store_all(CITIES, PROPERTY_TYPES)
+    
+    return generate_all_alerts()
+
 # ==============================
 # 4️⃣ تجميع كل المدن (وظيفة إدارية للاستخدام الدفعي)
 # ==============================
 
-def generate_all_alerts():
+# محرك خاص بكل عامل (يُنشأ مرة واحدة لكل عملية)
+_worker_engine = None
+
+def _init_alert_worker():
+    global _worker_engine
+    _worker_engine = AlertEngine()
+
+def _detect_pair_alerts(pair):
+    """عامل المعالجة: اكتشاف تنبيهات زوج (مدينة، نوع) بدون أي كتابة"""
+    city, prop_type = pair
+    if _worker_engine is None:
+        _init_alert_worker()
+    return _worker_engine.detect_city_alerts(city, prop_type)
+
+def generate_all_alerts(max_workers=None, pairs=None):
     """
     ⚠️ وظيفة إدارية فقط - تجمع كل التنبيهات من جميع المدن دفعة واحدة
     تستخدم للصيانة أو التهيئة الأولية، وليس للاستخدام اليومي
+    ⚡ الأزواج (مدينة × نوع) تُحلل بالتوازي، والحفظ دفعة واحدة في النهاية
+    pairs: تقييد الجولة بأزواج محددة (مراقب البيانات يمرر الأزواج المتأثرة فقط)
     """
-    print("⚠️ تحذير: generate_all_alerts هي وظيفة إدارية ثقيلة، يفضل استخدام check_and_emit_alert للتنبيهات اللحظية")
-    engine = AlertEngine()
-    all_alerts = []
-
-    # جولة على جميع المدن
-    for city in CITIES:
-        # جولة على جميع أنواع العقارات
-        for prop_type in PROPERTY_TYPES:
-            # جمع التنبيهات لهذه المدينة ونوع العقار
-            city_alerts = engine.generate_city_alerts(city, prop_type)
-            all_alerts.extend(city_alerts)
+    if pairs is None:
+        print("⚠️ تحذير: generate_all_alerts هي وظيفة إدارية ثقيلة، يفضل استخدام check_and_emit_alert للتنبيهات اللحظية")
+        # جولة على جميع المدن × جميع أنواع العقارات
+        pairs = [(city, prop_type) for city in CITIES for prop_type in PROPERTY_TYPES]
+    else:
+        pairs = list(pairs)
+    if not pairs:
+        return []
+    workers = min(len(pairs), max_workers or os.cpu_count() or 1)
+    
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_alert_worker) as executor:
+                results = list(executor.map(_detect_pair_alerts, pairs))
+        else:
+            results = [_detect_pair_alerts(pair) for pair in pairs]
+    except Exception as e:
+        # بيئات لا تسمح بإنشاء عمليات فرعية - نكمل بالتسلسل
+        print(f"⚠️ تعذر التشغيل المتوازي ({e}) - سيتم التحليل بالتسلسل")
+        results = [_detect_pair_alerts(pair) for pair in pairs]
+    
+    all_alerts = [alert for pair_alerts in results for alert in pair_alerts]
+    
+    # حفظ واحد لكل الجولة (بدون تسابق بين العمال على المخزن)
+    save_alerts(all_alerts)
 
     # ترتيب عشوائي لتنويع العرض (مرة واحدة فقط)
     random.shuffle(all_alerts)
@@ -1041,7 +1387,7 @@ if __name__ == "__main__":
     print_alerts_summary()
     
     # عرض مسار ملف التخزين
-    print(f"\n💾 ملف التخزين: {ALERTS_FILE}")
+    print(f"\n💾 ملف التخزين: {ALERTS_DB}")
     stored = load_alerts()
     print(f"✅ إجمالي التنبيهات المخزنة: {len(stored)}")
     
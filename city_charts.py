@@ -4,6 +4,7 @@ import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 from decision_terminology import TERMS
+from numeric_parser import parse_numeric
 
 
 class CityCharts:
@@ -43,7 +44,7 @@ class CityCharts:
         return df is not None and all(col in df.columns for col in cols)
 
     def _numeric(self, s):
-        return pd.to_numeric(s, errors="coerce")
+        return parse_numeric(s)
 
     def _normalize_market_columns(self, df):
         """
@@ -82,10 +83,10 @@ class CityCharts:
         df = df.copy()
 
         if "price" in df.columns:
-            df["price"] = pd.to_numeric(df["price"], errors="coerce")
+            df["price"] = parse_numeric(df["price"])
 
         if "area" in df.columns:
-            df["area"] = pd.to_numeric(df["area"], errors="coerce")
+            df["area"] = parse_numeric(df["area"])
 
         if "date" in df.columns:
             df["date"] = pd.to_datetime(df["date"], errors="coerce")
@@ -170,7 +171,7 @@ class CityCharts:
 
         agg = (
             tmp
-            .groupby(district_col)["price_per_sqm"]
+            .groupby(district_col, observed=True)["price_per_sqm"]
             .mean()
             .sort_values(ascending=False)
             .head(10)
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from numeric_parser import parse_numeric
 
 class DataCleaner:
     def __init__(self, dataframe):
@@ -20,7 +21,7 @@ class DataCleaner:
         self.df = self.df[(self.df['السعر'] >= 10000) & (self.df['السعر'] <= 50000000)]
     
     def filter_invalid_areas(self):
-        self.df['Area(m²)'] = self.df['المساحة'].str.extract('(\d+)').astype(float)
+        self.df['Area(m²)'] = parse_numeric(self.df['المساحة'])
         self.df = self.df[(self.df['Area(m²)'] >= 10) & (self.df['Area(m²)'] <= 5000)]
     
     def calculate_price_per_sqm(self):
@@ -0,0 +1,160 @@
+# data_repository.py
+# =========================================
+# Data Repository – مستودع البيانات المشترك
+# =========================================
+# نقطة تحميل واحدة لكل البيانات المرجعية داخل العملية:
+# - الصفقات الحكومية (market_transactions.csv)
+# - المشاريع (projects.xlsx)
+# - الأحياء (districts.xlsx)
+#
+# كل مجموعة بيانات تُحمّل مرة واحدة فقط، ولها رقم نسخة يزيد مع كل إعادة تحميل.
+# المستهلكون يحصلون على نسخة كسولة (Copy-on-Write) من الجدول المشترك بدون نسخ البيانات:
+# أي تعديل عليها (عمود جديد، loc، fillna...) ينسخ الجزء المعدّل فقط، فالجدول المشترك لا يتغير أبداً.
+# إعادة التحميل صريحة فقط عبر reload()
+# =========================================
+
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+import pandas as pd
+
+# Copy-on-Write: كل جدول مشتق من جدول آخر مستقل عنه عند التعديل
+# (يضمن أن نسخ المستودع لا تعدّل البيانات المشتركة بين الجلسات)
+pd.set_option("mode.copy_on_write", True)
+
+from government_data_provider import (
+    load_government_data,
+    load_projects_data,
+    load_districts_data,
+    filter_government_data,
+)
+
+
+class DatasetSnapshot:
+    """📸 نسخة ثابتة من مجموعة بيانات: الاسم + رقم النسخة + وقت التحميل"""
+
+    __slots__ = ("name", "version", "loaded_at", "_frame")
+
+    def __init__(self, name: str, version: int, frame: Optional[pd.DataFrame]):
+        self.name = name
+        self.version = version
+        self.loaded_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._frame = frame
+
+    @property
+    def frame(self) -> Optional[pd.DataFrame]:
+        """
+        نسخة كسولة من الجدول المشترك (بدون نسخ البيانات)
+        التعديل عليها ينسخ الأعمدة المعدلة فقط ولا يصل للمستودع
+        """
+        return None if self._frame is None else self._frame.copy(deep=False)
+
+    @property
+    def is_empty(self) -> bool:
+        return self._frame is None or self._frame.empty
+
+    def __repr__(self):
+        rows = 0 if self._frame is None else len(self._frame)
+        return f"DatasetSnapshot({self.name!r}, v{self.version}, rows={rows}, loaded_at={self.loaded_at!r})"
+
+
+class DataRepository:
+    """
+    🗄️ مستودع مشترك للبيانات على مستوى العملية
+    يحمّل كل مجموعة بيانات عند أول طلب فقط، ثم يخدم الجميع من الذاكرة
+    """
+
+    LOADERS = {
+        "transactions": load_government_data,
+        "projects": load_projects_data,
+        "districts": load_districts_data,
+    }
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._snapshots: Dict[str, DatasetSnapshot] = {}
+
+    def snapshot(self, name: str) -> DatasetSnapshot:
+        """📸 النسخة الحالية من مجموعة البيانات (تُحمّل عند أول طلب)"""
+        snapshot = self._snapshots.get(name)
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            if name not in self._snapshots:
+                self._load(name, version=1)
+            return self._snapshots[name]
+
+    def _load(self, name: str, version: int):
+        if name not in self.LOADERS:
+            raise KeyError(f"مجموعة بيانات غير معروفة: {name}")
+        frame = self.LOADERS[name]()
+        self._snapshots[name] = DatasetSnapshot(name, version, frame)
+        print(f"🗄️ المستودع: تم تحميل {self._snapshots[name]}")
+
+    def reload(self, name: Optional[str] = None):
+        """🔄 إعادة تحميل مجموعة بيانات (أو الكل) ورفع رقم النسخة"""
+        with self._lock:
+            names = [name] if name else list(self.LOADERS)
+            for dataset in names:
+                current = self._snapshots.get(dataset)
+                self._load(dataset, version=(current.version + 1) if current else 1)
+
+    def version(self, name: str) -> int:
+        return self.snapshot(name).version
+
+    def versions(self) -> Dict[str, int]:
+        """أرقام نسخ المجموعات المحملة حالياً"""
+        return {name: snap.version for name, snap in self._snapshots.items()}
+
+    # ==============================
+    # واجهات مختصرة للمستهلكين
+    # ==============================
+
+    def transactions(self, selected_city: Optional[str] = None,
+                     selected_property_type: Optional[str] = None) -> pd.DataFrame:
+        """
+        📊 الصفقات المطبّعة (مع فلترة اختيارية بالمدينة / النوع)
+        بدون فلترة: نسخة كسولة من الجدول المشترك
+        """
+        snapshot = self.snapshot("transactions")
+        if snapshot.is_empty:
+            return pd.DataFrame()
+        if selected_city or selected_property_type:
+            # الفلترة تنشئ جدولاً جديداً أصلاً
+            return filter_government_data(snapshot.frame, selected_city, selected_property_type)
+        return snapshot.frame
+
+    def projects(self) -> Optional[pd.DataFrame]:
+        """🏗️ بيانات المشاريع (نسخة كسولة من الجدول المشترك)"""
+        return self.snapshot("projects").frame
+
+    def districts(self) -> Optional[pd.DataFrame]:
+        """📍 بيانات الأحياء (نسخة كسولة من الجدول المشترك)"""
+        return self.snapshot("districts").frame
+
+
+_REPOSITORY = None
+_REPOSITORY_LOCK = threading.Lock()
+
+
+def get_repository() -> DataRepository:
+    """🗄️ المستودع المشترك للعملية الحالية"""
+    global _REPOSITORY
+    if _REPOSITORY is None:
+        with _REPOSITORY_LOCK:
+            if _REPOSITORY is None:
+                _REPOSITORY = DataRepository()
+    return _REPOSITORY
+
+
+# للاختبار المستقل
+if __name__ == "__main__":
+    repo = get_repository()
+    print(repo.snapshot("transactions"))
+    print(repo.snapshot("projects"))
+    print(repo.snapshot("districts"))
+    print(f"📊 الرياض: {len(repo.transactions('الرياض'))} صفقة")
+    repo.reload("projects")
+    print(repo.versions())
@@ -7,6 +7,7 @@
 import pandas as pd
 import numpy as np
 import logging
+from numeric_parser import parse_numeric
 
 # ---------------------------------
 # إعداد نظام التسجيل (logging)
@@ -37,7 +38,7 @@ def prepare_district_data(df: pd.DataFrame) -> pd.DataFrame:
             raise ValueError(f"العمود {col} غير موجود في البيانات")
 
     # منع القسمة على صفر
-    df["area"] = pd.to_numeric(df["area"], errors="coerce")
+    df["area"] = parse_numeric(df["area"])
     df.loc[df["area"] <= 0, "area"] = np.nan
 
     # حساب سعر المتر
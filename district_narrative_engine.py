@@ -7,20 +7,12 @@
 import pandas as pd
 import logging
 from ai_executive_summary import generate_executive_summary
+from numeric_parser import parse_numeric
 
-# ✅ استيراد دوال تحميل البيانات
-from government_data_provider import (
-    load_districts_data,
-    load_projects_data
-)
+# ✅ البيانات المرجعية (الأحياء والمشاريع) من المستودع المشترك - تُحمّل مرة واحدة للعملية
+from data_repository import get_repository
 import math
 
-# =========================================
-# ✅ تحميل البيانات مرة واحدة فقط عند تشغيل الملف (تحسين الأداء)
-# =========================================
-DISTRICTS_DATA = load_districts_data()
-PROJECTS_DATA = load_projects_data()
-
 # =========================================
 # ✅ الحد الأقصى لعدد المشاريع المعروضة في التقرير
 # =========================================
@@ -33,6 +25,65 @@ logging.basicConfig(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
 
+# =========================================
+# إحصاءات أحياء المدينة (الترتيب والحصص في التقرير)
+# =========================================
+
+def city_district_stats(real_data, city=""):
+    """
+    إحصاءات أحياء المدينة كما تظهر في التقرير:
+    - df_city: الصفقات الصالحة مع district_clean و price_sqm (لأقسام الاتجاه والدورة)
+    - total: عدد الصفقات الصالحة في المدينة
+    - transactions_by_district: صفقات كل حي (تنازلياً)
+    - price_by_district: وسيط سعر المتر لكل حي (تنازلياً)
+    - district_rows: مواقع صفوف كل حي في df_city (district_clean بأحرف صغيرة → مواقع)
+    """
+    stats = {
+        "df_city": pd.DataFrame(),
+        "total": 0,
+        "transactions_by_district": pd.Series(dtype=int),
+        "price_by_district": pd.Series(dtype=float),
+        "district_rows": {},
+    }
+    try:
+        if isinstance(real_data, pd.DataFrame) and not real_data.empty and "district" in real_data.columns:
+            df_city = real_data.copy()
+            
+            df_city["district_clean"] = (
+                df_city["district"]
+                .astype(str)
+                .str.split("/")
+                .str[-1]
+                .str.strip()
+            )
+            
+            df_city["price"] = parse_numeric(df_city["price"])
+            df_city["area"] = parse_numeric(df_city["area"])
+            df_city = df_city[df_city["area"] > 0]
+            df_city["price_sqm"] = df_city["price"] / df_city["area"]
+            df_city = df_city[df_city["price_sqm"].notna()]
+            df_city = df_city[(df_city["price_sqm"] >= 50) & (df_city["price_sqm"] <= 200000)]
+            
+            stats["df_city"] = df_city
+            stats["total"] = len(df_city)
+            stats["transactions_by_district"] = df_city["district_clean"].value_counts(sort=True)
+            price_by_district = df_city.groupby("district_clean")["price_sqm"].median()
+            stats["price_by_district"] = price_by_district.dropna().sort_values(ascending=False)
+            stats["district_rows"] = df_city.groupby(df_city["district_clean"].str.lower(), sort=False).indices
+    except Exception as e:
+        logger.warning(f"Error processing city data for {city}: {e}")
+    return stats
+
+
+def district_city_rows(city_stats, district):
+    """صفوف الحي من df_city عبر مواقعه المحفوظة (بدون مسح عمود الأحياء كاملاً)"""
+    df_city = city_stats["df_city"]
+    positions = city_stats.get("district_rows", {}).get(str(district).lower())
+    if positions is None:
+        return df_city.iloc[0:0]
+    return df_city.iloc[positions]
+
+
 # =========================================
 # دالة حساب المسافة بين نقطتين (Haversine) - مع تحسين معالجة الأخطاء
 # =========================================
@@ -68,11 +119,13 @@ def generate_district_narrative(
         dpi_score,
         market_data,
         real_data,
-        projects_data=None
+        projects_data=None,
+        city_stats=None
 ):
     """
     إنشاء تقرير تحليلي احترافي لحي داخل مدينة
     يعتمد على بيانات الصفقات العقارية الفعلية
+    city_stats: ناتج city_district_stats(real_data) محسوب مسبقاً (مصنع التقارير يحسبه مرة لكل مدينة)
     """
 
     # =========================================
@@ -142,10 +195,11 @@ def generate_district_narrative(
         price_ratio = 1
 
     # =========================================
-    # استخدام البيانات المحملة مرة واحدة
+    # استخدام البيانات المحملة مرة واحدة (المستودع المشترك)
     # =========================================
-    districts_df = DISTRICTS_DATA
-    projects_df = projects_data if projects_data is not None else PROJECTS_DATA
+    repository = get_repository()
+    districts_df = repository.districts()
+    projects_df = projects_data if projects_data is not None else repository.projects()
 
     # =========================================
     # جلب إحداثيات الحي الحالي
@@ -180,39 +234,13 @@ def generate_district_narrative(
     # حساب المشاريع القريبة
     # =========================================
     
-    city_districts_list = []
-    city_transactions_by_district = pd.Series(dtype=int)
-    city_price_by_district = pd.Series(dtype=float)
-    total_city_transactions = 0
-    df_city = pd.DataFrame()
-    
-    try:
-        if isinstance(real_data, pd.DataFrame) and not real_data.empty and "district" in real_data.columns:
-            df_city = real_data.copy()
-            
-            if not df_city.empty:
-                df_city["district_clean"] = (
-                    df_city["district"]
-                    .astype(str)
-                    .str.split("/")
-                    .str[-1]
-                    .str.strip()
-                )
-                
-                df_city["price"] = pd.to_numeric(df_city["price"], errors="coerce")
-                df_city["area"] = pd.to_numeric(df_city["area"], errors="coerce")
-                df_city = df_city[df_city["area"] > 0]
-                df_city["price_sqm"] = df_city["price"] / df_city["area"]
-                df_city = df_city[df_city["price_sqm"].notna()]
-                df_city = df_city[(df_city["price_sqm"] >= 50) & (df_city["price_sqm"] <= 200000)]
-                
-                total_city_transactions = len(df_city)
-                city_transactions_by_district = df_city["district_clean"].value_counts(sort=True)
-                city_districts_list = city_transactions_by_district.index.tolist()
-                city_price_by_district = df_city.groupby("district_clean")["price_sqm"].median()
-                city_price_by_district = city_price_by_district.dropna().sort_values(ascending=False)
-    except Exception as e:
-        logger.warning(f"Error processing city data for {city}: {e}")
+    if city_stats is None:
+        city_stats = city_district_stats(real_data, city)
+    df_city = city_stats["df_city"]
+    total_city_transactions = city_stats["total"]
+    city_transactions_by_district = city_stats["transactions_by_district"]
+    city_price_by_district = city_stats["price_by_district"]
+    city_districts_list = city_transactions_by_district.index.tolist()
 
     # =========================================
     # ✅ حساب المشاريع القريبة
@@ -875,7 +903,7 @@ def generate_district_narrative(
     trend_section = ""
     try:
         if not df_city.empty and "date" in df_city.columns:
-            df_trend = df_city[df_city["district_clean"].str.lower() == clean_district_base.lower()].copy()
+            df_trend = district_city_rows(city_stats, clean_district_base).copy()
             if not df_trend.empty:
                 df_trend["date"] = pd.to_datetime(df_trend["date"], errors="coerce")
                 df_trend = df_trend[df_trend["date"].notna()].sort_values("date")
@@ -919,7 +947,7 @@ def generate_district_narrative(
     cycle_section = ""
     try:
         if not df_city.empty and "date" in df_city.columns:
-            df_cycle = df_city[df_city["district_clean"].str.lower() == clean_district_base.lower()].copy()
+            df_cycle = district_city_rows(city_stats, clean_district_base).copy()
             if not df_cycle.empty:
                 df_cycle["date"] = pd.to_datetime(df_cycle["date"], errors="coerce")
                 df_cycle = df_cycle[df_cycle["date"].notna()].sort_values("date")
@@ -23,7 +23,7 @@ def find_nearby_districts(df, city, district, n=4):
 
     # متوسط السعر لكل حي
     district_prices = (
-        city_df.groupby("district")["price_per_sqm"]
+        city_df.groupby("district", observed=True)["price_per_sqm"]
         .mean()
         .reset_index()
     )
@@ -7,15 +7,18 @@
 import os
 import pandas as pd
 import json
+import hashlib
 import numpy as np
-import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
 from advanced_charts import AdvancedCharts
-from report_pdf_generator import create_pdf_from_content
-from district_narrative_engine import generate_district_narrative
+from report_pdf_generator import create_pdf_from_content, register_arabic_font, warm_up_chart_export, RenderedChart
+from district_narrative_engine import generate_district_narrative, city_district_stats
 from district_ranking_engine import rank_districts
 from multi_product_engine import generate_product_matrix, PROPERTY_TYPES, PRODUCT_TYPES
+from data_repository import get_repository
 
 
 # -----------------------------------------
@@ -54,6 +57,23 @@ REPORT_PACKAGES = {
 }
 
 
+# -----------------------------------------
+# التشغيل المتوازي للمصنع
+# -----------------------------------------
+
+# عدد العمال الافتراضي (عامل لكل نواة) - 1 يعني تشغيل تسلسلي بدون Pool
+# ⚠️ داخل خادم متعدد الخيوط (Streamlit) مرر workers=1
+FACTORY_WORKERS = os.cpu_count() or 1
+
+# إعادة تدوير العامل بعد هذا العدد من التقارير (يحد من تراكم ذاكرة plotly / kaleido)
+REPORTS_PER_WORKER = 50
+
+
+# نسخة قالب التقارير - تُرفع عند تغيير النص السردي أو الرسوم أو تصميم PDF
+# (كل التقارير تُعاد عندها لأن بصمة المدخلات تتغير)
+REPORT_TEMPLATE_VERSION = "1"
+
+
 # -----------------------------------------
 # تنظيف اسم الحي
 # -----------------------------------------
@@ -68,26 +88,11 @@ def extract_district_name(text):
 # البحث الدقيق عن الحي (محسّن بشكل احترافي مع حماية كاملة)
 # -----------------------------------------
 
-def get_district_data(city_data, district_name):
-    """البحث الدقيق عن بيانات الحي مع حماية كاملة من الأخطاء"""
-    
-    # تنظيف المدخلات وحماية إضافية
-    clean_district = district_name.strip().lower()
-    
-    # التأكد من وجود العمود
-    if "clean_name" not in city_data.columns:
-        print(f"⚠️ Warning: clean_name column not found")
-        return pd.DataFrame()
-    
-    # ✅ FIXED: معالجة NaN بشكل صحيح (الأول fillna ثم strip)
-    try:
-        district_data = city_data[
-            city_data["clean_name"].fillna("").str.strip() == clean_district
-        ]
-        return district_data
-    except Exception as e:
-        print(f"⚠️ Error in district search: {e}")
-        return pd.DataFrame()
+def build_district_index(city_data):
+    """مواقع صفوف كل حي: clean_name (بعد strip) → مواقع الصفوف بترتيبها الأصلي"""
+    return city_data.groupby(
+        city_data["clean_name"].fillna("").str.strip(), sort=False
+    ).indices
 
 
 # -----------------------------------------
@@ -135,8 +140,9 @@ def ensure_directories():
 # حفظ بيانات التعريف (Metadata) للتقارير
 # -----------------------------------------
 
-def save_report_metadata(city, district, package_level, file_name, metrics, property_type, product_type, product_title):
-    """حفظ بيانات تعريفية لكل تقرير لتجنب الاعتماد على اسم الملف"""
+def save_report_metadata(city, district, package_level, file_name, metrics, property_type, product_type, product_title,
+                         input_hash=None):
+    """حفظ بيانات تعريفية لكل تقرير لتجنب الاعتماد على اسم الملف (مع بصمة مدخلاته)"""
     
     # ✅ FIXED: إضافة timestamp لتفادي الكتابة فوق الملفات
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -159,7 +165,9 @@ def save_report_metadata(city, district, package_level, file_name, metrics, prop
             "avg_price": round(float(metrics.get("avg_price", 0) or 0), 2),
             "transactions": metrics.get("transactions", 0),
             "dpi_score": metrics.get("dpi_score", 0)
-        }
+        },
+        "input_hash": input_hash,
+        "template_version": REPORT_TEMPLATE_VERSION
     }
     
     # حفظ كملف JSON منفصل مع timestamp
@@ -241,106 +249,132 @@ def get_active_districts(city_data):
 
 
 # -----------------------------------------
-# إنشاء تقرير حي واحد (محسّن بشكل نهائي مع حماية كاملة)
+# بصمة مدخلات التقرير (ذاكرة تقارير حسب المحتوى)
 # -----------------------------------------
 
-def generate_single_report(
-        city,
-        district,
-        city_data,
-        charts_engine,
+def city_median_price_per_sqm(city_data):
+    """وسيط سعر المتر للمدينة من الصفقات الصالحة فقط (مساحة وسعر موجبان)"""
+    valid_city = city_data[
+        (city_data["price"].notna()) &
+        (city_data["area"].notna()) &
+        (city_data["area"] > 0)
+    ].copy()
+    
+    valid_city = valid_city[(valid_city["area"] > 0) & (valid_city["price"] > 0)]
+    valid_city["price_per_sqm"] = valid_city["price"] / valid_city["area"].replace(0, 1)
+    
+    # 🔥 FINAL FIX: معالجة القيم اللانهائية و NaN للمدينة
+    city_price_series = valid_city["price_per_sqm"].replace([np.inf, -np.inf], np.nan).dropna()
+    return city_price_series.median() if not city_price_series.empty else 0
+
+
+def district_data_hash(district_data):
+    """
+    بصمة صفقات الحي مستقلة عن ترتيب الصفوف
+    (إضافة صفقات لأحياء أخرى أو إعادة ترتيب الملف لا تغيرها)
+    """
+    if district_data.empty:
+        return "empty"
+    columns = sorted(district_data.columns)
+    row_hashes = np.sort(pd.util.hash_pandas_object(district_data[columns], index=False).to_numpy())
+    digest = hashlib.sha1(",".join(columns).encode("utf-8"))
+    digest.update(row_hashes.tobytes())
+    return digest.hexdigest()
+
+
+def reference_data_hash(repository=None):
+    """
+    بصمة الجداول المرجعية التي يقرأها كل تقرير (المشاريع والأحياء من المستودع)
+    من محتوى الجداول نفسها وليس رقم نسخة المستودع، فتبقى ثابتة بين العمليات والتشغيلات
+    """
+    repository = repository or get_repository()
+    digest = hashlib.sha1()
+    for name in ("projects", "districts"):
+        frame = repository.snapshot(name).frame
+        digest.update(name.encode("utf-8"))
+        if frame is None or frame.empty:
+            digest.update(b"empty")
+            continue
+        digest.update(",".join(map(str, frame.columns)).encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def report_input_hash(district_hash, city_figures, package_level, property_type, product_type,
+                      reference_hash=None):
+    """
+    بصمة كل مدخلات تقرير واحد: بيانات الحي، أرقام المدينة كما يطبعها التقرير
+    (CityContext.report_figures)، بصمة جداول المشاريع والأحياء، الباقة، نوع العقار، نوع المنتج، ونسخة القالب
+    """
+    key = json.dumps([
+        district_hash,
+        city_figures,
+        reference_hash,
         package_level,
-        property_type="شقة",
-        product_type="investment"):
-
+        property_type,
+        product_type,
+        REPORT_TEMPLATE_VERSION
+    ], ensure_ascii=False)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def is_report_current(item, package_level, input_hash):
+    """التقرير موجود وبصمة مدخلاته المحفوظة تطابق البصمة الحالية"""
+    if not os.path.exists(report_file_path(item, package_level)):
+        return False
+
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    latest_file = os.path.join(
+        BASE_DIR,
+        f"reports_store/metadata/{item['city']}_{item['district']}_{item['property_type']}_{item['product_type']}_{package_level}_latest.json"
+    )
     try:
-        # استخدام البحث الدقيق مع حماية إضافية
-        district_data = get_district_data(city_data, district)
-
-        # 🔥 تنظيف اسم المدينة والحي بشكل صحيح - معالجة NaN
-        import pandas as pd
-        
-        # ✅ التعديل الصحيح النهائي لاسم المدينة (يعمل مع كل المدن)
-        if pd.isna(city) or not city or len(str(city).strip()) <= 1:
-            # نحاول أخذ اسم المدينة من البيانات نفسها
-            if "city" in city_data.columns and not city_data.empty:
-                city = str(city_data["city"].iloc[0]).strip()
-            else:
-                city = "غير محدد"
-        else:
-            city = str(city).strip()
-        
-        if pd.isna(district) or not district:
-            district = "غير محدد"
-        
-        district = str(district).strip()
-
-        # 🔥 التعديل: قبول أي حي حتى لو صفقة واحدة
-        if len(district_data) < 1:
-            error_msg = f"No data available for this district"
-            print(f"      ⚠️ {district}: {error_msg}")
-            log_error(city, district, error_msg)
-            return None
-
-        valid = district_data[
-            (district_data["price"].notna()) &
-            (district_data["area"].notna()) &
-            (district_data["area"] > 0)
-        ]
-
-        # 🔥 التعديل: تخفيف الشرط إلى صفقة واحدة صالحة على الأقل
-        if len(valid) < 1:
-            error_msg = f"No valid transactions (all have area=0 or missing data)"
-            print(f"      ⚠️ {district}: {error_msg}")
-            log_error(city, district, error_msg)
-            return None
-
-        # 🔥 تنظيف إضافي قوي قبل أي استخدام
-        valid = valid[(valid["area"] > 0) & (valid["price"] > 0)]
-
-        # 🔥 الحل النهائي لمشكلة القسمة على صفر والقيم اللانهائية
-        valid = valid.copy()
-        valid["price_per_sqm"] = valid["price"] / valid["area"].replace(0, 1)
-        
-        # 🔥 FINAL FIX: معالجة القيم اللانهائية و NaN للحي
-        district_price_series = valid["price_per_sqm"].replace([np.inf, -np.inf], np.nan).dropna()
-        district_price = district_price_series.median() if not district_price_series.empty else 0
-
-        valid_city = city_data[
-            (city_data["price"].notna()) &
-            (city_data["area"].notna()) &
-            (city_data["area"] > 0)
-        ].copy()
-        
-        valid_city = valid_city[(valid_city["area"] > 0) & (valid_city["price"] > 0)]
-        valid_city["price_per_sqm"] = valid_city["price"] / valid_city["area"].replace(0, 1)
-        
-        # 🔥 FINAL FIX: معالجة القيم اللانهائية و NaN للمدينة
-        city_price_series = valid_city["price_per_sqm"].replace([np.inf, -np.inf], np.nan).dropna()
-        city_price = city_price_series.median() if not city_price_series.empty else 0
+        with open(latest_file, "r", encoding="utf-8") as f:
+            return json.load(f).get("input_hash") == input_hash
+    except (OSError, ValueError):
+        return False
 
-        transactions = len(district_data)
 
-        dpi = min(95, 40 + transactions)
-
-        # الحصول على عنوان المنتج المناسب
-        product_title = ""
-        for p in PRODUCT_TYPES:
-            if p["key"] == product_type:
-                product_title = p["title"]
-                break
+# -----------------------------------------
+# سياق المدينة (يُبنى مرة واحدة لكل مدينة ويُمرر لكل تقرير)
+# -----------------------------------------
 
-        user_info = {
-            "city_name": city if city else "غير محدد",
-            "district_name": district if district else "غير محدد",
-            "property_type": property_type,
-            # 🔥 FINAL FIX: تحويل القيم إلى float مع التأكد من عدم وجود None
-            "district_avg_price": round(float(district_price or 0), 2),
-            "city_avg_price": round(float(city_price or 0), 2),
-            "transactions_count": transactions,
-            "dpi_score": dpi,
-            "total_transactions": transactions
-        }
+def add_clean_names(city_data):
+    """عمود clean_name: اسم الحي بعد "/" بحروف صغيرة (مفتاح البحث الدقيق عن الحي)"""
+    city_data = city_data.copy()
+    city_data["clean_name"] = (
+        city_data["district"]
+        .astype(str)
+        .str.split("/")
+        .str[-1]
+        .str.strip()
+        .str.lower()
+    )
+    return city_data
+
+
+class CityContext:
+    """
+    كل ما يتكرر بين تقارير مدينة واحدة محسوب مرة واحدة:
+    - data: بيانات المدينة مع clean_name
+    - safe_data: البيانات المنظفة التي تُرسل للنص السردي والرسوم
+    - city_price: وسيط سعر المتر للمدينة
+    - district_rows: مواقع صفوف كل حي (clean_name → مواقع) لقص بيانات الحي مباشرة
+    - chart_frame: safe_data بعد توحيد أعمدة محرك الرسوم
+    - district_stats / comparison: إحصاءات أحياء المدينة وجدول رسم المقارنة (أرقام المدينة في كل تقرير)
+      تُمرر كما هي للنص السردي والرسوم فلا يُعاد حسابها لكل حي أو نوع عقار
+    - ranking: تصنيف الأحياء (يُضاف من المصنع)
+    """
+
+    def __init__(self, city, city_data, charts_engine=None):
+        self.city = city
+        if "clean_name" not in city_data.columns:
+            city_data = add_clean_names(city_data)
+        self.data = city_data
+        self.ranking = None
+
+        self.city_price = city_median_price_per_sqm(city_data)
+        self.district_rows = build_district_index(city_data)
 
         # 🔥 ULTIMATE FIX: تنظيف قاتل للبيانات قبل إرسالها لأي دالة داخلية
         safe_data = city_data[
@@ -351,57 +385,242 @@ def generate_single_report(
         ].copy()
         
         # 🔥 تنظيف نهائي يمنع أي خطأ قسمة على صفر في الدوال الداخلية
-        safe_data = safe_data.copy()
         safe_data["area"] = safe_data["area"].replace(0, 1)  # استبدال أي مساحة = 0 بالقيمة 1
         safe_data["price"] = safe_data["price"].replace(0, 1)  # استبدال أي سعر = 0 بالقيمة 1
-        safe_data = safe_data.dropna(subset=["price", "area"])  # إزالة أي صفوف فيها NaN
+        self.safe_data = safe_data.dropna(subset=["price", "area"])  # إزالة أي صفوف فيها NaN
 
-        # 🔥 CRITICAL FIX: حماية الدوال الداخلية باستخدام try/except
-        # حتى لو فشلت، التقرير يكتمل
-        
-        # توليد النص السردي مع حماية كاملة
-        # ✅ التعديل النهائي: إرسال user_info إلى district_metrics بدلاً من القاموس الفارغ
+        charts_engine = charts_engine or AdvancedCharts()
+        self.chart_frame = charts_engine.prepare_market_frame(self.safe_data)
+
+        # أرقام المدينة التي يطبعها كل تقرير: ترتيب الأحياء في النص السردي وجدول رسم المقارنة
+        self.district_stats = city_district_stats(self.safe_data, city)
         try:
-            report_text = generate_district_narrative(
-                user_info=user_info,
-                district_metrics=user_info,  # ✅ FIXED: إرسال البيانات الصحيحة بدلاً من {}
-                nearby_districts=[],
-                dpi_score=dpi,
-                market_data=safe_data,
-                real_data=safe_data
-            )
+            self.comparison = charts_engine.district_comparison_table(self.chart_frame)
         except Exception as e:
-            print(f"      ⚠️ Narrative generation failed for {district}: {e}")
-            report_text = "لا يوجد تحليل متاح حالياً لهذا الحي بسبب نقص البيانات."
-            log_error(city, district, f"Narrative error: {str(e)}")
+            print(f"⚠️ District comparison unavailable for {city}: {e}")
+            self.comparison = None
+
+    def district_data(self, district_name):
+        """بيانات الحي (مطابقة دقيقة لـ clean_name بعد strip وlower) من مواقعه المحفوظة بدون مسح المدينة"""
+        positions = self.district_rows.get(str(district_name).strip().lower())
+        if positions is None:
+            return self.data.iloc[0:0]
+        return self.data.iloc[positions]
+
+    def report_figures(self, district_name):
+        """
+        أرقام المدينة كما يطبعها تقرير الحي وبنفس دقتها (تدخل في بصمة المدخلات):
+        متوسط المدينة، رسم مقارنة الأحياء، أكثر 5 أحياء نشاطاً وحصصها، وترتيب الحي سعراً وسيولة
+        """
+        base = str(district_name).split("/")[-1].strip()
+        total = self.district_stats["total"]
+        counts = self.district_stats["transactions_by_district"]
+        prices = self.district_stats["price_by_district"]
+
+        comparison = []
+        if self.comparison is not None:
+            comparison = [
+                [str(name), int(round(float(value)))]
+                for name, value in zip(self.comparison["district"], self.comparison["price_per_sqm"])
+            ]
+        top_districts = [
+            [str(name), int(count), round(count / total * 100, 1) if total > 0 else 0]
+            for name, count in counts.sort_values(ascending=False).head(5).items()
+        ]
+        price_rank = [prices.index.get_loc(base) + 1, len(prices)] if base in prices.index else None
+        liquidity_rank = (
+            [counts.index.get_loc(base) + 1, len(counts), int(counts[base])] if base in counts.index else None
+        )
+        return [
+            round(float(self.city_price or 0), 2),
+            comparison,
+            top_districts,
+            price_rank,
+            liquidity_rank,
+        ]
+
+
+# -----------------------------------------
+# حسابات الحي المشتركة بين المنتجات (محسّن بشكل نهائي مع حماية كاملة)
+# -----------------------------------------
 
+def prepare_report_artifacts(
+        city,
+        district,
+        city_context,
+        charts_engine,
+        property_type="شقة",
+        chart_cache=None):
+    """
+    الحسابات الثقيلة لتقارير (حي، نوع عقار) - مشتركة بين كل أنواع المنتجات والباقات:
+    بيانات الحي، متوسطات السعر، النص السردي، والرسوم مُصدّرة إلى صور مرة واحدة
+    city_context: سياق المدينة (CityContext) - المعالجة هنا على صفوف الحي فقط
+    chart_cache: قاموس اختياري يحفظ رسوم الحي (لا تعتمد على نوع العقار) بين المجموعات
+    يعيد قاموس المكونات أو None إذا لم تكفِ البيانات
+    """
+    city_data = city_context.data
+
+    # البحث الدقيق عن الحي من مواقعه المحفوظة في سياق المدينة
+    district_data = city_context.district_data(district)
+
+    # ✅ التعديل الصحيح النهائي لاسم المدينة (يعمل مع كل المدن)
+    if pd.isna(city) or not city or len(str(city).strip()) <= 1:
+        # نحاول أخذ اسم المدينة من البيانات نفسها
+        if "city" in city_data.columns and not city_data.empty:
+            city = str(city_data["city"].iloc[0]).strip()
+        else:
+            city = "غير محدد"
+    else:
+        city = str(city).strip()
+    
+    if pd.isna(district) or not district:
+        district = "غير محدد"
+    
+    district = str(district).strip()
+
+    # 🔥 التعديل: قبول أي حي حتى لو صفقة واحدة
+    if len(district_data) < 1:
+        error_msg = f"No data available for this district"
+        print(f"      ⚠️ {district}: {error_msg}")
+        log_error(city, district, error_msg)
+        return None
+
+    valid = district_data[
+        (district_data["price"].notna()) &
+        (district_data["area"].notna()) &
+        (district_data["area"] > 0)
+    ]
+
+    # 🔥 التعديل: تخفيف الشرط إلى صفقة واحدة صالحة على الأقل
+    if len(valid) < 1:
+        error_msg = f"No valid transactions (all have area=0 or missing data)"
+        print(f"      ⚠️ {district}: {error_msg}")
+        log_error(city, district, error_msg)
+        return None
+
+    # 🔥 تنظيف إضافي قوي قبل أي استخدام
+    valid = valid[(valid["area"] > 0) & (valid["price"] > 0)]
+
+    # 🔥 الحل النهائي لمشكلة القسمة على صفر والقيم اللانهائية
+    valid = valid.copy()
+    valid["price_per_sqm"] = valid["price"] / valid["area"].replace(0, 1)
+    
+    # 🔥 FINAL FIX: معالجة القيم اللانهائية و NaN للحي
+    district_price_series = valid["price_per_sqm"].replace([np.inf, -np.inf], np.nan).dropna()
+    district_price = district_price_series.median() if not district_price_series.empty else 0
+
+    city_price = city_context.city_price
+
+    transactions = len(district_data)
+
+    dpi = min(95, 40 + transactions)
+
+    user_info = {
+        "city_name": city if city else "غير محدد",
+        "district_name": district if district else "غير محدد",
+        "property_type": property_type,
+        # 🔥 FINAL FIX: تحويل القيم إلى float مع التأكد من عدم وجود None
+        "district_avg_price": round(float(district_price or 0), 2),
+        "city_avg_price": round(float(city_price or 0), 2),
+        "transactions_count": transactions,
+        "dpi_score": dpi,
+        "total_transactions": transactions
+    }
+
+    # البيانات المنظفة محسوبة مرة واحدة في سياق المدينة
+    safe_data = city_context.safe_data
+
+    # 🔥 CRITICAL FIX: حماية الدوال الداخلية باستخدام try/except
+    # حتى لو فشلت، التقرير يكتمل
+    
+    # توليد النص السردي مع حماية كاملة
+    # ✅ التعديل النهائي: إرسال user_info إلى district_metrics بدلاً من القاموس الفارغ
+    try:
+        report_text = generate_district_narrative(
+            user_info=user_info,
+            district_metrics=user_info,  # ✅ FIXED: إرسال البيانات الصحيحة بدلاً من {}
+            nearby_districts=[],
+            dpi_score=dpi,
+            market_data=safe_data,
+            real_data=safe_data,
+            city_stats=city_context.district_stats
+        )
+    except Exception as e:
+        print(f"      ⚠️ Narrative generation failed for {district}: {e}")
+        report_text = "لا يوجد تحليل متاح حالياً لهذا الحي بسبب نقص البيانات."
+        log_error(city, district, f"Narrative error: {str(e)}")
+
+    # الرسوم لا تعتمد على نوع العقار: تُحسب وتُصدّر مرة واحدة لكل حي
+    chart_key = (city, district)
+    if chart_cache is not None and chart_key in chart_cache:
+        charts_by_chapter = chart_cache[chart_key]
+    else:
         # توليد الرسوم البيانية مع حماية كاملة
         try:
             charts = charts_engine.generate_all_district_charts(
-                safe_data,
-                district
+                city_context.chart_frame,
+                district,
+                prepared=True,
+                comparison=city_context.comparison
             )
         except Exception as e:
             print(f"      ⚠️ Charts generation failed for {district}: {e}")
             charts = {}
             log_error(city, district, f"Charts error: {str(e)}")
 
-        # تجهيز الرسوم حسب الفصول (مع التأكد من وجود القيم)
+        # تجهيز الرسوم حسب الفصول (مع التأكد من وجود القيم) - مُصدّرة إلى صور جاهزة
         charts_by_chapter = {
-            "chapter_4": [charts.get("price_trend")] if charts.get("price_trend") else [],
-            "chapter_7": [charts.get("district_comparison")] if charts.get("district_comparison") else [],
-            "chapter_11": [charts.get("transactions_over_time")] if charts.get("transactions_over_time") else [],
-            "chapter_16": [charts.get("price_distribution")] if charts.get("price_distribution") else [],
-            "chapter_21": [charts.get("property_type_analysis")] if charts.get("property_type_analysis") else [],
+            "chapter_4": [RenderedChart(charts.get("price_trend"))] if charts.get("price_trend") else [],
+            "chapter_7": [RenderedChart(charts.get("district_comparison"))] if charts.get("district_comparison") else [],
+            "chapter_11": [RenderedChart(charts.get("transactions_over_time"))] if charts.get("transactions_over_time") else [],
+            "chapter_16": [RenderedChart(charts.get("price_distribution"))] if charts.get("price_distribution") else [],
+            "chapter_21": [RenderedChart(charts.get("property_type_analysis"))] if charts.get("property_type_analysis") else [],
         }
+        if chart_cache is not None:
+            # نحتفظ برسوم آخر حي فقط (المجموعات مرتبة حسب الحي)
+            chart_cache.clear()
+            chart_cache[chart_key] = charts_by_chapter
 
-        # توليد PDF مع حماية إضافية
+    return {
+        "city": city,
+        "district": district,
+        "property_type": property_type,
+        "user_info": user_info,
+        "report_text": report_text,
+        "charts_by_chapter": charts_by_chapter,
+        "metrics": {
+            "avg_price": district_price,
+            "transactions": transactions,
+            "dpi_score": dpi
+        }
+    }
+
+
+# -----------------------------------------
+# إخراج تقرير منتج واحد من المكونات المشتركة
+# -----------------------------------------
+
+def render_product_report(artifacts, package_level, product_type="investment", input_hash=None):
+    """بناء PDF منتج واحد (باقة × نوع منتج) من مكونات الحي الجاهزة وحفظه مع بيانات التعريف"""
+    city = artifacts["city"]
+    district = artifacts["district"]
+    property_type = artifacts["property_type"]
+
+    try:
+        # الحصول على عنوان المنتج المناسب
+        product_title = ""
+        for p in PRODUCT_TYPES:
+            if p["key"] == product_type:
+                product_title = p["title"]
+                break
+
+        # توليد PDF مع حماية إضافية (نسخة من user_info لأن المولد يضيف إليها)
         try:
             pdf_buffer = create_pdf_from_content(
-                user_info=user_info,
-                content_text=report_text,
+                user_info=dict(artifacts["user_info"]),
+                content_text=artifacts["report_text"],
                 executive_decision="",
-                charts_by_chapter=charts_by_chapter,
+                charts_by_chapter=artifacts["charts_by_chapter"],
                 package_level=package_level
             )
         except Exception as e:
@@ -417,12 +636,8 @@ def generate_single_report(
             f.write(pdf_buffer.getvalue())
         
         # حفظ بيانات التعريف (Metadata)
-        metrics = {
-            "avg_price": district_price,
-            "transactions": transactions,
-            "dpi_score": dpi
-        }
-        save_report_metadata(city, district, package_level, file_name, metrics, property_type, product_type, product_title)
+        save_report_metadata(city, district, package_level, file_name, artifacts["metrics"], property_type, product_type, product_title,
+                             input_hash=input_hash)
         
         print(f"      ✅ {district} - {property_type} - {product_title} - {REPORT_PACKAGES[package_level]['price']}$")
         
@@ -436,11 +651,228 @@ def generate_single_report(
         return None
 
 
+# -----------------------------------------
+# إنشاء تقرير حي واحد (محسّن بشكل نهائي مع حماية كاملة)
+# -----------------------------------------
+
+def generate_single_report(
+        city,
+        district,
+        city_data,
+        charts_engine,
+        package_level,
+        property_type="شقة",
+        product_type="investment"):
+
+    try:
+        # استدعاء مستقل (خارج المصنع): سياق المدينة يُبنى لهذا التقرير فقط
+        city_context = CityContext(city, city_data, charts_engine)
+        artifacts = prepare_report_artifacts(city, district, city_context, charts_engine, property_type)
+        if artifacts is None:
+            return None
+        return render_product_report(artifacts, package_level, product_type)
+        
+    except Exception as e:
+        error_msg = f"Unexpected error: {str(e)}"
+        print(f"      ❌ {district}: {error_msg}")
+        # 🔥 استخدام log_error المعدلة
+        log_error(city, district, error_msg)
+        return None
+
+
+# -----------------------------------------
+# تقارير مجموعة (حي، نوع عقار) بحساب مشترك واحد
+# -----------------------------------------
+
+def generate_report_group(items, city_context, charts_engine, package_level, chart_cache=None):
+    """
+    كل منتجات (حي، نوع عقار) في باقة واحدة: الحسابات مرة واحدة ثم PDF لكل نوع منتج
+    يعيد قائمة مسارات التقارير (None للتقرير الفاشل) بنفس ترتيب items
+    """
+    first = items[0]
+    try:
+        artifacts = prepare_report_artifacts(
+            first["city"], first["district"], city_context, charts_engine,
+            first["property_type"], chart_cache=chart_cache
+        )
+    except Exception as e:
+        error_msg = f"Unexpected error: {str(e)}"
+        print(f"      ❌ {first['district']}: {error_msg}")
+        log_error(first["city"], first["district"], error_msg)
+        artifacts = None
+
+    if artifacts is None:
+        return [None] * len(items)
+    return [
+        render_product_report(artifacts, package_level, item["product_type"], input_hash=item.get("input_hash"))
+        for item in items
+    ]
+
+
+# -----------------------------------------
+# عمال المصنع (تهيئة مسبقة مرة واحدة لكل عامل)
+# -----------------------------------------
+
+_worker_state = {}
+
+
+def _new_worker_state(city_context):
+    """حالة توليد جديدة: سياق المدينة، محرك الرسوم، ذاكرة رسوم الأحياء، مع تهيئة الخط ومحرك تصدير الصور"""
+    state = {
+        "city_context": city_context,
+        "charts_engine": AdvancedCharts(),
+        "chart_cache": {},
+    }
+    try:
+        register_arabic_font()
+        warm_up_chart_export()
+    except Exception as e:
+        # التقرير نفسه سيعيد المحاولة ويسجل الخطأ إن استمر
+        print(f"⚠️ Worker warm-up failed: {e}")
+    return state
+
+
+def _init_factory_worker(city_context):
+    """تهيئة العامل المنفصل (spawn) مرة واحدة - الحالة العامة خاصة بعمليات العمال فقط"""
+    _worker_state.update(_new_worker_state(city_context))
+
+
+def _generate_district_task(task, state=None):
+    """
+    مهمة حي كامل: مجموعة لكل نوع عقار (حساب مشترك واحد ثم PDF لكل منتج)
+    كل أنواع العقار في نفس العامل، فرسوم الحي وصورها تُبنى مرة واحدة للحي
+    state: حالة التوليد المحلية للمسار التسلسلي (الافتراضي حالة العامل المهيأ)
+    تعيد [(رقم المنتج، مسار التقرير أو None)]
+    """
+    if state is None:
+        state = _worker_state
+    groups, package_level = task
+    indexed_results = []
+    for indexed_items in groups:
+        items = [item for _, item in indexed_items]
+        print(f"📄 Generating: {items[0]['district']} - {items[0]['property_type']} ({len(items)} products)")
+        results = generate_report_group(
+            items,
+            city_context=state["city_context"],
+            charts_engine=state["charts_engine"],
+            package_level=package_level,
+            chart_cache=state["chart_cache"]
+        )
+        indexed_results.extend((index, result) for (index, _), result in zip(indexed_items, results))
+    return indexed_results
+
+
+def report_file_path(item, package_level):
+    """مسار ملف التقرير المتوقع لمنتج من مصفوفة المنتجات"""
+    file_name = f"{item['city']}_{item['district']}_{item['property_type']}_{item['product_type']}_{package_level}.pdf"
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(BASE_DIR, f"reports_store/{package_level}/{file_name}")
+
+
+def generate_package_reports(city_context, districts, package_level, label,
+                             workers=FACTORY_WORKERS, reports_per_worker=REPORTS_PER_WORKER):
+    """
+    توليد تقارير باقة واحدة لقائمة أحياء (25 منتج لكل حي)
+    - التقارير الموجودة التي لم تتغير بصمة مدخلاتها تُتخطى (استكمال بعد الانقطاع،
+      وبعد تحديث البيانات يُعاد فقط ما تغيرت صفقات حيه)
+    - المنتجات تُجمع حسب (الحي، نوع العقار): حساب مشترك واحد لكل 5 منتجات
+    - مهمة العامل = حي كامل (كل أنواع العقار) حتى تُبنى رسوم الحي مرة واحدة
+    - workers > 1: مجموعة عمال مهيأة مسبقاً (spawn)، وكل عامل يُعاد تدويره بعد reports_per_worker تقرير
+      إذا انهار عامل (مثلاً قتله نظام الذاكرة) تتوقف المجموعة بخطأ ويُكمل الباقي بالتسلسل
+    - workers = 1: نفس التوليد بالتسلسل داخل العملية الحالية
+    يعيد (المولدة، الفاشلة، المتخطاة)
+    """
+    # ✅ استخدام dict.fromkeys للحفاظ على الترتيب مع إزالة التكرار
+    unique_districts = list(dict.fromkeys(districts))
+    products = generate_product_matrix([city_context.city], unique_districts)
+    total_products = len(products)
+
+    # بصمات المدخلات: صفقات كل حي + أرقام المدينة التي يطبعها تقريره (مرة واحدة لكل حي)
+    district_hashes = {
+        district: district_data_hash(city_context.district_data(district))
+        for district in unique_districts
+    }
+    district_figures = {district: city_context.report_figures(district) for district in unique_districts}
+    # تحديث ملف المشاريع أو الأحياء يغير خرائط ونصوص كل التقارير
+    reference_hash = reference_data_hash()
+
+    generated = failed = skipped = 0
+    groups = {}
+    for idx, item in enumerate(products, 1):
+        item["input_hash"] = report_input_hash(
+            district_hashes[item["district"]], district_figures[item["district"]],
+            package_level, item["property_type"], item["product_type"],
+            reference_hash=reference_hash
+        )
+        # إذا التقرير موجود ومدخلاته لم تتغير → تخطيه
+        if is_report_current(item, package_level, item["input_hash"]):
+            print(f"⏭️ [{idx}/{total_products}] Skipping unchanged report: {os.path.basename(report_file_path(item, package_level))}")
+            skipped += 1
+            continue
+        # المنتجات الناقصة تُجمع حسب الحي ثم نوع العقار لتتشارك نفس الحسابات
+        district_groups = groups.setdefault(item["district"], {})
+        district_groups.setdefault(item["property_type"], []).append((idx, item))
+    tasks = [(list(district_groups.values()), package_level) for district_groups in groups.values()]
+
+    done = set()
+
+    def record(index, result):
+        nonlocal generated, failed
+        done.add(index)
+        if result:
+            generated += 1
+        else:
+            failed += 1
+        completed = skipped + len(done)
+        # عرض التقدم كل 10 تقارير
+        if completed % 10 == 0:
+            print(f"   📊 Progress: {completed}/{total_products} reports processed for {label} districts")
+
+    workers = max(1, min(workers or 1, len(tasks)))
+    if workers > 1:
+        try:
+            # spawn: العامل يبدأ نظيفاً (بدون نسخ خيوط العملية الأم كما في fork)
+            # وانهيار أي عامل يرفع BrokenProcessPool بدل الانتظار للأبد
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_factory_worker,
+                initargs=(city_context,),
+                # كل مهمة حي كامل (حتى 25 تقرير) - التدوير يبقى بعد ~reports_per_worker تقرير
+                max_tasks_per_child=max(1, reports_per_worker // (len(PRODUCT_TYPES) * len(PROPERTY_TYPES)))
+            ) as executor:
+                futures = [executor.submit(_generate_district_task, task) for task in tasks]
+                for future in as_completed(futures):
+                    for index, result in future.result():
+                        record(index, result)
+        except Exception as e:
+            # بيئات لا تسمح بإنشاء عمليات فرعية أو عامل انهار - نكمل الباقي بالتسلسل
+            print(f"⚠️ Worker pool unavailable ({e}) - continuing serially")
+
+    remaining = []
+    for district_groups, package_level in tasks:
+        pending = [
+            [(index, item) for index, item in indexed_items if index not in done]
+            for indexed_items in district_groups
+        ]
+        pending = [indexed_items for indexed_items in pending if indexed_items]
+        if pending:
+            remaining.append((pending, package_level))
+    if remaining:
+        # حالة محلية: العملية الحالية (مثل Streamlit) لا تحتفظ بسياق المدينة بعد انتهاء التوليد
+        state = _new_worker_state(city_context)
+        for task in remaining:
+            for index, result in _generate_district_task(task, state=state):
+                record(index, result)
+
+    return generated, failed, skipped
+
+
 # -----------------------------------------
 # المصنع الرئيسي للتقارير (محسّن بشكل نهائي مع حماية كاملة)
 # -----------------------------------------
 
-def generate_all_district_reports(df):
+def generate_all_district_reports(df, workers=FACTORY_WORKERS, reports_per_worker=REPORTS_PER_WORKER):
 
     print("\n" + "=" * 80)
     print("🚀 WARD INTELLIGENCE - DISTRICT REPORT FACTORY")
@@ -449,7 +881,7 @@ def generate_all_district_reports(df):
 
     ensure_directories()
 
-    charts_engine = AdvancedCharts()
+    print(f"⚙️ Workers: {workers} | Recycle after {reports_per_worker} reports")
 
     df = prepare_price_per_sqm(df)
 
@@ -480,20 +912,14 @@ def generate_all_district_reports(df):
 
         print("-" * 60)
 
-        # تحسين الأداء: إضافة clean_name مرة واحدة فقط لكل مدينة
-        city_data = city_data.copy()
-        city_data["clean_name"] = (
-            city_data["district"]
-            .astype(str)
-            .str.split("/")
-            .str[-1]
-            .str.strip()
-            .str.lower()
-        )
+        # تحسين الأداء: clean_name والبيانات المنظفة والوسيط ومواقع الأحياء مرة واحدة فقط لكل مدينة
+        city_context = CityContext(city, city_data)
+        city_data = city_context.data
 
         # تصنيف الأحياء باستخدام محرك التصنيف
         try:
             ranking = rank_districts(city_data)
+            city_context.ranking = ranking
             if ranking.empty:
                 print(f"⚠️ No ranking data for {city}")
                 continue
@@ -543,151 +969,26 @@ def generate_all_district_reports(df):
         print()
 
         # 1️⃣ أفضل الأحياء للاستثمار - تقارير Pro (29$)
-        if top_districts:
-            print(f"\n📈 Generating Pro Reports (29$) for Top Districts...")
-            # ✅ استخدام dict.fromkeys للحفاظ على الترتيب مع إزالة التكرار
-            unique_top = list(dict.fromkeys(top_districts))
-            products = generate_product_matrix(city, unique_top)
-            
-            total_products = len(products)
-            completed = 0
-            
-            for idx, item in enumerate(products, 1):
-                # اسم الملف المتوقع
-                file_name = f"{item['city']}_{item['district']}_{item['property_type']}_{item['product_type']}_pro.pdf"
-                BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # Changed from os.getcwd()
-                file_path = os.path.join(BASE_DIR, f"reports_store/pro/{file_name}")
-                
-                # إذا التقرير موجود بالفعل → تخطيه
-                if os.path.exists(file_path):
-                    print(f"⏭️ [{idx}/{total_products}] Skipping existing report: {file_name}")
-                    skipped_reports += 1
-                    completed += 1
-                    time.sleep(0.5)  # Delay بسيط حتى لو skip
-                    continue
-                
-                print(f"📄 [{idx}/{total_products}] Generating: {item['district']} - {item['property_type']} - {item['product_title']}")
-                
-                result = generate_single_report(
-                    city=item["city"],
-                    district=item["district"],
-                    city_data=city_data,
-                    charts_engine=charts_engine,
-                    package_level="pro",
-                    property_type=item["property_type"],
-                    product_type=item["product_type"]
-                )
-                if result:
-                    total_reports += 1
-                else:
-                    failed_reports += 1
-                
-                completed += 1
-                
-                # Delay بين التقارير لمنع overload و restart
-                time.sleep(1)
-                
-                # عرض التقدم كل 10 تقارير
-                if completed % 10 == 0:
-                    print(f"   📊 Progress: {completed}/{total_products} reports processed for Top districts")
-
         # 2️⃣ أرخص الأحياء - تقارير Basic (9$) - DISABLED FOR TESTING
-        if False:  # Changed from if cheap_districts: to disable
-            print(f"\n💰 Generating Basic Reports (9$) for Cheapest Districts...")
-            # ✅ استخدام dict.fromkeys للحفاظ على الترتيب مع إزالة التكرار
-            unique_cheap = list(dict.fromkeys(cheap_districts))
-            products = generate_product_matrix(city, unique_cheap)
-            
-            total_products = len(products)
-            completed = 0
-            
-            for idx, item in enumerate(products, 1):
-                # اسم الملف المتوقع
-                file_name = f"{item['city']}_{item['district']}_{item['property_type']}_{item['product_type']}_basic.pdf"
-                BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # Changed from os.getcwd()
-                file_path = os.path.join(BASE_DIR, f"reports_store/basic/{file_name}")
-                
-                # إذا التقرير موجود بالفعل → تخطيه
-                if os.path.exists(file_path):
-                    print(f"⏭️ [{idx}/{total_products}] Skipping existing report: {file_name}")
-                    skipped_reports += 1
-                    completed += 1
-                    time.sleep(0.5)  # Delay بسيط حتى لو skip
-                    continue
-                
-                print(f"📄 [{idx}/{total_products}] Generating: {item['district']} - {item['property_type']} - {item['product_title']}")
-                
-                result = generate_single_report(
-                    city=item["city"],
-                    district=item["district"],
-                    city_data=city_data,
-                    charts_engine=charts_engine,
-                    package_level="basic",
-                    property_type=item["property_type"],
-                    product_type=item["product_type"]
-                )
-                if result:
-                    total_reports += 1
-                else:
-                    failed_reports += 1
-                
-                completed += 1
-                
-                # Delay بين التقارير لمنع overload و restart
-                time.sleep(1)
-                
-                # عرض التقدم كل 10 تقارير
-                if completed % 10 == 0:
-                    print(f"   📊 Progress: {completed}/{total_products} reports processed for Cheapest districts")
-
         # 3️⃣ الأحياء الفاخرة - تقارير Premium (39$) - DISABLED FOR TESTING
-        if False:  # Changed from if expensive_districts: to disable
-            print(f"\n👑 Generating Premium Reports (39$) for Luxury Districts...")
-            # ✅ استخدام dict.fromkeys للحفاظ على الترتيب مع إزالة التكرار
-            unique_premium = list(dict.fromkeys(expensive_districts))
-            products = generate_product_matrix(city, unique_premium)
-            
-            total_products = len(products)
-            completed = 0
-            
-            for idx, item in enumerate(products, 1):
-                # اسم الملف المتوقع
-                file_name = f"{item['city']}_{item['district']}_{item['property_type']}_{item['product_type']}_premium.pdf"
-                BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # Changed from os.getcwd()
-                file_path = os.path.join(BASE_DIR, f"reports_store/premium/{file_name}")
-                
-                # إذا التقرير موجود بالفعل → تخطيه
-                if os.path.exists(file_path):
-                    print(f"⏭️ [{idx}/{total_products}] Skipping existing report: {file_name}")
-                    skipped_reports += 1
-                    completed += 1
-                    time.sleep(0.5)  # Delay بسيط حتى لو skip
-                    continue
-                
-                print(f"📄 [{idx}/{total_products}] Generating: {item['district']} - {item['property_type']} - {item['product_title']}")
-                
-                result = generate_single_report(
-                    city=item["city"],
-                    district=item["district"],
-                    city_data=city_data,
-                    charts_engine=charts_engine,
-                    package_level="premium",
-                    property_type=item["property_type"],
-                    product_type=item["product_type"]
-                )
-                if result:
-                    total_reports += 1
-                else:
-                    failed_reports += 1
-                
-                completed += 1
-                
-                # Delay بين التقارير لمنع overload و restart
-                time.sleep(1)
-                
-                # عرض التقدم كل 10 تقارير
-                if completed % 10 == 0:
-                    print(f"   📊 Progress: {completed}/{total_products} reports processed for Premium districts")
+        package_runs = [
+            ("pro", top_districts, "📈 Generating Pro Reports (29$) for Top Districts...", "Top"),
+            ("basic", [], "💰 Generating Basic Reports (9$) for Cheapest Districts...", "Cheapest"),  # Changed from cheap_districts to disable
+            ("premium", [], "👑 Generating Premium Reports (39$) for Luxury Districts...", "Premium"),  # Changed from expensive_districts to disable
+        ]
+
+        for package_level, districts, header, label in package_runs:
+            if not districts:
+                continue
+
+            print(f"\n{header}")
+            generated, failed, skipped = generate_package_reports(
+                city_context, districts, package_level, label,
+                workers=workers, reports_per_worker=reports_per_worker
+            )
+            total_reports += generated
+            failed_reports += failed
+            skipped_reports += skipped
 
     performance_metrics["end_time"] = datetime.now().isoformat()
     performance_metrics["total_reports"] = total_reports
@@ -703,7 +1004,7 @@ def generate_all_district_reports(df):
     print(f"⚡ Cities Processed: {performance_metrics['total_cities']}")
     print(f"📊 Districts Processed: {performance_metrics['total_districts']}")
     print(f"📁 New Reports Generated: {total_reports}")
-    print(f"⏭️ Existing Reports Skipped: {skipped_reports}")
+    print(f"⏭️ Unchanged Reports Skipped: {skipped_reports}")
     print(f"⚠️ Failed Reports: {failed_reports}")
     success_rate = round((total_reports/(total_reports+failed_reports))*100 if total_reports+failed_reports > 0 else 0, 1)
     print(f"✅ Success Rate (new reports): {success_rate}%")
@@ -801,10 +1102,10 @@ def generate_all_district_reports(df):
     print("   ✅ 🔧 DIRECTORY FIX: ensure_directories() now uses BASE_DIR for all folders (FIXED)")
     print("   ✅ 🔧 DIRECTORY FIX: All file operations use os.path.join() with BASE_DIR (FIXED)")
     print("   ✅ 🔧 UNIFIED PATHS: All paths now use os.path.dirname(os.path.abspath(__file__)) consistently (FIXED)")
-    print("   ✅ 🔄 RESUME CAPABILITY: Automatic skip of existing reports (NEW!)")
+    print("   ✅ 🔄 RESUME CAPABILITY: Reports keyed by input hash - only changed districts are rebuilt (NEW!)")
     print("   ✅ 📊 PROGRESS TRACKING: Detailed progress indicators every 10 reports (NEW!)")
     print("   ✅ ⏭️ SKIP COUNTER: Shows number of skipped existing reports (NEW!)")
-    print("   ✅ ⏱️ DELAY ADDED: 1 second delay between reports to prevent restart (NEW!)")
+    print(f"   ✅ ⚙️ WORKER POOL: {workers} pre-warmed workers, recycled every {reports_per_worker} reports (NEW!)")
     print("   ✅ 📁 PATH DISPLAY: Shows actual working directory at startup (NEW!)")
     
     print("\n" + "=" * 80)
@@ -821,7 +1122,7 @@ def generate_all_district_reports(df):
     print("🚀 TEST MODE: GENERATING REPORTS FOR 3 DISTRICTS ONLY (النفل, الياسمين, الملقا)!")
     print("💾 REPORTS SAVED INSIDE PROJECT FOLDER - WILL NOT BE LOST!")
     print("🔄 RESUME CAPABILITY: CAN CONTINUE AFTER INTERRUPTION!")
-    print("⏱️ DELAY ADDED: Prevents overload and restarts!")
+    print("⚙️ WORKER POOL: Scales with cores, memory bounded by worker recycling!")
     print("📁 WORKING DIRECTORY DISPLAYED AT STARTUP!")
     print("=" * 80)
     
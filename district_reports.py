@@ -4,7 +4,8 @@ import io
 from advanced_charts import AdvancedCharts
 from report_pdf_generator import create_pdf_from_content
 from district_narrative_engine import generate_district_narrative
-from government_data_provider import load_projects_data, load_districts_data  # ✅ إضافة جديدة
+from data_repository import get_repository  # ✅ الأحياء والمشاريع من المستودع المشترك
+from numeric_parser import parse_numeric
 
 
 def show_district_reports(df_raw):
@@ -30,8 +31,8 @@ def show_district_reports(df_raw):
     # =========================================
     # تحويل البيانات إلى أرقام فقط - بدون حذف أي صفقة
     # =========================================
-    city_data["price"] = pd.to_numeric(city_data["price"], errors="coerce")
-    city_data["area"] = pd.to_numeric(city_data["area"], errors="coerce")
+    city_data["price"] = parse_numeric(city_data["price"])
+    city_data["area"] = parse_numeric(city_data["area"])
     
     # لا يتم حذف أي صفقة - الاحتفاظ بجميع الصفقات كما هي
     
@@ -103,6 +104,7 @@ def show_district_reports(df_raw):
             )
             # ✅ سطر debug لطباعة توزيع property_subtype داخل الحي
             subtype_dist = district_data["property_subtype"].value_counts()
+            subtype_dist = subtype_dist[subtype_dist > 0]
             print(f"🔍 DEBUG: توزيع property_subtype في حي {district}:")
             print(subtype_dist.to_string())
         elif "property_type" in district_data.columns:
@@ -236,8 +238,8 @@ def show_district_reports(df_raw):
                         # =========================================
                         # ✅ التعديل الأساسي: جلب إحداثيات الحي وبيانات المشاريع
                         # =========================================
-                        projects_df = load_projects_data()
-                        districts_df = load_districts_data()
+                        projects_df = get_repository().projects()
+                        districts_df = get_repository().districts()
                         
                         district_lat = None
                         district_lon = None
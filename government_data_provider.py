@@ -8,59 +8,155 @@
 """
 
 import pandas as pd
+import numpy as np
 import re
+import os
+import shutil
+import json
+import hashlib
+import glob
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple, Union
+
+from numeric_parser import parse_numeric
 
 # الملف موجود داخل نفس المشروع
 DATA_PATH = Path("market_transactions.csv")
+PROJECTS_PATH = Path("projects.xlsx")
+DISTRICTS_PATH = Path("districts.xlsx")
+
+# مجلد الذاكرة المؤقتة للبيانات المطبّعة (يُعاد بناؤه تلقائياً عند تغير الملف)
+CACHE_DIR = Path("data_cache")
+
+# ⚠️ يجب رفع هذا الرقم عند أي تعديل على منطق التطبيع حتى تُبطل الذاكرة القديمة
+CACHE_VERSION = "5"
+
+# مخزن البيانات المطبّعة على دفعات (للملفات الضخمة التي لا تتسع لها الذاكرة)
+STORE_DIR = Path("data_store")
+
+# امتدادات ملفات المصدر المدعومة عند تمرير مجلد أو نمط (glob)
+SOURCE_SUFFIXES = (".csv", ".xlsx")
+
+# عدد الصفوف في كل دفعة عند القراءة المتدفقة
+STREAM_CHUNK_ROWS = 200_000
+
+# ترتيب أعمدة البيانات المطبّعة كما تراها باقي الأنظمة
+NORMALIZED_COLUMNS = [
+    "price_raw", "price", "area", "city", "district", "date",
+    "property_type_raw", "property_type", "units", "price_per_sqm",
+    "price_source", "price_validity", "property_subtype", "transaction_ref",
+]
+
+# الأعمدة المخزنة كـ Categorical (قيم متكررة كثيراً)
+CATEGORICAL_COLUMNS = [
+    "city", "district", "property_type", "property_subtype",
+    "property_type_raw", "price_source", "price_validity",
+]
+
+# أعمدة الإحداثيات في ملفات المشاريع والأحياء (تُخزن كأرقام)
+COORDINATE_COLUMNS = ["خط_العرض", "خط_الطول", "نطاق_التأثير"]
+
+
+# أنماط البحث لكل عمود مستهدف (مدعومة بالعربية والإنجليزية)
+COLUMN_PATTERNS = {
+    "price": [
+        "السعر", "قيمة الصفقة", "اجمالي قيمة الصفقات", "الثمن", 
+        "المبلغ", "price", "total_value", "اجمالي", "القيمة",
+        "قيمة", "price_value"
+    ],
+    "area": [
+        "المساحة", "المساحه", "متر", "مساحة", "area", "property_area",
+        "المساحة بالمتر", "الوحدات", "المساحه بالمتر",
+        "مساحه", "sqm"
+    ],
+    "city": [
+        "المدينة", "city", "اسم المدينة", "المنطقة الادارية", "المدينه"
+    ],
+    "district": [
+        "الحي", "حي", "المدينة / الحي", "الاحياء", "المنطقة", "district",
+        "اسم الحي", "الاحياء السكنية", "الحي / المنطقة",
+        "المدينة الحي", "neighborhood"
+    ],
+    "date": [
+        "تاريخ الصفقة", "التاريخ", "تاريخ العقد", "date", "transaction_date",
+        "تاريخ الصفقة ميلادي", "تاريخ التسجيل", "تاريخ العقد ميلادي"
+    ],
+    "property_type": [
+        "تصنيف العقار", "نوع العقار", "الغرض", "property_type", "usage",
+        "الاستخدام", "نوع الصفقة", "التصنيف"
+    ],
+    "units": [
+        "عدد العقارات", "الوحدات", "units", "عدد الوحدات", "العدد",
+        "عدد الوحدات بالصفقة"
+    ],
+    "transaction_ref": [
+        "الرقم المرجعي للصفقة", "الرقم المرجعي", "رقم الصفقة", "المرجع",
+        "transaction_ref", "reference", "ref_no"
+    ]
+}
+
+
+# ذاكرة المطابقات المعروفة: بصمة رؤوس الأعمدة ← المطابقة الناتجة
+COLUMN_MAPPINGS_PATH = CACHE_DIR / "column_mappings.json"
+_column_mappings: Optional[Dict[str, Dict[str, str]]] = None
+
+
+def _schema_fingerprint(columns) -> str:
+    """🧾 بصمة مخطط الملف (رؤوس الأعمدة بترتيبها + أنماط البحث الحالية)"""
+    payload = json.dumps(
+        [[str(col) for col in columns], COLUMN_PATTERNS],
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _load_column_mappings() -> Dict[str, Dict[str, str]]:
+    """📖 قراءة المطابقات المحفوظة مرة واحدة لكل عملية"""
+    global _column_mappings
+    if _column_mappings is None:
+        stored = _read_manifest(COLUMN_MAPPINGS_PATH)
+        _column_mappings = stored if isinstance(stored, dict) else {}
+    return _column_mappings
+
+
+def _store_column_mappings(mappings: Dict[str, Dict[str, str]]):
+    """
+    💾 تسجيل مطابقات مخططات جديدة لإعادة استخدامها في التحميلات القادمة
+    (كتابة واحدة للملف - العمال المتوازيون يعيدون مطابقاتهم والعملية الأم تحفظها)
+    """
+    known_mappings = _load_column_mappings()
+    new_mappings = {key: dict(mapping) for key, mapping in mappings.items()
+                    if known_mappings.get(key) != mapping}
+    if not new_mappings:
+        return
+    known_mappings.update(new_mappings)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _write_json_atomic(COLUMN_MAPPINGS_PATH, known_mappings)
+    except Exception as e:
+        print(f"⚠️ تعذر حفظ مطابقة الأعمدة: {e}")
 
 
-def smart_column_mapper(df: pd.DataFrame) -> Dict[str, str]:
+def smart_column_mapper(df: pd.DataFrame, persist: bool = True) -> Dict[str, str]:
     """
     🧠 محرك اكتشاف الأعمدة الذكي - يقرأ أي ملف حكومي مهما تغيرت أسماء الأعمدة
     يستخدم نظام تسجيل (Scoring System) لتحديد أفضل تطابق
+    ⚡ النتيجة تُحفظ ببصمة رؤوس الأعمدة، فالملفات ذات المخطط المعروف لا تُعاد مطابقتها
+    persist=False: بدون حفظ (عمال المعالجة المتوازية - الحفظ في العملية الأم)
     """
-    
-    # أنماط البحث لكل عمود مستهدف (مدعومة بالعربية والإنجليزية)
-    column_patterns = {
-        "price": [
-            "السعر", "قيمة الصفقة", "اجمالي قيمة الصفقات", "الثمن", 
-            "المبلغ", "price", "total_value", "اجمالي", "القيمة",
-            "قيمة", "price_value"
-        ],
-        "area": [
-            "المساحة", "المساحه", "متر", "مساحة", "area", "property_area",
-            "المساحة بالمتر", "الوحدات", "المساحه بالمتر",
-            "مساحه", "sqm"
-        ],
-        "city": [
-            "المدينة", "city", "اسم المدينة", "المنطقة الادارية", "المدينه"
-        ],
-        "district": [
-            "الحي", "حي", "المدينة / الحي", "الاحياء", "المنطقة", "district",
-            "اسم الحي", "الاحياء السكنية", "الحي / المنطقة",
-            "المدينة الحي", "neighborhood"
-        ],
-        "date": [
-            "تاريخ الصفقة", "التاريخ", "تاريخ العقد", "date", "transaction_date",
-            "تاريخ الصفقة ميلادي", "تاريخ التسجيل", "تاريخ العقد ميلادي"
-        ],
-        "property_type": [
-            "تصنيف العقار", "نوع العقار", "الغرض", "property_type", "usage",
-            "الاستخدام", "نوع الصفقة", "التصنيف"
-        ],
-        "units": [
-            "عدد العقارات", "الوحدات", "units", "عدد الوحدات", "العدد",
-            "عدد الوحدات بالصفقة"
-        ]
-    }
+    schema_key = _schema_fingerprint(df.columns)
+    known_mappings = _load_column_mappings()
+    cached = known_mappings.get(schema_key)
+    if cached is not None and all(col in df.columns for col in cached.values()):
+        return dict(cached)
     
     mapping = {}
     used_columns = set()
     
     # البحث عن أفضل تطابق لكل عمود
-    for target, patterns in column_patterns.items():
+    for target, patterns in COLUMN_PATTERNS.items():
         best_match = None
         best_score = 0
         
@@ -97,19 +193,19 @@ def smart_column_mapper(df: pd.DataFrame) -> Dict[str, str]:
     else:
         print("  ⚠️ لم يتم اكتشاف أي أعمدة!")
     
-    for target in column_patterns.keys():
+    for target in COLUMN_PATTERNS.keys():
         if target not in mapping:
             print(f"  ⚠️ {target:12} ← لم يتم العثور على عمود")
     
+    if persist:
+        _store_column_mappings({schema_key: mapping})
     return mapping
 
 
 def clean_price(price_series: pd.Series) -> pd.Series:
     """💰 تنظيف وتحويل عمود السعر بذكاء فائق"""
     
-    cleaned = price_series.fillna('').astype(str)
-    cleaned = cleaned.str.replace(r'[^\d.]', '', regex=True)
-    numeric_prices = pd.to_numeric(cleaned, errors='coerce')
+    numeric_prices = parse_numeric(price_series)
     valid_price_mask = (numeric_prices > 1000) & (numeric_prices < 1_000_000_000)
     numeric_prices[~valid_price_mask] = pd.NA
     
@@ -138,7 +234,8 @@ def normalize_property_type(type_series: pd.Series) -> pd.Series:
                 return normalized
         return 'اخرى'
     
-    return type_series.apply(normalize_single)
+    # ⚡ التصنيف يُحسب مرة واحدة لكل قيمة فريدة (بضع قيم فقط في ملفات الوزارة)
+    return _transform_unique(type_series, lambda values: values.map(normalize_single))
 
 
 def classify_property_subtype(area, property_type):
@@ -166,21 +263,467 @@ def classify_property_subtype(area, property_type):
     return "غير محدد"
 
 
+def classify_property_subtypes(area: pd.Series, property_type: pd.Series) -> pd.Series:
+    """
+    🏷️ النسخة المتجهة من classify_property_subtype لعمود كامل دفعة واحدة
+    نفس القواعد: أرض / محل تجاري / شقة (<180) / تاون هاوس (180-320) / فيلا (>320)
+    """
+    area = pd.to_numeric(area, errors='coerce')
+    residential = (property_type == "سكني").to_numpy()
+    
+    subtypes = np.select(
+        [
+            (property_type == "أرض").to_numpy(),
+            (property_type == "تجاري").to_numpy(),
+            residential & area.isna().to_numpy(),
+            residential & (area < 180).to_numpy(),
+            residential & ((area >= 180) & (area <= 320)).to_numpy(),
+            residential & (area > 320).to_numpy(),
+        ],
+        ["أرض", "محل تجاري", "غير محدد", "شقة", "تاون هاوس", "فيلا"],
+        default="غير محدد",
+    )
+    return pd.Series(subtypes, index=area.index, dtype=object)
+
+
+def _categorize(df: pd.DataFrame) -> pd.DataFrame:
+    """🗂️ تحويل الأعمدة النصية المتكررة إلى Categorical (ذاكرة أقل ومقارنات أسرع)"""
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].cat.remove_unused_categories()
+            else:
+                df[col] = df[col].astype("category")
+    return df
+
+
+def _source_fingerprint(path: Path) -> Dict:
+    """🧾 بصمة سريعة لملف المصدر (المسار + الحجم + وقت التعديل)"""
+    stat = path.stat()
+    return {
+        "source": str(path.resolve()),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+    }
+
+
+def _file_content_hash(path: Path) -> str:
+    """🔐 بصمة محتوى الملف (SHA-256) - تُحسب فقط عند الشك في تغير الملف"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_paths(path: Path):
+    """📁 مسارات ملف الذاكرة وملف الوصف (manifest) الخاصين بملف مصدر معين"""
+    key = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:12]
+    base = CACHE_DIR / f"{path.stem}_{key}"
+    return base.with_suffix(".pkl"), base.with_suffix(".manifest.json")
+
+
+def _fill_stats_path(path: Path) -> Path:
+    """📁 ملف قيم التعويض (الوسيط لكل حي / مدينة) بجانب ذاكرة البيانات"""
+    data_path, _ = _cache_paths(path)
+    return data_path.with_suffix(".fillstats.json")
+
+
+def _read_manifest(manifest_path: Path) -> Optional[Dict]:
+    try:
+        return json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json_atomic(path: Path, payload: Dict):
+    """💾 كتابة JSON بشكل ذري (ملف مؤقت ثم استبدال) حتى لا تُقرأ نسخة ناقصة"""
+    # ملف مؤقت فريد لكل كتابة حتى لا تتصادم عمليتان تكتبان نفس الملف
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent,
+                                     prefix=path.name + ".", suffix=".tmp", delete=False) as tmp:
+        tmp.write(json.dumps(payload, ensure_ascii=False, indent=2))
+    try:
+        os.replace(tmp.name, path)
+    except OSError:
+        os.remove(tmp.name)
+        raise
+
+
+def _is_cache_valid(path: Path, manifest: Optional[Dict], manifest_path: Path) -> bool:
+    """
+    ✅ التحقق من صلاحية الذاكرة:
+    - نفس نسخة الكود ونفس المسار والحجم
+    - إذا تغير وقت التعديل فقط نقارن بصمة المحتوى قبل إبطال الذاكرة
+    """
+    if not manifest or manifest.get("code_version") != CACHE_VERSION:
+        return False
+
+    current = _source_fingerprint(path)
+    if manifest.get("source") != current["source"] or manifest.get("size") != current["size"]:
+        return False
+
+    if manifest.get("mtime") == current["mtime"]:
+        return True
+
+    # الملف لُمس دون تغيير محتواه (نسخ / تنزيل جديد لنفس البيانات)
+    if manifest.get("content_hash") == _file_content_hash(path):
+        manifest["mtime"] = current["mtime"]
+        _write_json_atomic(manifest_path, manifest)
+        return True
+
+    return False
+
+
+def _load_cached_frame(path: Path) -> Optional[pd.DataFrame]:
+    """⚡ قراءة البيانات المطبّعة من الذاكرة إذا كانت صالحة"""
+    data_path, manifest_path = _cache_paths(path)
+    if not data_path.exists():
+        return None
+
+    manifest = _read_manifest(manifest_path)
+    if not _is_cache_valid(path, manifest, manifest_path):
+        return None
+
+    try:
+        return pd.read_pickle(data_path)
+    except Exception as e:
+        print(f"⚠️ تعذر قراءة الذاكرة المؤقتة ({data_path}): {e}")
+        return None
+
+
+def _store_cached_frame(path: Path, df: pd.DataFrame):
+    """💾 حفظ البيانات المطبّعة مع ملف وصف يحمل بصمة المصدر ونسخة الكود"""
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        data_path, manifest_path = _cache_paths(path)
+
+        tmp_path = data_path.with_name(data_path.name + ".tmp")
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, data_path)
+
+        manifest = _source_fingerprint(path)
+        manifest.update({
+            "content_hash": _file_content_hash(path),
+            "code_version": CACHE_VERSION,
+            "rows": len(df),
+        })
+        _write_json_atomic(manifest_path, manifest)
+    except Exception as e:
+        # فشل الكتابة لا يجب أن يوقف التحميل
+        print(f"⚠️ تعذر حفظ الذاكرة المؤقتة: {e}")
+
+
+def _read_source_file(path: Path) -> pd.DataFrame:
+    """📂 قراءة ملف المصدر الخام (CSV أو Excel)"""
+    print(f"📂 جاري قراءة الملف: {path}")
+
+    if path.suffix.lower() == ".xlsx":
+        return pd.read_excel(path)
+    return pd.read_csv(path, encoding="utf-8-sig", sep=";", low_memory=False)
+
+
+def _transform_unique(series: pd.Series, func) -> pd.Series:
+    """🔁 تطبيق تحويل نصي على القيم الفريدة فقط ثم إعادة توزيعه على كل الصفوف"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    transformed = func(pd.Series(uniques, dtype=object))
+    return pd.Series(transformed.to_numpy()[codes], index=series.index)
+
+
+def _clean_city_values(values: pd.Series) -> pd.Series:
+    cleaned = values.astype(str).str.strip()
+    cleaned = cleaned.str.replace("منطقة", "", regex=False)
+    cleaned = cleaned.str.replace("المنطقة", "", regex=False)
+    cleaned = cleaned.str.replace("الادارية", "", regex=False)
+    return cleaned.str.strip()
+
+
+def _clean_district_values(values: pd.Series) -> pd.Series:
+    return (
+        values
+        .astype(str)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.split("/")
+        .str[-1]
+        .str.strip()
+    )
+
+
+def _parse_fill_columns(df: pd.DataFrame, column_mapping: Dict[str, str]) -> pd.DataFrame:
+    """
+    🧮 تحليل الأعمدة التي تعتمد عليها قيم التعويض (السعر، المساحة، المدينة، الحي)
+    لا يتم تعبئة أي قيمة هنا - التعبئة تتم في _finalize_government_frame
+    """
+    parsed = pd.DataFrame(index=df.index)
+    
+    parsed['price_raw'] = clean_price(df[column_mapping['price']])
+    
+    if 'area' in column_mapping:
+        parsed['area'] = parse_numeric(df[column_mapping['area']])
+        parsed.loc[parsed['area'] <= 20, 'area'] = pd.NA
+        parsed.loc[parsed['area'] > 5000, 'area'] = pd.NA
+    else:
+        parsed['area'] = 120
+    
+    if 'city' in column_mapping:
+        parsed['city'] = _transform_unique(df[column_mapping['city']], _clean_city_values)
+    else:
+        parsed['city'] = 'غير محدد'
+    
+    if 'district' in column_mapping:
+        parsed['district'] = _transform_unique(df[column_mapping['district']], _clean_district_values)
+    else:
+        parsed['district'] = 'غير محدد'
+    
+    return parsed
+
+
+def _infer_date_format(date_series: pd.Series) -> Optional[str]:
+    """
+    📅 استنتاج صيغة التاريخ من أول قيمة في الملف كاملاً
+    حتى تُقرأ التواريخ بنفس الصيغة سواء حُمّل الملف كاملاً أو جزء منه
+    """
+    non_null = date_series.dropna()
+    if non_null.empty:
+        return None
+    return pd.tseries.api.guess_datetime_format(str(non_null.iloc[0]))
+
+
+def _parse_references(ref_series: pd.Series) -> pd.Series:
+    """🔖 الرقم المرجعي للصفقة كعدد صحيح (يسمح بالقيم الناقصة)"""
+    refs = pd.to_numeric(ref_series, errors='coerce')
+    refs = refs.where(refs == refs.round())
+    return refs.astype("Int64")
+
+
+def _parse_dates(date_series: pd.Series, date_format: Optional[str] = None,
+                 previous_date=None) -> pd.Series:
+    """
+    📅 تحويل عمود التاريخ (على القيم الفريدة) ثم تعويض الناقص بالتاريخ السابق في الملف
+    previous_date: آخر تاريخ من الجزء السابق (عند القراءة على دفعات)
+    """
+    if date_format is None:
+        date_format = _infer_date_format(date_series)
+    dates = _transform_unique(
+        date_series,
+        lambda values: pd.to_datetime(values, format=date_format, errors='coerce')
+    )
+    dates = pd.to_datetime(dates).ffill()
+    if previous_date is not None:
+        dates = dates.fillna(previous_date)
+    return dates
+
+
+def _parse_government_frame(df: pd.DataFrame, column_mapping: Dict[str, str],
+                            parsed_dates: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    🧹 تحليل كل الأعمدة على مستوى الصف (بدون أي قيم تعتمد على باقي الملف)
+    parsed_dates: تواريخ محسوبة مسبقاً على الملف كاملاً (عند تحليل جزء منه فقط)
+    """
+    
+    parsed = _parse_fill_columns(df, column_mapping)
+    
+    if 'date' in column_mapping:
+        parsed['date'] = parsed_dates if parsed_dates is not None else _parse_dates(df[column_mapping['date']])
+    else:
+        parsed['date'] = None
+    
+    if 'property_type' in column_mapping:
+        raw_types = df[column_mapping['property_type']].astype(str).str.strip()
+        parsed['property_type_raw'] = raw_types
+        parsed['property_type'] = normalize_property_type(raw_types)
+    else:
+        parsed['property_type'] = 'غير محدد'
+        parsed['property_type_raw'] = 'غير محدد'
+    
+    if 'units' in column_mapping:
+        parsed['units'] = pd.to_numeric(df[column_mapping['units']], errors='coerce')
+    else:
+        parsed['units'] = 1
+    
+    if 'transaction_ref' in column_mapping:
+        parsed['transaction_ref'] = _parse_references(df[column_mapping['transaction_ref']])
+    else:
+        parsed['transaction_ref'] = pd.Series(pd.NA, index=df.index, dtype="Int64")
+    
+    return parsed
+
+
+def _compute_fill_stats(parsed: pd.DataFrame) -> Dict:
+    """
+    📐 حساب قيم التعويض العامة من الملف كاملاً:
+    وسيط المساحة، وسيط السعر لكل حي، ثم لكل مدينة، ثم الوسيط العام
+    (بنفس ترتيب التعبئة المتسلسل في التطبيع)
+    """
+    area = pd.to_numeric(parsed['area'], errors='coerce')
+    median_area = area[(area > 20) & (area < 5000)].median()
+    if pd.isna(median_area):
+        median_area = 120
+    
+    price = pd.to_numeric(parsed['price_raw'], errors='coerce')
+    
+    district_medians = price.groupby(parsed['district']).median().dropna()
+    price = price.fillna(parsed['district'].map(district_medians))
+    
+    city_medians = price.groupby(parsed['city']).median().dropna()
+    price = price.fillna(parsed['city'].map(city_medians))
+    
+    global_median_price = price.median()
+    if pd.isna(global_median_price):
+        global_median_price = 500000
+    
+    return {
+        "median_area": float(median_area),
+        "district_median_price": {str(k): float(v) for k, v in district_medians.items()},
+        "city_median_price": {str(k): float(v) for k, v in city_medians.items()},
+        "global_median_price": float(global_median_price),
+    }
+
+
+def _finalize_government_frame(parsed: pd.DataFrame, fill_stats: Dict) -> pd.DataFrame:
+    """✅ تعبئة القيم الناقصة بقيم التعويض العامة ثم تطبيق قواعد الجودة"""
+    
+    normalized_df = parsed.copy()
+    
+    normalized_df['area'] = pd.to_numeric(normalized_df['area'], errors='coerce').fillna(fill_stats["median_area"])
+    
+    normalized_df['price'] = pd.to_numeric(normalized_df['price_raw'], errors='coerce')
+    normalized_df['price'] = normalized_df['price'].fillna(normalized_df['district'].map(fill_stats["district_median_price"]))
+    normalized_df['price'] = normalized_df['price'].fillna(normalized_df['city'].map(fill_stats["city_median_price"]))
+    normalized_df['price'] = normalized_df['price'].fillna(fill_stats["global_median_price"])
+    
+    normalized_df = normalized_df[(normalized_df["price"] > 10000) & (normalized_df["price"] < 200000000)]
+    normalized_df = normalized_df[(normalized_df["area"] > 20) & (normalized_df["area"] < 5000)]
+    
+    normalized_df["price_per_sqm"] = normalized_df["price"] / normalized_df["area"].replace(0, pd.NA)
+    normalized_df.loc[(normalized_df["price_per_sqm"] < 500) | (normalized_df["price_per_sqm"] > 20000), "price_per_sqm"] = pd.NA
+    normalized_df['price_per_sqm'] = normalized_df['price_per_sqm'].round(0)
+    normalized_df['units'] = normalized_df['units'].fillna(1)
+    
+    normalized_df['price_source'] = 'original'
+    normalized_df.loc[normalized_df['price_raw'].isna(), 'price_source'] = 'estimated'
+    
+    normalized_df['price_validity'] = 'valid'
+    normalized_df.loc[normalized_df['price_raw'].isna(), 'price_validity'] = 'estimated'
+    normalized_df.loc[(normalized_df['price_per_sqm'].isna()) & (normalized_df['price_validity'] == 'valid'), 'price_validity'] = 'corrected'
+    
+    # ✅ تصنيف العقارات حسب النوع والمساحة (متجه) - بدون "غير سكني"
+    normalized_df["property_subtype"] = classify_property_subtypes(
+        normalized_df["area"], normalized_df["property_type"]
+    )
+    
+    return _categorize(normalized_df[NORMALIZED_COLUMNS].reset_index(drop=True))
+
+
+def _normalize_government_frame(df: pd.DataFrame, column_mapping: Dict[str, str]):
+    """🧹 تحويل الجدول الخام إلى الشكل الموحد - يعيد (البيانات، قيم التعويض المستخدمة)"""
+    parsed = _parse_government_frame(df, column_mapping)
+    fill_stats = _compute_fill_stats(parsed)
+    return _finalize_government_frame(parsed, fill_stats), fill_stats
+
+
+def _load_fill_stats(path: Path) -> Optional[Dict]:
+    """📐 قراءة قيم التعويض المحفوظة لملف المصدر إذا كانت صالحة"""
+    stats_path = _fill_stats_path(path)
+    payload = _read_manifest(stats_path)
+    if not _is_cache_valid(path, payload, stats_path):
+        return None
+    return payload.get("fill_stats")
+
+
+def _store_fill_stats(path: Path, fill_stats: Dict):
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        payload = _source_fingerprint(path)
+        payload.update({
+            "content_hash": _file_content_hash(path),
+            "code_version": CACHE_VERSION,
+            "fill_stats": fill_stats,
+        })
+        _write_json_atomic(_fill_stats_path(path), payload)
+    except Exception as e:
+        print(f"⚠️ تعذر حفظ قيم التعويض: {e}")
+
+
+def _pushdown_mask(df: pd.DataFrame, column_mapping: Dict[str, str],
+                   selected_city: Optional[str],
+                   selected_property_type: Optional[str]) -> pd.Series:
+    """
+    🎯 قناع الفلترة على الأعمدة الخام قبل التحليل المكلف
+    يطابق نفس منطق filter_government_data لكن على القيم الفريدة فقط
+    """
+    mask = pd.Series(True, index=df.index)
+    
+    if selected_city and selected_city != 'الكل' and 'city' in column_mapping:
+        city_clean = _transform_unique(df[column_mapping['city']], _clean_city_values)
+        mask &= city_clean.str.contains(selected_city.strip(), case=False, na=False, regex=True)
+    
+    if (selected_property_type in ['سكني', 'تجاري', 'أرض']
+            and 'property_type' in column_mapping):
+        raw_types = df[column_mapping['property_type']]
+        type_values = _transform_unique(
+            raw_types,
+            lambda values: normalize_property_type(values.astype(str).str.strip())
+        )
+        mask &= type_values == selected_property_type
+    
+    return mask
+
+
+def filter_government_data(normalized_df: pd.DataFrame,
+                   selected_city: Optional[str] = None,
+                   selected_property_type: Optional[str] = None) -> pd.DataFrame:
+    """🎛️ تطبيق فلاتر المدينة ونوع العقار على البيانات المطبّعة"""
+    
+    if selected_city and selected_city != 'الكل':
+        city_mask = normalized_df['city'].astype(str).str.strip().str.contains(selected_city.strip(), case=False, na=False)
+        normalized_df = normalized_df[city_mask]
+    
+    if selected_property_type and selected_property_type != 'الكل':
+        if selected_property_type in ['سكني', 'تجاري', 'أرض']:
+            normalized_df = normalized_df[normalized_df['property_type'] == selected_property_type]
+    
+    # الفئات غير الموجودة بعد الفلترة لا تظهر في groupby / value_counts
+    return _categorize(normalized_df.reset_index(drop=True))
+
+
+def _has_filters(selected_city: Optional[str], selected_property_type: Optional[str]) -> bool:
+    city_filter = bool(selected_city) and selected_city != 'الكل'
+    type_filter = selected_property_type in ['سكني', 'تجاري', 'أرض']
+    return city_filter or type_filter
+
+
 def load_government_data(selected_city: Optional[str] = None, 
-                        selected_property_type: Optional[str] = None) -> pd.DataFrame:
-    """🎯 المحرك الرئيسي للبيانات - واجهة موحدة لجميع أنظمة المشروع"""
+                        selected_property_type: Optional[str] = None,
+                        use_cache: bool = True,
+                        source: Union[str, Path, None] = None) -> pd.DataFrame:
+    """
+    🎯 المحرك الرئيسي للبيانات - واجهة موحدة لجميع أنظمة المشروع
+    
+    use_cache: استخدام الذاكرة المؤقتة المطبّعة (data_cache/) إذا كانت صالحة
+    عند طلب مدينة / نوع محدد بدون ذاكرة صالحة يتم تطبيع الصفوف المطلوبة فقط
+    source: ملف، أو مجلد، أو نمط glob (الافتراضي DATA_PATH)
+            عند وجود أكثر من ملف تُطبّع الملفات بالتوازي ثم تُدمج
+    """
     
     try:
-        if not DATA_PATH.exists():
-            print(f"❌ ملف البيانات غير موجود في المسار: {DATA_PATH}")
+        source_files = resolve_source_files(DATA_PATH if source is None else source)
+        if not source_files:
+            print(f"❌ ملف البيانات غير موجود في المسار: {source or DATA_PATH}")
             return pd.DataFrame()
         
-        print(f"📂 جاري قراءة الملف: {DATA_PATH}")
+        if len(source_files) > 1:
+            normalized_df = load_government_data_files(source_files, use_cache=use_cache)
+            return filter_government_data(normalized_df, selected_city, selected_property_type)
         
-        if DATA_PATH.suffix.lower() == ".xlsx":
-            df = pd.read_excel(DATA_PATH)
-        else:
-            df = pd.read_csv(DATA_PATH, encoding="utf-8-sig", sep=";", low_memory=False)
+        source_path = source_files[0]
+        
+        # ⚡ المسار السريع: البيانات المطبّعة محفوظة ولم يتغير الملف
+        if use_cache:
+            cached_df = _load_cached_frame(source_path)
+            if cached_df is not None:
+                return filter_government_data(cached_df, selected_city, selected_property_type)
+        
+        df = _read_source_file(source_path)
         
         if df.empty:
             print("⚠️ الملف فارغ - لا توجد بيانات للتحليل")
@@ -194,162 +737,693 @@ def load_government_data(selected_city: Optional[str] = None,
             print("❌ لا يمكن الاستمرار: لم يتم العثور على عمود السعر")
             return pd.DataFrame()
         
-        normalized_df = pd.DataFrame()
-        
-        normalized_df['price_raw'] = clean_price(df[column_mapping['price']])
-        normalized_df['price'] = normalized_df['price_raw'].copy()
+        # 🎯 فلترة مبكرة: نطبّع صفوف المدينة / النوع المطلوب فقط
+        # قيم التعويض (الوسيط) تبقى محسوبة من الملف كاملاً
+        if _has_filters(selected_city, selected_property_type):
+            fill_stats = _load_fill_stats(source_path) if use_cache else None
+            if fill_stats is None:
+                fill_stats = _compute_fill_stats(_parse_fill_columns(df, column_mapping))
+                if use_cache:
+                    _store_fill_stats(source_path, fill_stats)
+            
+            mask = _pushdown_mask(df, column_mapping, selected_city, selected_property_type)
+            # التاريخ الناقص يُعوَّض بالصف السابق في الملف كاملاً، لذلك يُحسب قبل الفلترة
+            parsed_dates = _parse_dates(df[column_mapping['date']])[mask] if 'date' in column_mapping else None
+            parsed = _parse_government_frame(df[mask], column_mapping, parsed_dates=parsed_dates)
+            normalized_df = _finalize_government_frame(parsed, fill_stats)
+            return filter_government_data(normalized_df, selected_city, selected_property_type)
         
-        if 'area' in column_mapping:
-            normalized_df['area'] = pd.to_numeric(df[column_mapping['area']], errors='coerce')
-            normalized_df.loc[normalized_df['area'] <= 20, 'area'] = pd.NA
-            normalized_df.loc[normalized_df['area'] > 5000, 'area'] = pd.NA
-            median_area = normalized_df.loc[(normalized_df['area'] > 20) & (normalized_df['area'] < 5000), 'area'].median()
-            if pd.isna(median_area):
-                median_area = 120
-            normalized_df['area'] = normalized_df['area'].fillna(median_area)
-        else:
-            normalized_df['area'] = 120
-        
-        if 'city' in column_mapping:
-            normalized_df['city'] = df[column_mapping['city']].astype(str).str.strip()
-            normalized_df['city'] = normalized_df['city'].str.replace("منطقة", "", regex=False)
-            normalized_df['city'] = normalized_df['city'].str.replace("المنطقة", "", regex=False)
-            normalized_df['city'] = normalized_df['city'].str.replace("الادارية", "", regex=False)
-            normalized_df['city'] = normalized_df['city'].str.strip()
-        else:
-            normalized_df['city'] = 'غير محدد'
-        
-        if 'district' in column_mapping:
-            normalized_df['district'] = (
-                df[column_mapping['district']]
-                .astype(str)
-                .str.replace(r"\s+", " ", regex=True)
-                .str.split("/")
-                .str[-1]
-                .str.strip()
-            )
-        else:
-            normalized_df['district'] = 'غير محدد'
+        normalized_df, fill_stats = _normalize_government_frame(df, column_mapping)
         
-        if 'date' in column_mapping:
-            normalized_df['date'] = pd.to_datetime(df[column_mapping['date']], errors='coerce')
-            normalized_df['date'] = normalized_df['date'].ffill()
-        else:
-            normalized_df['date'] = None
+        if use_cache:
+            _store_cached_frame(source_path, normalized_df)
+            _store_fill_stats(source_path, fill_stats)
         
-        if 'property_type' in column_mapping:
-            raw_types = df[column_mapping['property_type']].astype(str).str.strip()
-            normalized_df['property_type_raw'] = raw_types
-            normalized_df['property_type'] = normalize_property_type(raw_types)
-        else:
-            normalized_df['property_type'] = 'غير محدد'
-            normalized_df['property_type_raw'] = 'غير محدد'
+        return normalized_df
+    
+    except Exception as e:
+        print("🔥 ERROR IN GOVERNMENT DATA PROVIDER")
+        import traceback
+        traceback.print_exc()
+        raise e
+
+
+# =========================================
+# 📚 الاستيعاب المتوازي لعدة ملفات (تصديرات ربعية / إقليمية)
+# =========================================
+
+def resolve_source_files(source: Union[str, Path]) -> List[Path]:
+    """
+    📂 تحويل مصدر البيانات إلى قائمة ملفات مرتبة:
+    ملف واحد، أو مجلد (كل ملفات CSV / XLSX بداخله)، أو نمط glob
+    """
+    path = Path(source)
+    if path.is_dir():
+        return sorted(p for p in path.iterdir() if p.is_file() and p.suffix.lower() in SOURCE_SUFFIXES)
+    if path.exists():
+        return [path]
+    if glob.has_magic(str(source)):
+        return sorted(
+            Path(p) for p in glob.glob(str(source))
+            if Path(p).is_file() and Path(p).suffix.lower() in SOURCE_SUFFIXES
+        )
+    return []
+
+
+def _parse_source_file(path: Path) -> Tuple[Optional[pd.DataFrame], Dict[str, Dict[str, str]]]:
+    """
+    ⚙️ عامل المعالجة: قراءة ملف واحد وتحليله على مستوى الصف
+    (قيم التعويض تُحسب لاحقاً من كل الملفات مجتمعة)
+    يعيد (الجدول، مطابقة الأعمدة ببصمة المخطط) - المطابقة تحفظها العملية الأم
+    """
+    df = _read_source_file(path)
+    if df.empty:
+        print(f"⚠️ الملف فارغ: {path}")
+        return None, {}
+    
+    column_mapping = smart_column_mapper(df, persist=False)
+    detected = {_schema_fingerprint(df.columns): column_mapping}
+    if 'price' not in column_mapping:
+        print(f"❌ تم تجاهل {path}: لم يتم العثور على عمود السعر")
+        return None, detected
+    
+    return _parse_government_frame(df, column_mapping), detected
+
+
+def _drop_duplicate_references(parsed: pd.DataFrame) -> pd.DataFrame:
+    """🧬 حذف الصفقات المكررة بين الملفات (نفس الرقم المرجعي) - يُحتفظ بأول ظهور"""
+    refs = parsed['transaction_ref']
+    duplicated = refs.notna() & refs.duplicated(keep='first')
+    if duplicated.any():
+        print(f"🧬 تم حذف {int(duplicated.sum()):,} صفقة مكررة بين الملفات")
+    return parsed[~duplicated.to_numpy()]
+
+
+def _multi_cache_paths(files: List[Path]):
+    """📁 ذاكرة مجموعة ملفات: المفتاح بصمة قائمة المسارات"""
+    joined = "\n".join(str(p.resolve()) for p in files)
+    key = hashlib.sha1(joined.encode("utf-8")).hexdigest()[:12]
+    base = CACHE_DIR / f"multi_{key}"
+    return base.with_suffix(".pkl"), base.with_suffix(".manifest.json")
+
+
+def _is_multi_cache_valid(files: List[Path], manifest: Optional[Dict], manifest_path: Path) -> bool:
+    """✅ الذاكرة صالحة إذا لم يتغير أي ملف من المجموعة (بنفس قواعد الملف الواحد)"""
+    if not manifest or manifest.get("code_version") != CACHE_VERSION:
+        return False
+    
+    entries = manifest.get("files", [])
+    if len(entries) != len(files):
+        return False
+    
+    refreshed = False
+    for path, entry in zip(files, entries):
+        current = _source_fingerprint(path)
+        if entry.get("source") != current["source"] or entry.get("size") != current["size"]:
+            return False
+        if entry.get("mtime") != current["mtime"]:
+            if entry.get("content_hash") != _file_content_hash(path):
+                return False
+            entry["mtime"] = current["mtime"]
+            refreshed = True
+    
+    if refreshed:
+        _write_json_atomic(manifest_path, manifest)
+    return True
+
+
+def load_government_data_files(files: List[Path], use_cache: bool = True,
+                               max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    📚 تطبيع عدة ملفات بالتوازي (ملف لكل عامل) ثم دمجها في جدول واحد
+    - التحليل على مستوى الصف يتم داخل العمال
+    - حذف التكرار بالرقم المرجعي وحساب قيم التعويض يتمان على البيانات المدمجة
+    """
+    data_path, manifest_path = _multi_cache_paths(files)
+    if use_cache and data_path.exists():
+        if _is_multi_cache_valid(files, _read_manifest(manifest_path), manifest_path):
+            try:
+                return pd.read_pickle(data_path)
+            except Exception as e:
+                print(f"⚠️ تعذر قراءة الذاكرة المؤقتة ({data_path}): {e}")
+    
+    workers = min(len(files), max_workers or os.cpu_count() or 1)
+    print(f"📚 تطبيع {len(files)} ملفات باستخدام {workers} عمليات متوازية")
+    
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_parse_source_file, files))
+    except Exception as e:
+        # بيئات لا تسمح بإنشاء عمليات فرعية - نكمل بالتسلسل
+        print(f"⚠️ تعذر التشغيل المتوازي ({e}) - سيتم التحميل بالتسلسل")
+        results = [_parse_source_file(path) for path in files]
+    
+    # مطابقات الأعمدة المكتشفة في العمال تُحفظ هنا مرة واحدة
+    detected_mappings = {}
+    for _, detected in results:
+        detected_mappings.update(detected)
+    _store_column_mappings(detected_mappings)
+    
+    parsed_frames = [frame for frame, _ in results if frame is not None and not frame.empty]
+    if not parsed_frames:
+        return pd.DataFrame()
+    
+    parsed = _drop_duplicate_references(pd.concat(parsed_frames, ignore_index=True))
+    normalized_df = _finalize_government_frame(parsed, _compute_fill_stats(parsed))
+    print(f"✅ تم دمج {len(files)} ملفات: {len(normalized_df):,} صفقة")
+    
+    if use_cache:
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = data_path.with_name(data_path.name + ".tmp")
+            normalized_df.to_pickle(tmp_path)
+            os.replace(tmp_path, data_path)
+            _write_json_atomic(manifest_path, {
+                "code_version": CACHE_VERSION,
+                "rows": len(normalized_df),
+                "files": [
+                    {**_source_fingerprint(path), "content_hash": _file_content_hash(path)}
+                    for path in files
+                ],
+            })
+        except Exception as e:
+            print(f"⚠️ تعذر حفظ الذاكرة المؤقتة: {e}")
+    
+    return normalized_df
+
+
+# =========================================
+# 🚚 الاستيعاب المتدفق للملفات الضخمة (Streaming Ingestion)
+# =========================================
+
+class _MedianSketch:
+    """
+    📊 ملخص تقريبي للوسيط حسب مفتاح (حي / مدينة) بذاكرة محدودة
+    القيم تُوزع على صناديق لوغاريتمية، ويُحفظ لكل (مفتاح، صندوق) العدد والمجموع فقط
+    الوسيط = متوسط القيم داخل الصندوق الذي يقع فيه الترتيب الأوسط
+    (دقيق للمجموعات الصغيرة، وخطؤه أقل من عرض صندوق واحد للمجموعات الكبيرة)
+    """
+    
+    def __init__(self, low: float, high: float, bins: int = 1024):
+        self.edges = np.geomspace(low, high, bins + 1)
+        self.acc = None
+    
+    def add(self, keys: pd.Series, values: pd.Series, weights: Optional[pd.Series] = None):
+        values = pd.to_numeric(values, errors='coerce')
+        valid = values.notna() & keys.notna()
+        if not valid.any():
+            return
         
-        if 'units' in column_mapping:
-            normalized_df['units'] = pd.to_numeric(df[column_mapping['units']], errors='coerce')
-        else:
-            normalized_df['units'] = 1
+        vals = values[valid].to_numpy(dtype=float)
+        counts = np.ones(len(vals)) if weights is None else weights[valid].to_numpy(dtype=float)
+        bins = np.clip(np.searchsorted(self.edges, vals, side='right') - 1, 0, len(self.edges) - 2)
         
-        normalized_df['price'] = pd.to_numeric(normalized_df['price'], errors='coerce')
+        frame = pd.DataFrame({
+            "key": keys[valid].astype(str).to_numpy(),
+            "bin": bins,
+            "count": counts,
+            "sum": vals * counts,
+        })
+        agg = frame.groupby(["key", "bin"]).sum()
+        self.acc = agg if self.acc is None else self.acc.add(agg, fill_value=0)
+    
+    def medians(self) -> pd.Series:
+        if self.acc is None or self.acc.empty:
+            return pd.Series(dtype=float)
         
-        district_median_price = normalized_df.groupby('district')['price'].transform('median')
-        normalized_df['price'] = normalized_df['price'].fillna(district_median_price)
+        acc = self.acc.sort_index()
+        cum = acc["count"].groupby(level=0).cumsum()
+        total = acc["count"].groupby(level=0).transform("sum")
+        bin_mean = acc["sum"] / acc["count"]
         
-        city_median_price = normalized_df.groupby('city')['price'].transform('median')
-        normalized_df['price'] = normalized_df['price'].fillna(city_median_price)
+        # الترتيبان الأوسطان (متساويان عندما يكون العدد فردياً)
+        lower = bin_mean[cum >= np.floor((total + 1) / 2)].groupby(level=0).first()
+        upper = bin_mean[cum >= np.ceil((total + 1) / 2)].groupby(level=0).first()
+        return (lower + upper) / 2
+
+
+def _iter_source_chunks(path: Path, chunksize: int):
+    """📦 قراءة ملف CSV على دفعات محدودة الحجم"""
+    return pd.read_csv(path, encoding="utf-8-sig", sep=";", chunksize=chunksize, low_memory=False)
+
+
+def _stream_fill_stats(path: Path, chunksize: int):
+    """
+    🥇 المرور الأول: حساب قيم التعويض للملف كاملاً بذاكرة محدودة
+    يعيد (قيم التعويض، تعيين الأعمدة، صيغة التاريخ)
+    """
+    column_mapping = None
+    date_format = None
+    area_sketch = _MedianSketch(20, 5000)
+    district_sketch = _MedianSketch(1000, 1_000_000_000)
+    city_sketch = _MedianSketch(1000, 1_000_000_000)
+    global_sketch = _MedianSketch(1000, 1_000_000_000)
+    # عدد الأسعار الناقصة لكل (حي، مدينة) - لتطبيق التعبئة المتسلسلة على الملخصات
+    missing_counts = None
+    
+    for chunk in _iter_source_chunks(path, chunksize):
+        if column_mapping is None:
+            column_mapping = smart_column_mapper(chunk)
+            if 'price' not in column_mapping:
+                return None, column_mapping, None
+        if date_format is None and 'date' in column_mapping:
+            date_format = _infer_date_format(chunk[column_mapping['date']])
         
-        global_median_price = normalized_df['price'].median()
-        if pd.isna(global_median_price):
-            global_median_price = 500000
-        normalized_df['price'] = normalized_df['price'].fillna(global_median_price)
+        parsed = _parse_fill_columns(chunk, column_mapping)
+        everything = pd.Series("all", index=parsed.index)
         
-        normalized_df = normalized_df[(normalized_df["price"] > 10000) & (normalized_df["price"] < 200000000)]
-        normalized_df = normalized_df[(normalized_df["area"] > 20) & (normalized_df["area"] < 5000)]
+        area = pd.to_numeric(parsed['area'], errors='coerce')
+        area_sketch.add(everything, area.where((area > 20) & (area < 5000)))
+        district_sketch.add(parsed['district'], parsed['price_raw'])
+        city_sketch.add(parsed['city'], parsed['price_raw'])
+        global_sketch.add(everything, parsed['price_raw'])
         
-        normalized_df["price_per_sqm"] = normalized_df["price"] / normalized_df["area"].replace(0, pd.NA)
-        normalized_df.loc[(normalized_df["price_per_sqm"] < 500) | (normalized_df["price_per_sqm"] > 20000), "price_per_sqm"] = pd.NA
-        normalized_df['price_per_sqm'] = normalized_df['price_per_sqm'].round(0)
-        normalized_df['units'] = normalized_df['units'].fillna(1)
+        missing = parsed.loc[parsed['price_raw'].isna(), ['district', 'city']].astype(str)
+        chunk_missing = missing.groupby(['district', 'city']).size()
+        missing_counts = chunk_missing if missing_counts is None else missing_counts.add(chunk_missing, fill_value=0)
+    
+    if column_mapping is None:
+        return None, None, None
+    
+    district_medians = district_sketch.medians()
+    
+    # الأسعار الناقصة تأخذ وسيط الحي أولاً، ثم وسيط المدينة (نفس ترتيب التطبيع العادي)
+    missing = missing_counts.reset_index(name='count') if missing_counts is not None and len(missing_counts) else None
+    if missing is not None:
+        missing['district_fill'] = missing['district'].map(district_medians)
+        by_district = missing[missing['district_fill'].notna()]
+        city_sketch.add(by_district['city'], by_district['district_fill'], by_district['count'])
+        global_sketch.add(pd.Series("all", index=by_district.index), by_district['district_fill'], by_district['count'])
+    
+    city_medians = city_sketch.medians()
+    
+    if missing is not None:
+        by_city = missing[missing['district_fill'].isna()].copy()
+        by_city['city_fill'] = by_city['city'].map(city_medians)
+        global_sketch.add(pd.Series("all", index=by_city.index), by_city['city_fill'], by_city['count'])
+    
+    median_area = area_sketch.medians().get("all", np.nan)
+    global_median_price = global_sketch.medians().get("all", np.nan)
+    
+    fill_stats = {
+        "median_area": float(median_area) if pd.notna(median_area) else 120.0,
+        "district_median_price": {str(k): float(v) for k, v in district_medians.items()},
+        "city_median_price": {str(k): float(v) for k, v in city_medians.items()},
+        "global_median_price": float(global_median_price) if pd.notna(global_median_price) else 500000.0,
+    }
+    return fill_stats, column_mapping, date_format
+
+
+def _merge_references(known_refs: np.ndarray, keys: Optional[np.ndarray]) -> np.ndarray:
+    """🔖 دمج مفاتيح صفوف جديدة (أرقام مرجعية / بصمات) في الفهرس المرتب"""
+    if keys is None or not len(keys):
+        return known_refs
+    return np.union1d(known_refs, keys)
+
+
+def _row_keys(chunk: pd.DataFrame, column_mapping: Dict[str, str]) -> Optional[np.ndarray]:
+    """
+    🔑 مفتاح كل صف في فهرس الأرقام المرجعية:
+    الرقم المرجعي إن وُجد، وإلا بصمة ثابتة لمحتوى الصف الخام بقيمة سالبة
+    (لا تتصادم مع الأرقام المرجعية، فالصف بدون رقم مرجعي لا يُستوعب مرتين)
+    None إذا لم يكن في الملف عمود رقم مرجعي
+    """
+    if 'transaction_ref' not in column_mapping:
+        return None
+    
+    refs = _parse_references(chunk[column_mapping['transaction_ref']])
+    keys = refs.fillna(-1).to_numpy(dtype=np.int64)
+    missing = refs.isna().to_numpy()
+    if missing.any():
+        # الأعمدة مرتبة بالاسم والأرقام بصيغة عشرية موحدة: البصمة لا تتأثر بترتيب الأعمدة
+        # ولا باستنتاج نوع العمود في كل دفعة (120 / 120.0)
+        rows = chunk.loc[missing, sorted(chunk.columns)]
+        rows = rows.apply(
+            lambda col: col.astype(float).astype(str)
+            if pd.api.types.is_numeric_dtype(col.dtype) and not pd.api.types.is_bool_dtype(col.dtype)
+            else col.astype(str)
+        )
+        hashes = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+        keys[missing] = -(hashes >> np.uint64(2)).astype(np.int64) - 2
+    return keys
+
+
+def _new_reference_mask(chunk: pd.DataFrame, column_mapping: Dict[str, str],
+                        known_refs: np.ndarray, keys: Optional[np.ndarray] = None) -> pd.Series:
+    """
+    🆕 الصفوف التي لم يُستوعب مفتاحها من قبل (ولا تكرر داخل نفس الدفعة)
+    المفتاح الرقم المرجعي، أو بصمة الصف إذا لم يكن له رقم مرجعي (_row_keys)
+    keys: مفاتيح الدفعة إن حُسبت مسبقاً
+    """
+    if keys is None:
+        keys = _row_keys(chunk, column_mapping)
+    if keys is None:
+        return pd.Series(True, index=chunk.index)
+    
+    # بحث ثنائي في الفهرس المرتب - يكفي قراءة أجزاء صغيرة منه عند فتحه بـ mmap
+    positions = np.searchsorted(known_refs, keys)
+    positions = np.minimum(positions, max(len(known_refs) - 1, 0))
+    already_known = (known_refs[positions] == keys) if len(known_refs) else np.zeros(len(keys), dtype=bool)
+    
+    duplicated = pd.Series(keys).duplicated(keep="first").to_numpy()
+    return pd.Series(~already_known & ~duplicated, index=chunk.index)
+
+
+def ingest_government_data_streaming(source_path: Path = DATA_PATH,
+                                     store_dir: Path = STORE_DIR,
+                                     chunksize: int = STREAM_CHUNK_ROWS) -> Optional[Dict]:
+    """
+    🚚 استيعاب ملف صفقات ضخم على دفعات إلى مخزن أعمدة مجزأ (data_store/)
+    
+    - المرور الأول: قيم التعويض (الوسيط) للملف كاملاً عبر ملخصات محدودة الحجم
+    - المرور الثاني: تطبيع كل دفعة بنفس القواعد وكتابتها كجزء مستقل
+    استهلاك الذاكرة ثابت تقريباً مهما كان حجم الملف (دفعة واحدة + الملخصات)
+    
+    يعيد وصف المخزن (manifest) أو None عند الفشل
+    """
+    source_path = Path(source_path)
+    store_dir = Path(store_dir)
+    
+    if not source_path.exists():
+        print(f"❌ ملف البيانات غير موجود في المسار: {source_path}")
+        return None
+    
+    print(f"🚚 استيعاب متدفق: {source_path} (دفعات من {chunksize:,} صف)")
+    
+    fill_stats, column_mapping, date_format = _stream_fill_stats(source_path, chunksize)
+    if fill_stats is None:
+        print("❌ لا يمكن الاستمرار: لم يتم العثور على عمود السعر")
+        return None
+    
+    # الكتابة في مجلد مؤقت ثم الاستبدال - المخزن القديم يبقى صالحاً حتى النهاية
+    tmp_dir = store_dir.with_name(store_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    
+    parts = []
+    previous_date = None
+    total_rows = 0
+    seen_refs = np.array([], dtype=np.int64)
+    
+    for index, chunk in enumerate(_iter_source_chunks(source_path, chunksize)):
+        parsed_dates = None
+        if 'date' in column_mapping:
+            parsed_dates = _parse_dates(chunk[column_mapping['date']], date_format, previous_date)
+            if parsed_dates.notna().any():
+                previous_date = parsed_dates.dropna().iloc[-1]
         
-        normalized_df['price_source'] = 'original'
-        normalized_df.loc[normalized_df['price_raw'].isna(), 'price_source'] = 'estimated'
+        # 🔖 الصفقات المعاد نشرها (نفس الرقم المرجعي أو نفس محتوى الصف) تُستوعب مرة واحدة فقط
+        keys = _row_keys(chunk, column_mapping)
+        new_rows = _new_reference_mask(chunk, column_mapping, seen_refs, keys)
+        if parsed_dates is not None:
+            parsed_dates = parsed_dates[new_rows]
+        chunk = chunk[new_rows]
         
-        normalized_df['price_validity'] = 'valid'
-        normalized_df.loc[normalized_df['price_raw'].isna(), 'price_validity'] = 'estimated'
-        normalized_df.loc[(normalized_df['price_per_sqm'].isna()) & (normalized_df['price_validity'] == 'valid'), 'price_validity'] = 'corrected'
+        parsed = _parse_government_frame(chunk, column_mapping, parsed_dates=parsed_dates)
+        normalized_chunk = _finalize_government_frame(parsed, fill_stats)
+        if keys is not None:
+            seen_refs = _merge_references(seen_refs, keys[new_rows.to_numpy()])
         
-        # ✅ استخدام الدالة المحسنة لتصنيف العقارات - بدون "غير سكني"
-        normalized_df["property_subtype"] = normalized_df.apply(
-            lambda row: classify_property_subtype(row["area"], row["property_type"]), 
-            axis=1
-        )
+        part_name = f"part-{index:05d}.pkl"
+        normalized_chunk.to_pickle(tmp_dir / part_name)
+        parts.append({"file": part_name, "rows": len(normalized_chunk)})
+        total_rows += len(normalized_chunk)
+        print(f"  📦 دفعة {index + 1}: {len(chunk):,} صف خام ← {len(normalized_chunk):,} صف مطبّع")
+    
+    manifest = _source_fingerprint(source_path)
+    manifest.update({
+        "content_hash": _file_content_hash(source_path),
+        "code_version": CACHE_VERSION,
+        "column_mapping": column_mapping,
+        "date_format": date_format,
+        "rows": total_rows,
+        "parts": parts,
+    })
+    np.save(tmp_dir / "refs.npy", seen_refs)
+    _write_json_atomic(tmp_dir / "fill_stats.json", fill_stats)
+    _write_json_atomic(tmp_dir / "manifest.json", manifest)
+    
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    
+    print(f"✅ اكتمل الاستيعاب: {total_rows:,} صف في {len(parts)} جزء → {store_dir}")
+    return manifest
+
+
+def ingest_government_data_incremental(source_path: Path = DATA_PATH,
+                                       store_dir: Path = STORE_DIR,
+                                       chunksize: int = STREAM_CHUNK_ROWS) -> Optional[Dict]:
+    """
+    🆕 استيعاب تزايدي: يُطبّع فقط الصفقات الجديدة (حسب الرقم المرجعي) ويضيفها للمخزن
+    
+    - إذا لم يتغير الملف منذ آخر استيعاب: لا شيء يُقرأ
+    - الصفقات المعاد نشرها بنفس الرقم المرجعي تُتجاهل
+    - قيم التعويض للصفوف الجديدة تؤخذ من آخر استيعاب كامل (fill_stats.json)
+    - إذا لم يوجد مخزن صالح (أو تغيرت نسخة الكود / الأعمدة) يُعاد البناء كاملاً
+    
+    يعيد ملخصاً: status (unchanged / appended / rebuilt) و new_rows و duplicates و new_parts
+    """
+    source_path = Path(source_path)
+    store_dir = Path(store_dir)
+    
+    if not source_path.exists():
+        print(f"❌ ملف البيانات غير موجود في المسار: {source_path}")
+        return None
+    
+    manifest_path = store_dir / "manifest.json"
+    manifest = _read_manifest(manifest_path)
+    fill_stats = _read_manifest(store_dir / "fill_stats.json")
+    refs_path = store_dir / "refs.npy"
+    
+    store_is_usable = (
+        manifest is not None
+        and fill_stats is not None
+        and refs_path.exists()
+        and manifest.get("code_version") == CACHE_VERSION
+        and manifest.get("source") == str(source_path.resolve())
+        and "transaction_ref" in manifest.get("column_mapping", {})
+    )
+    if not store_is_usable:
+        print("ℹ️ لا يوجد مخزن صالح للاستيعاب التزايدي - بناء كامل")
+        return _rebuild_store(source_path, store_dir, chunksize)
+    
+    current = _source_fingerprint(source_path)
+    if manifest.get("size") == current["size"] and manifest.get("mtime") == current["mtime"]:
+        return {"status": "unchanged", "new_rows": 0, "duplicates": 0, "new_parts": []}
+    
+    column_mapping = manifest["column_mapping"]
+    header = pd.read_csv(source_path, encoding="utf-8-sig", sep=";", nrows=0).columns
+    missing_columns = set(column_mapping.values()) - set(header)
+    if missing_columns:
+        print(f"⚠️ تغيرت أعمدة الملف ({', '.join(missing_columns)}) - بناء كامل")
+        return _rebuild_store(source_path, store_dir, chunksize)
+    
+    date_format = manifest.get("date_format")
+    known_refs = np.load(refs_path, mmap_mode="r")
+    
+    next_index = len(manifest.get("parts", []))
+    new_parts = []
+    added_refs = np.array([], dtype=np.int64)
+    previous_date = None
+    new_rows_total = 0
+    duplicates = 0
+    
+    for chunk in _iter_source_chunks(source_path, chunksize):
+        parsed_dates = None
+        if 'date' in column_mapping:
+            parsed_dates = _parse_dates(chunk[column_mapping['date']], date_format, previous_date)
+            if parsed_dates.notna().any():
+                previous_date = parsed_dates.dropna().iloc[-1]
         
-        if selected_city and selected_city != 'الكل':
-            city_mask = normalized_df['city'].astype(str).str.strip().str.contains(selected_city.strip(), case=False, na=False)
-            normalized_df = normalized_df[city_mask]
+        keys = _row_keys(chunk, column_mapping)
+        is_new = _new_reference_mask(chunk, column_mapping, known_refs, keys)
+        is_new &= _new_reference_mask(chunk, column_mapping, added_refs, keys)
+        duplicates += int((~is_new).sum())
+        if not is_new.any():
+            continue
         
-        if selected_property_type and selected_property_type != 'الكل':
-            if selected_property_type in ['سكني', 'تجاري', 'أرض']:
-                normalized_df = normalized_df[normalized_df['property_type'] == selected_property_type]
+        # ✅ التحليل والتطبيع للصفوف الجديدة فقط
+        parsed = _parse_government_frame(
+            chunk[is_new], column_mapping,
+            parsed_dates=parsed_dates[is_new] if parsed_dates is not None else None
+        )
+        normalized_chunk = _finalize_government_frame(parsed, fill_stats)
+        added_refs = _merge_references(added_refs, keys[is_new.to_numpy()])
         
-        return normalized_df.reset_index(drop=True)
+        part_name = f"part-{next_index:05d}.pkl"
+        next_index += 1
+        normalized_chunk.to_pickle(store_dir / part_name)
+        new_parts.append({"file": part_name, "rows": len(normalized_chunk)})
+        new_rows_total += len(normalized_chunk)
     
-    except Exception as e:
-        print("🔥 ERROR IN GOVERNMENT DATA PROVIDER")
-        import traceback
-        traceback.print_exc()
-        raise e
+    if len(added_refs):
+        merged_refs = np.union1d(np.asarray(known_refs), added_refs)
+        del known_refs
+        tmp_refs = store_dir / "refs.tmp.npy"
+        np.save(tmp_refs, merged_refs)
+        os.replace(tmp_refs, refs_path)
+    
+    manifest.update(current)
+    manifest["content_hash"] = _file_content_hash(source_path)
+    manifest["parts"] = manifest.get("parts", []) + new_parts
+    manifest["rows"] = manifest.get("rows", 0) + new_rows_total
+    _write_json_atomic(manifest_path, manifest)
+    
+    print(f"🆕 استيعاب تزايدي: {new_rows_total:,} صف جديد، {duplicates:,} صف موجود مسبقاً")
+    return {
+        "status": "appended",
+        "new_rows": new_rows_total,
+        "duplicates": duplicates,
+        "new_parts": [part["file"] for part in new_parts],
+    }
+
+
+def source_changed(source_path: Path = DATA_PATH, store_dir: Path = STORE_DIR) -> bool:
+    """
+    🔎 هل تغير ملف المصدر منذ آخر استيعاب للمخزن؟
+    الحجم ووقت التعديل أولاً، وبصمة المحتوى فقط إذا لُمس الملف بنفس الحجم
+    """
+    manifest_path = Path(store_dir) / "manifest.json"
+    manifest = _read_manifest(manifest_path)
+    if not manifest:
+        return True
+    
+    current = _source_fingerprint(Path(source_path))
+    if manifest.get("source") != current["source"] or manifest.get("size") != current["size"]:
+        return True
+    if manifest.get("mtime") == current["mtime"]:
+        return False
+    
+    # الملف لُمس دون تغيير محتواه: نحفظ وقت التعديل الجديد حتى لا نعيد حساب البصمة كل دورة
+    if manifest.get("content_hash") == _file_content_hash(Path(source_path)):
+        manifest["mtime"] = current["mtime"]
+        _write_json_atomic(manifest_path, manifest)
+        return False
+    return True
+
+
+def _rebuild_store(source_path: Path, store_dir: Path, chunksize: int) -> Optional[Dict]:
+    """🔁 إعادة بناء المخزن كاملاً وإرجاع ملخص بنفس شكل الاستيعاب التزايدي"""
+    rebuilt = ingest_government_data_streaming(source_path, store_dir, chunksize)
+    if rebuilt is None:
+        return None
+    return {
+        "status": "rebuilt",
+        "new_rows": rebuilt["rows"],
+        "duplicates": 0,
+        "new_parts": [part["file"] for part in rebuilt["parts"]],
+    }
+
+
+def _cities_mask(df: pd.DataFrame, cities: List[str]) -> pd.Series:
+    """🏙️ صفوف أي مدينة من القائمة (نفس المطابقة الجزئية في filter_government_data)"""
+    city_names = df['city'].astype(str).str.strip()
+    mask = pd.Series(False, index=df.index)
+    for city in cities:
+        mask |= city_names.str.contains(city.strip(), case=False, na=False)
+    return mask
+
+
+def load_normalized_store(store_dir: Path = STORE_DIR,
+                          selected_city: Optional[str] = None,
+                          selected_property_type: Optional[str] = None,
+                          cities: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    📚 قراءة مخزن البيانات المطبّعة جزءاً جزءاً مع تطبيق الفلاتر أثناء القراءة
+    (لا يُحمّل في الذاكرة إلا الصفوف المطلوبة)
+    cities: تقييد القراءة بعدة مدن معاً (مثل المدن التي مستها صفقات جديدة)
+    """
+    manifest = _read_manifest(Path(store_dir) / "manifest.json")
+    if not manifest:
+        print(f"⚠️ لا يوجد مخزن بيانات في: {store_dir}")
+        return pd.DataFrame()
+    
+    frames = []
+    for part in manifest.get("parts", []):
+        part_df = pd.read_pickle(Path(store_dir) / part["file"])
+        if cities:
+            part_df = part_df[_cities_mask(part_df, cities)]
+        frames.append(filter_government_data(part_df, selected_city, selected_property_type))
+    if not frames:
+        return pd.DataFrame(columns=NORMALIZED_COLUMNS)
+    # الأجزاء قد تحمل فئات مختلفة - الدمج يعيدها نصاً ثم نعيد تصنيفها
+    return _categorize(pd.concat(frames, ignore_index=True))
 
 
 # =========================================
 # ✅ الدالة لقراءة ملف المشاريع (مع توحيد اسم العمود - نسخة محسنة)
 # =========================================
 
-def load_projects_data():
-    """📁 قراءة ملف المشاريع (projects.xlsx)"""
-    import pandas as pd
+def _coerce_coordinates(df: pd.DataFrame) -> pd.DataFrame:
+    """📍 ضمان أن الإحداثيات ونطاق التأثير أرقام (تُحفظ في الذاكرة جاهزة للحساب)"""
+    for col in COORDINATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col].dtype):
+            df[col] = parse_numeric(df[col])
+    return df
+
+
+def _normalize_projects_frame(projects: pd.DataFrame) -> pd.DataFrame:
+    """🧹 توحيد أعمدة ملف المشاريع (يُنفذ مرة واحدة ثم تُحفظ النتيجة)"""
+    projects.columns = projects.columns.str.strip()
+    
+    # ✅ توحيد اسم عمود اسم المشروع - حل نهائي ومرن جدًا
+    for col in projects.columns:
+        col_clean = (
+            str(col)
+            .strip()
+            .replace(" ", "")
+            .replace("_", "")
+            .replace("\u200c", "")
+            .replace("\u200d", "")
+            .lower()
+        )
+        
+        if "اسمالمشروع" in col_clean or "projectname" in col_clean:
+            projects = projects.rename(columns={col: "اسم_المشروع"})
+            print(f"✅ تم تعيين عمود المشاريع: '{col}' → 'اسم_المشروع'")
+            break
     
+    if "اسم_المشروع" not in projects.columns:
+        print("❌ تحذير: لم يتم العثور على عمود أسماء المشاريع")
+        print("📋 الأعمدة الحالية:", list(projects.columns))
+    
+    # توحيد أسماء الأعمدة للمشاريع
+    if "خط العرض" in projects.columns:
+        projects = projects.rename(columns={"خط العرض": "خط_العرض"})
+    if "خط الطول" in projects.columns:
+        projects = projects.rename(columns={"خط الطول": "خط_الطول"})
+    if "نطاق_التأثير_كم" in projects.columns:
+        projects = projects.rename(columns={"نطاق_التأثير_كم": "نطاق_التأثير"})
+    if "نطاق التأثير (كم)" in projects.columns:
+        projects = projects.rename(columns={"نطاق التأثير (كم)": "نطاق_التأثير"})
+    elif "نطاق التأثير" in projects.columns:
+        projects = projects.rename(columns={"نطاق التأثير": "نطاق_التأثير"})
+    
+    return _coerce_coordinates(projects)
+
+
+def load_projects_data(use_cache: bool = True):
+    """
+    📁 قراءة ملف المشاريع (projects.xlsx)
+    ⚡ النسخة الموحدة تُحفظ في data_cache وتُستخدم طالما لم يتغير الملف
+    """
     try:
-        projects = pd.read_excel("projects.xlsx")
-        projects.columns = projects.columns.str.strip()
-        
-        # ✅ توحيد اسم عمود اسم المشروع - حل نهائي ومرن جدًا
-        for col in projects.columns:
-            col_clean = (
-                str(col)
-                .strip()
-                .replace(" ", "")
-                .replace("_", "")
-                .replace("\u200c", "")
-                .replace("\u200d", "")
-                .lower()
-            )
-            
-            if "اسمالمشروع" in col_clean or "projectname" in col_clean:
-                projects = projects.rename(columns={col: "اسم_المشروع"})
-                print(f"✅ تم تعيين عمود المشاريع: '{col}' → 'اسم_المشروع'")
-                break
-        
-        if "اسم_المشروع" not in projects.columns:
-            print("❌ تحذير: لم يتم العثور على عمود أسماء المشاريع")
-            print("📋 الأعمدة الحالية:", list(projects.columns))
-        
-        # توحيد أسماء الأعمدة للمشاريع
-        if "خط العرض" in projects.columns:
-            projects = projects.rename(columns={"خط العرض": "خط_العرض"})
-        if "خط الطول" in projects.columns:
-            projects = projects.rename(columns={"خط الطول": "خط_الطول"})
-        if "نطاق_التأثير_كم" in projects.columns:
-            projects = projects.rename(columns={"نطاق_التأثير_كم": "نطاق_التأثير"})
-        if "نطاق التأثير (كم)" in projects.columns:
-            projects = projects.rename(columns={"نطاق التأثير (كم)": "نطاق_التأثير"})
-        elif "نطاق التأثير" in projects.columns:
-            projects = projects.rename(columns={"نطاق التأثير": "نطاق_التأثير"})
+        if not PROJECTS_PATH.exists():
+            raise FileNotFoundError(PROJECTS_PATH)
+        
+        if use_cache:
+            cached = _load_cached_frame(PROJECTS_PATH)
+            if cached is not None:
+                return cached
+        
+        projects = _normalize_projects_frame(pd.read_excel(PROJECTS_PATH))
         
         print(f"✅ تم قراءة ملف المشاريع بنجاح")
         print(f"📊 عدد المشاريع: {len(projects)}")
         print(f"📋 أعمدة المشاريع: {list(projects.columns)}")
         
+        if use_cache:
+            _store_cached_frame(PROJECTS_PATH, projects)
         return projects
     
     except FileNotFoundError:
@@ -364,46 +1438,62 @@ def load_projects_data():
 # ✅ الدالة لقراءة ملف الأحياء (مع توحيد اسم العمود)
 # =========================================
 
-def load_districts_data():
-    """📁 قراءة ملف الأحياء (districts.xlsx)"""
-    import pandas as pd
+def _normalize_districts_frame(districts: pd.DataFrame) -> pd.DataFrame:
+    """🧹 توحيد أعمدة ملف الأحياء (يُنفذ مرة واحدة ثم تُحفظ النتيجة)"""
+    # تنظيف أسماء الأعمدة من الفراغات
+    districts.columns = districts.columns.str.strip()
+    
+    # DEBUG: طباعة أسماء الأعمدة للتشخيص
+    print("DEBUG: أعمدة ملف الأحياء:", list(districts.columns))
+    
+    # تنظيف اسم الحي (وقائي) - البحث عن أي عمود يحتوي على كلمة "حي"
+    district_name_column = None
+    for col in districts.columns:
+        if "حي" in col:
+            district_name_column = col
+            break
     
+    if district_name_column and district_name_column != "اسم الحي":
+        print(f"DEBUG: تم العثور على عمود الأحياء باسم: {district_name_column}")
+        districts = districts.rename(columns={district_name_column: "اسم الحي"})
+    
+    # تنظيف اسم الحي
+    if "اسم الحي" in districts.columns:
+        districts["اسم الحي"] = districts["اسم الحي"].astype(str).str.strip()
+    
+    # توحيد أسماء الأعمدة للإحداثيات
+    if "خط العرض" in districts.columns:
+        districts = districts.rename(columns={"خط العرض": "خط_العرض"})
+    if "خط الطول" in districts.columns:
+        districts = districts.rename(columns={"خط الطول": "خط_الطول"})
+    if "نطاق التأثير (كم)" in districts.columns:
+        districts = districts.rename(columns={"نطاق التأثير (كم)": "نطاق_التأثير"})
+    
+    return _coerce_coordinates(districts)
+
+
+def load_districts_data(use_cache: bool = True):
+    """
+    📁 قراءة ملف الأحياء (districts.xlsx)
+    ⚡ النسخة الموحدة تُحفظ في data_cache وتُستخدم طالما لم يتغير الملف
+    """
     try:
-        districts = pd.read_excel("districts.xlsx")
-        
-        # تنظيف أسماء الأعمدة من الفراغات
-        districts.columns = districts.columns.str.strip()
-        
-        # DEBUG: طباعة أسماء الأعمدة للتشخيص
-        print("DEBUG: أعمدة ملف الأحياء:", list(districts.columns))
-        
-        # تنظيف اسم الحي (وقائي) - البحث عن أي عمود يحتوي على كلمة "حي"
-        district_name_column = None
-        for col in districts.columns:
-            if "حي" in col:
-                district_name_column = col
-                break
-        
-        if district_name_column and district_name_column != "اسم الحي":
-            print(f"DEBUG: تم العثور على عمود الأحياء باسم: {district_name_column}")
-            districts = districts.rename(columns={district_name_column: "اسم الحي"})
+        if not DISTRICTS_PATH.exists():
+            raise FileNotFoundError(DISTRICTS_PATH)
         
-        # تنظيف اسم الحي
-        if "اسم الحي" in districts.columns:
-            districts["اسم الحي"] = districts["اسم الحي"].astype(str).str.strip()
+        if use_cache:
+            cached = _load_cached_frame(DISTRICTS_PATH)
+            if cached is not None:
+                return cached
         
-        # توحيد أسماء الأعمدة للإحداثيات
-        if "خط العرض" in districts.columns:
-            districts = districts.rename(columns={"خط العرض": "خط_العرض"})
-        if "خط الطول" in districts.columns:
-            districts = districts.rename(columns={"خط الطول": "خط_الطول"})
-        if "نطاق التأثير (كم)" in districts.columns:
-            districts = districts.rename(columns={"نطاق التأثير (كم)": "نطاق_التأثير"})
+        districts = _normalize_districts_frame(pd.read_excel(DISTRICTS_PATH))
         
         print(f"✅ تم قراءة ملف الأحياء بنجاح")
         print(f"📊 عدد الأحياء: {len(districts)}")
         print(f"📋 الأعمدة بعد التوحيد: {list(districts.columns)}")
         
+        if use_cache:
+            _store_cached_frame(DISTRICTS_PATH, districts)
         return districts
     
     except FileNotFoundError:
@@ -1,9 +1,9 @@
-from government_data_provider import load_government_data
+from data_repository import get_repository
 
 
 def get_market_data(city=None, property_type=None):
 
-    df = load_government_data()
+    df = get_repository().transactions()
 
     print("DEBUG عدد كل الصفقات:", len(df))
     print("DEBUG المدن الموجودة:", df["city"].unique()[:10])
@@ -9,54 +9,500 @@
 # لا يُستدعى من orchestrator
 # الذاكرة فقط - لا تحليل ولا قرار
 # =========================================
+# هيكل التخزين (مقسم حسب المدينة ونوع العقار):
+#   market_memory/<المدينة>/<نوع_العقار>/catalog.json
+#   market_memory/<المدينة>/<نوع_العقار>/<الوقت>.pkl
+# الفهرس (catalog) يحمل قائمة اللقطات مرتبة زمنياً، لذلك "آخر N لقطات"
+# قراءة فهرس صغير ثم ملفات محددة بأنواعها - بدون مسح المجلد كاملاً
+# ملفات CSV القديمة في جذر المجلد ما زالت مقروءة كاحتياط
+#
+# ترميز الفروقات (Delta Encoding):
+# - أحدث لقطة تُحفظ كاملة دائماً
+# - عند وصول لقطة جديدة تتحول السابقة إلى ملف فروقات <الوقت>.delta.pkl
+#   (الصفوف المضافة والمحذوفة بينها وبين اللقطة التالية) ويُحذف ملفها الكامل
+# - أي لقطة قديمة تُستعاد بالرجوع من أقرب لقطة كاملة بعدها
+# - نفس ملف الفروقات هو "مجموعة التغييرات" التي يقرأها AlertEngine مباشرة
+# =========================================
 
 import os
+import json
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 
 MEMORY_FOLDER = "market_memory"
 os.makedirs(MEMORY_FOLDER, exist_ok=True)
 
+CATALOG_FILE = "catalog.json"
+SNAPSHOT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# أقصى عدد لقطات فروقات متتالية قبل الاحتفاظ بلقطة كاملة (يحدد تكلفة الاستعادة)
+MAX_DELTA_CHAIN = 24
+
+# إذا تغير أكثر من هذه النسبة من الصفوف تبقى اللقطة كاملة (الفروقات لا توفر شيئاً)
+MAX_DELTA_RATIO = 0.5
+
+# سياسة الاحتفاظ: (أقصى عمر للطبقة، تنسيق فترة الدمج)
+# - آخر 48 ساعة: كل اللقطات
+# - حتى 30 يوماً: لقطة واحدة لكل ساعة
+# - أقدم من ذلك: لقطة واحدة لكل يوم (rollup يومي)
+RETENTION_POLICY = [
+    (timedelta(hours=48), None),
+    (timedelta(days=30), "%Y-%m-%d %H"),
+    (None, "%Y-%m-%d"),
+]
+
+# أعمدة الملخص: الاسم العربي أولاً ثم اسم البيانات المطبّعة
+SUMMARY_COLUMNS = {
+    "district": ["الحي", "district"],
+    "price_per_sqm": ["سعر_المتر", "price_per_sqm"],
+    "type": ["نوع_العقار", "property_type"],
+    "area": ["المساحة", "area"],
+    "price": ["السعر", "price"],
+}
+
+# مدرج سعر المتر بفئات ثابتة (القيم خارج المدى تُحسب في الفئة الطرفية)
+PRICE_HIST_WIDTH = 50
+PRICE_HIST_MAX = 20000
+
+
+def _safe_name(value) -> str:
+    """تحويل اسم المدينة / النوع إلى اسم مجلد آمن"""
+    return str(value).strip().replace("/", "-").replace("\\", "-") or "غير_محدد"
+
+
+def _partition_dir(city, property_type) -> str:
+    return os.path.join(MEMORY_FOLDER, _safe_name(city), _safe_name(property_type))
+
+
+def _read_catalog(partition: str) -> dict:
+    try:
+        with open(os.path.join(partition, CATALOG_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"snapshots": []}
+
+
+def _write_catalog(partition: str, catalog: dict):
+    """كتابة الفهرس بشكل ذري (ملف مؤقت ثم استبدال)"""
+    path = os.path.join(partition, CATALOG_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def list_snapshots(city: str, property_type: str):
+    """
+    قائمة اللقطات المسجلة في الفهرس (الأقدم أولاً)
+    كل عنصر: id, snapshot_time, file, rows
+    """
+    return _read_catalog(_partition_dir(city, property_type)).get("snapshots", [])
+
+
+def _row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """بصمة محتوى كل صف (لاكتشاف الصفوف المعدلة)"""
+    content = df.drop(columns=["__snapshot_time__"], errors="ignore")
+    return pd.util.hash_pandas_object(content, index=False).to_numpy()
+
+
+def _key_kind(df: pd.DataFrame) -> str:
+    """مفتاح الصف: الرقم المرجعي للصفقة إذا كان متاحاً وفريداً، وإلا بصمة الصف"""
+    if "transaction_ref" in df.columns:
+        refs = df["transaction_ref"]
+        if refs.notna().all() and refs.is_unique:
+            return "transaction_ref"
+    return "row_hash"
+
+
+def _row_keys(df: pd.DataFrame, kind: str) -> np.ndarray:
+    if kind == "transaction_ref":
+        return df["transaction_ref"].to_numpy(dtype="int64")
+    # الصفوف المتطابقة تُرقّم حسب ترتيب ظهورها حتى يبقى المفتاح فريداً
+    hashes = _row_hashes(df)
+    occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy(dtype="uint64")
+    return hashes * np.uint64(1000003) + occurrence
+
+
+def _compute_delta(previous_df: pd.DataFrame, current_df: pd.DataFrame):
+    """
+    الفروقات بين لقطتين متتاليتين:
+    added = صفوف جديدة (أو معدلة) في الحالية، removed = صفوف اختفت (أو عُدلت) من السابقة
+    """
+    kind = _key_kind(current_df)
+    if kind == "transaction_ref" and _key_kind(previous_df) != kind:
+        kind = "row_hash"
+
+    prev_keys = _row_keys(previous_df, kind)
+    curr_keys = _row_keys(current_df, kind)
+
+    added = ~np.isin(curr_keys, prev_keys)
+    removed = ~np.isin(prev_keys, curr_keys)
+
+    # نفس الرقم المرجعي بمحتوى مختلف (مثلاً بعد إعادة التطبيع) = حذف + إضافة
+    if kind == "transaction_ref":
+        prev_hashes = pd.Series(_row_hashes(previous_df), index=prev_keys)
+        common = ~added
+        changed_keys = curr_keys[common][
+            prev_hashes.reindex(curr_keys[common]).to_numpy() != _row_hashes(current_df)[common]
+        ]
+        if len(changed_keys):
+            added |= np.isin(curr_keys, changed_keys)
+            removed |= np.isin(prev_keys, changed_keys)
+
+    return {
+        "key": kind,
+        "added": current_df[added].drop(columns=["__snapshot_time__"], errors="ignore"),
+        "removed": previous_df[removed].drop(columns=["__snapshot_time__"], errors="ignore"),
+    }
+
+
+def _restore_dtypes(frame: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+    """الدمج قد يحول الأعمدة الفئوية إلى نص - نعيدها كما كانت"""
+    for col in like.columns:
+        if col in frame.columns and isinstance(like[col].dtype, pd.CategoricalDtype) \
+                and not isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = frame[col].astype("category")
+    return frame
+
+
+def _apply_reverse_delta(next_df: pd.DataFrame, delta: dict) -> pd.DataFrame:
+    """استعادة اللقطة السابقة من اللاحقة: حذف ما أضيف وإرجاع ما حُذف"""
+    added_keys = _row_keys(delta["added"], delta["key"])
+    kept = next_df[~np.isin(_row_keys(next_df, delta["key"]), added_keys)]
+    frame = pd.concat([kept, delta["removed"]], ignore_index=True)
+    return _restore_dtypes(frame, next_df)
+
+
+def _delta_chain_length(entries, index: int) -> int:
+    """عدد لقطات الفروقات المتتالية قبل الموضع المحدد"""
+    length = 0
+    for entry in reversed(entries[:index]):
+        if entry.get("file"):
+            break
+        length += 1
+    return length
+
+
+# =========================================
+# 📊 ملخص اللقطة (يُحسب مرة واحدة عند التخزين)
+# =========================================
+
+def _summary_column(df: pd.DataFrame, name: str):
+    for col in SUMMARY_COLUMNS[name]:
+        if col in df.columns:
+            return df[col]
+    return None
+
+
+def _numeric_column(df: pd.DataFrame, name: str):
+    values = _summary_column(df, name)
+    return None if values is None else pd.to_numeric(values, errors="coerce").dropna()
 
-def _build_filename(city, property_type):
-    date_str = datetime.now().strftime("%Y-%m-%d_%H%M")
-    return f"{city}_{property_type}_{date_str}.csv"
+
+def _counts(values) -> dict:
+    if values is None:
+        return {}
+    counts = values.astype(object).value_counts()
+    return {str(k): int(v) for k, v in counts.items()}
+
+
+def _district_stats(df: pd.DataFrame) -> dict:
+    """
+    إحصائيات كل حي بتجميع واحد: عدد الصفقات، وعدد ومجموع أسعار المتر
+    (المجموع بدل المتوسط حتى تبقى قابلة للجمع والمقارنة)
+    """
+    districts = _summary_column(df, "district")
+    if districts is None:
+        return {}
+
+    prices = _summary_column(df, "price_per_sqm")
+    frame = pd.DataFrame({
+        "district": districts.astype(object).to_numpy(),
+        "price": (
+            pd.to_numeric(prices, errors="coerce").to_numpy()
+            if prices is not None else np.full(len(df), np.nan)
+        ),
+    })
+    stats = frame.groupby("district")["price"].agg(["size", "count", "sum"])
+    return {
+        str(district): {"count": int(row.size), "price_count": int(row.count), "price_sum": float(row.sum)}
+        for district, row in zip(stats.index, stats.itertuples(index=False))
+    }
+
+
+def district_stats_frame(summary: dict) -> pd.DataFrame:
+    """إحصائيات الأحياء من الملخص كجدول (الحي فهرس): count / price_count / price_sum"""
+    stats = summary.get("district_stats") or {}
+    frame = pd.DataFrame.from_dict(stats, orient="index", columns=["count", "price_count", "price_sum"])
+    frame.index.name = "district"
+    return frame
+
+
+def diff_district_summaries(previous_summary: dict, current_summary: dict) -> pd.DataFrame:
+    """
+    مقارنة لقطتين على مستوى الحي بدمج واحد (O(عدد الأحياء)):
+    تغير العدد، تغير متوسط سعر المتر، وتغير حصة الحي من صفقات المدينة
+    الأحياء المختفية أو الجديدة تظهر بعدد صفر في الطرف الآخر
+    """
+    merged = district_stats_frame(previous_summary).join(
+        district_stats_frame(current_summary), how="outer", lsuffix="_prev", rsuffix="_curr"
+    ).fillna(0)
+
+    prev_count = merged["count_prev"]
+    curr_count = merged["count_curr"]
+    prev_price = merged["price_sum_prev"] / merged["price_count_prev"].where(merged["price_count_prev"] > 0)
+    curr_price = merged["price_sum_curr"] / merged["price_count_curr"].where(merged["price_count_curr"] > 0)
+    prev_total = prev_count.sum()
+    curr_total = curr_count.sum()
+
+    return pd.DataFrame({
+        "prev_count": prev_count.astype(int),
+        "curr_count": curr_count.astype(int),
+        "count_change_pct": (curr_count - prev_count) / prev_count.where(prev_count > 0) * 100,
+        "prev_price": prev_price,
+        "curr_price": curr_price,
+        "price_change_pct": (curr_price - prev_price) / prev_price.where(prev_price > 0) * 100,
+        "prev_share": prev_count / prev_total if prev_total else 0.0,
+        "curr_share": curr_count / curr_total if curr_total else 0.0,
+    }, index=merged.index)
+
+
+def summarize_snapshot(df: pd.DataFrame, snapshot_time: str = None) -> dict:
+    """
+    ملخص مضغوط للقطة يكفي لفحوصات AlertEngine بدون قراءة البيانات:
+    العدد، عدد الصفقات لكل حي، توزيع الأنواع، مدرج سعر المتر،
+    المتوسط والربيعيات (33% / 66%)، ومتوسط المساحة والسعر
+    """
+    if snapshot_time is None and "__snapshot_time__" in df.columns and len(df):
+        snapshot_time = str(df["__snapshot_time__"].iloc[0])
+
+    summary = {
+        "snapshot_time": snapshot_time,
+        "count": int(len(df)),
+        "district_counts": _counts(_summary_column(df, "district")),
+        "type_counts": _counts(_summary_column(df, "type")),
+        "price_count": 0,
+        "mean_price_per_sqm": None,
+        "price_quantiles": None,
+        "segment_shares": None,
+        "price_histogram": {},
+        "mean_area": None,
+        "mean_price": None,
+        "district_stats": _district_stats(df),
+    }
+
+    prices = _numeric_column(df, "price_per_sqm")
+    if prices is not None and len(prices):
+        summary["price_count"] = int(len(prices))
+        summary["mean_price_per_sqm"] = float(prices.mean())
+
+        p_low, p_high = prices.quantile([0.33, 0.66])
+        summary["price_quantiles"] = [float(p_low), float(p_high)]
+        # توزيع اللقطة على شرائحها السعرية نفسها (منخفض / متوسط / مرتفع)
+        summary["segment_shares"] = [
+            float((prices <= p_low).mean()),
+            float(((prices > p_low) & (prices <= p_high)).mean()),
+            float((prices > p_high).mean()),
+        ]
+
+        # فئات مغلقة من اليمين (الأسعار المقربة تتركز على الحدود: 2600، 3000...)
+        bins = np.ceil(prices.clip(0, PRICE_HIST_MAX) / PRICE_HIST_WIDTH).astype(int)
+        summary["price_histogram"] = {str(k): int(v) for k, v in bins.value_counts().sort_index().items()}
+
+    # نفس منطق حجم الصفقة: المساحة إن وجدت وإلا السعر
+    areas = _numeric_column(df, "area")
+    if areas is not None and areas.any():
+        summary["mean_area"] = float(areas.mean())
+    total_prices = _numeric_column(df, "price")
+    if total_prices is not None and total_prices.any():
+        summary["mean_price"] = float(total_prices.mean())
+
+    return summary
+
+
+def histogram_share_below(summary: dict, threshold: float) -> float:
+    """نسبة الصفقات التي سعر مترها ≤ threshold (تقدير من المدرج الثابت)"""
+    total = summary.get("price_count") or 0
+    if not total:
+        return 0.0
+
+    # الفئة k تغطي (k-1, k] × العرض
+    position = min(max(threshold, 0), PRICE_HIST_MAX) / PRICE_HIST_WIDTH
+    below = 0.0
+    for key, count in summary.get("price_histogram", {}).items():
+        bin_index = int(key)
+        if bin_index <= position:
+            below += count
+        elif bin_index - 1 < position:
+            below += count * (position - bin_index + 1)
+    return below / total
 
 
 def store_snapshot(df: pd.DataFrame, city: str, property_type: str):
     """
-    تخزين لقطة السوق مع ختم زمني داخلي
+    تخزين لقطة السوق في قسم (المدينة / النوع) مع تسجيلها في الفهرس
+    وقت اللقطة يُحفظ في الفهرس ويُعاد كعمود __snapshot_time__ عند القراءة
+    اللقطة السابقة تتحول إلى فروقات فقط (إلا إذا كانت الفروقات كبيرة)
     """
     if df is None or df.empty:
         return None
 
-    # 🔒 إضافة وقت اللقطة داخل البيانات نفسها
-    snapshot_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    df = df.copy()
-    df["__snapshot_time__"] = snapshot_time
+    now = datetime.now()
+    snapshot_time = now.strftime(SNAPSHOT_TIME_FORMAT)
+    partition = _partition_dir(city, property_type)
+    os.makedirs(partition, exist_ok=True)
+
+    catalog = _read_catalog(partition)
+    catalog["city"] = city
+    catalog["property_type"] = property_type
+    entries = catalog.setdefault("snapshots", [])
+
+    # اسم الملف = وقت اللقطة (مع لاحقة عند تكرار نفس الثانية)
+    known_ids = {entry["id"] for entry in entries}
+    snapshot_id = now.strftime("%Y-%m-%d_%H%M%S")
+    suffix = 1
+    while snapshot_id in known_ids:
+        snapshot_id = f"{now.strftime('%Y-%m-%d_%H%M%S')}_{suffix}"
+        suffix += 1
+
+    current_df = df.drop(columns=["__snapshot_time__"], errors="ignore")
+    filename = f"{snapshot_id}.pkl"
+    path = os.path.join(partition, filename)
+    tmp_path = path + ".tmp"
+    current_df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+    # 🔁 اللقطة السابقة (كانت الأحدث وبالتالي كاملة) ← ملف فروقات
+    obsolete_file = None
+    if entries and entries[-1].get("file"):
+        previous = entries[-1]
+        try:
+            previous_df = pd.read_pickle(os.path.join(partition, previous["file"]))
+            delta = _compute_delta(previous_df, current_df)
+            delta_file = f"{previous['id']}.delta.pkl"
+            delta_path = os.path.join(partition, delta_file)
+            pd.to_pickle(delta, delta_path + ".tmp")
+            os.replace(delta_path + ".tmp", delta_path)
+
+            previous["delta"] = delta_file
+            previous["added"] = len(delta["added"])
+            previous["removed"] = len(delta["removed"])
+
+            changed = len(delta["added"]) + len(delta["removed"])
+            keep_full = (
+                changed > MAX_DELTA_RATIO * max(len(previous_df), 1)
+                or _delta_chain_length(entries, len(entries) - 1) >= MAX_DELTA_CHAIN
+            )
+            if not keep_full:
+                obsolete_file = previous["file"]
+                previous["file"] = None
+        except Exception as e:
+            print(f"⚠️ تعذر ترميز الفروقات للقطة {previous.get('id')}: {e}")
 
-    filename = _build_filename(city, property_type)
-    path = os.path.join(MEMORY_FOLDER, filename)
+    entries.append({
+        "id": snapshot_id,
+        "snapshot_time": snapshot_time,
+        "file": filename,
+        "rows": len(df),
+        "summary": summarize_snapshot(current_df, snapshot_time),
+    })
+    _write_catalog(partition, catalog)
 
-    df.to_csv(path, index=False, encoding="utf-8-sig")
+    # الحذف بعد تحديث الفهرس حتى لا نفقد لقطة عند أي انقطاع
+    if obsolete_file:
+        try:
+            os.remove(os.path.join(partition, obsolete_file))
+        except OSError:
+            pass
     return path
 
 
-def load_last_snapshots(city: str, property_type: str, limit=2):
+def _read_delta(partition: str, entry: dict) -> dict:
+    return pd.read_pickle(os.path.join(partition, entry["delta"]))
+
+
+def _iter_materialized(partition: str, entries, stop_index: int = 0):
     """
-    تحميل آخر لقطتين للسوق
-    
-    Args:
-        city: اسم المدينة
-        property_type: نوع العقار
-        limit: عدد اللقطات المطلوبة (افتراضي: 2)
-    
+    استعادة اللقطات من الأحدث إلى الأقدم (حتى stop_index)
+    كل لقطة تُبنى من اللاحقة لها بتطبيق الفروقات، أو تُقرأ مباشرة إذا كانت كاملة
+    """
+    frame = None
+    for index in range(len(entries) - 1, stop_index - 1, -1):
+        entry = entries[index]
+        if entry.get("file"):
+            frame = pd.read_pickle(os.path.join(partition, entry["file"]))
+        elif frame is not None and entry.get("delta"):
+            frame = _apply_reverse_delta(frame, _read_delta(partition, entry))
+        else:
+            raise ValueError(f"لا يمكن استعادة اللقطة {entry.get('id')}")
+
+        snapshot = frame.copy()
+        snapshot["__snapshot_time__"] = entry["snapshot_time"]
+        yield index, snapshot
+
+
+def load_snapshot(city: str, property_type: str, snapshot_id: str) -> pd.DataFrame:
+    """استعادة لقطة محددة (كاملة كانت أو مخزنة كفروقات)"""
+    partition = _partition_dir(city, property_type)
+    entries = list_snapshots(city, property_type)
+    target = next((i for i, e in enumerate(entries) if e["id"] == snapshot_id), None)
+    if target is None:
+        return pd.DataFrame()
+
+    # البدء من أقرب لقطة كاملة بعد الهدف
+    start = next(i for i in range(target, len(entries)) if entries[i].get("file"))
+    for index, snapshot in _iter_materialized(partition, entries[:start + 1], target):
+        if index == target:
+            return snapshot
+    return pd.DataFrame()
+
+
+def load_change_set(city: str, property_type: str, snapshot_id: str = None):
+    """
+    مجموعة التغييرات بين لقطة واللقطة التي تليها (الافتراضي: آخر تغيير)
+    تُقرأ مباشرة من ملف الفروقات بدون مقارنة لقطتين كاملتين
+
     Returns:
-        list: قائمة بالـ DataFrames للقطات المطلوبة
+        dict: added, removed (DataFrames), key, previous_time, snapshot_time
+        أو None إذا لم تتوفر لقطتان بعد
     """
+    partition = _partition_dir(city, property_type)
+    entries = list_snapshots(city, property_type)
+    if len(entries) < 2:
+        return None
+
+    if snapshot_id is None:
+        index = len(entries) - 2
+    else:
+        index = next((i - 1 for i, e in enumerate(entries) if e["id"] == snapshot_id), -1)
+        if index < 0:
+            return None
+
+    entry = entries[index]
+    try:
+        if entry.get("delta"):
+            delta = _read_delta(partition, entry)
+        else:
+            # لقطات محفوظة قبل ترميز الفروقات
+            delta = _compute_delta(
+                load_snapshot(city, property_type, entry["id"]),
+                load_snapshot(city, property_type, entries[index + 1]["id"]),
+            )
+    except Exception as e:
+        print(f"⚠️ تعذر قراءة مجموعة التغييرات {entry.get('id')}: {e}")
+        return None
+
+    delta["previous_time"] = entry["snapshot_time"]
+    delta["snapshot_time"] = entries[index + 1]["snapshot_time"]
+    return delta
+
+
+def _load_legacy_snapshots(city: str, property_type: str, limit: int):
+    """قراءة لقطات CSV القديمة (قبل التخزين المقسم) - الأحدث أولاً"""
     files = [
         f for f in os.listdir(MEMORY_FOLDER)
-        if f.startswith(f"{city}_{property_type}")
+        if f.startswith(f"{city}_{property_type}") and f.endswith(".csv")
     ]
 
     # ترتيب حسب وقت التعديل (الأحدث أولاً) لضمان السلامة حتى لو تغير تنسيق الاسم
@@ -71,7 +517,7 @@ def load_last_snapshots(city: str, property_type: str, limit=2):
         try:
             # توحيد الترميز مع عملية الحفظ (utf-8-sig)
             df = pd.read_csv(
-                os.path.join(MEMORY_FOLDER, f), 
+                os.path.join(MEMORY_FOLDER, f),
                 encoding="utf-8-sig"
             )
             snapshots.append(df)
@@ -82,6 +528,226 @@ def load_last_snapshots(city: str, property_type: str, limit=2):
     return snapshots
 
 
+def load_last_snapshots(city: str, property_type: str, limit=2):
+    """
+    تحميل آخر لقطتين للسوق
+
+    Args:
+        city: اسم المدينة
+        property_type: نوع العقار
+        limit: عدد اللقطات المطلوبة (افتراضي: 2)
+
+    Returns:
+        list: قائمة بالـ DataFrames للقطات المطلوبة (الأحدث أولاً)
+    """
+    partition = _partition_dir(city, property_type)
+    entries = list_snapshots(city, property_type)
+
+    snapshots = []
+    if limit > 0 and entries:
+        try:
+            for _, snapshot in _iter_materialized(partition, entries, max(len(entries) - limit, 0)):
+                snapshots.append(snapshot)
+        except Exception as e:
+            print(f"⚠️ خطأ في تحميل اللقطات {city} - {property_type}: {e}")
+
+    # اللقطات القديمة (CSV) أقدم من أي لقطة في الفهرس
+    if len(snapshots) < limit:
+        snapshots.extend(_load_legacy_snapshots(city, property_type, limit - len(snapshots)))
+
+    return snapshots
+
+
+def load_last_summaries(city: str, property_type: str, limit=2):
+    """
+    ملخصات آخر اللقطات (الأحدث أولاً) من الفهرس مباشرة
+    اللقطات بدون ملخص (القديمة أو CSV) تُلخص من بياناتها
+    """
+    entries = list_snapshots(city, property_type)[-limit:][::-1] if limit > 0 else []
+    # الملخصات المكتوبة قبل إضافة إحصائيات الأحياء تُعاد من البيانات
+    summaries = [
+        entry.get("summary") if "district_stats" in (entry.get("summary") or {}) else None
+        for entry in entries
+    ]
+
+    if None in summaries:
+        frames = load_last_snapshots(city, property_type, limit=len(entries))
+        summaries = [
+            summary if summary is not None else summarize_snapshot(frame, entry["snapshot_time"])
+            for summary, frame, entry in zip(summaries, frames, entries)
+        ]
+
+    if len(summaries) < limit:
+        summaries.extend(
+            summarize_snapshot(frame)
+            for frame in _load_legacy_snapshots(city, property_type, limit - len(summaries))
+        )
+
+    return summaries
+
+
+# =========================================
+# 🧹 الاحتفاظ والدمج (Retention & Compaction)
+# =========================================
+
+def _retention_bucket(snapshot_time: datetime, now: datetime, policy):
+    """الفترة التي تنتمي لها اللقطة حسب عمرها (None = تُحفظ كما هي)"""
+    age = now - snapshot_time
+    for max_age, bucket_format in policy:
+        if max_age is None or age <= max_age:
+            return None if bucket_format is None else snapshot_time.strftime(bucket_format)
+    return None
+
+
+def _select_retained(entries, now: datetime, policy):
+    """
+    اختيار اللقطات المحتفظ بها: آخر لقطة في كل فترة دمج
+    يعيد (مؤشرات المحتفظ بها، {المؤشر: اللقطات المدمجة فيه})
+    """
+    buckets = {}
+    for index, entry in enumerate(entries):
+        bucket = _retention_bucket(
+            datetime.strptime(entry["snapshot_time"], SNAPSHOT_TIME_FORMAT), now, policy
+        )
+        key = ("snapshot", index) if bucket is None else ("bucket", bucket)
+        buckets.setdefault(key, []).append(index)
+
+    # أحدث لقطة هي آخر فترتها دائماً، لذلك تبقى (وهي الأساس الكامل للفروقات)
+    merged_into = {members[-1]: members for members in buckets.values()}
+    return sorted(merged_into), merged_into
+
+
+def compact_partition(city: str, property_type: str, policy=None, now: datetime = None) -> dict:
+    """
+    🧹 تطبيق سياسة الاحتفاظ على قسم واحد:
+    اللقطات المدمجة تُحذف، والمحتفظ بها يُعاد ترميز فروقاتها مع اللقطة التالية المحتفظ بها
+    ملخص كل لقطة محتفظ بها يبقى في الفهرس مع عدد اللقطات التي دُمجت فيها
+    """
+    policy = policy or RETENTION_POLICY
+    now = now or datetime.now()
+    partition = _partition_dir(city, property_type)
+    catalog = _read_catalog(partition)
+    entries = catalog.get("snapshots", [])
+
+    retained, merged_into = _select_retained(entries, now, policy)
+    if len(retained) == len(entries):
+        return {"kept": len(entries), "removed": 0}
+
+    retained_set = set(retained)
+    obsolete_files = []
+    new_entries = []
+    newer_frame = None
+    deltas_since_full = 0
+
+    # الرجوع من الأحدث: كل لقطة محتفظ بها تُرمّز مقابل التالية المحتفظ بها
+    for index, snapshot in _iter_materialized(partition, entries):
+        entry = dict(entries[index])
+        if index not in retained_set:
+            obsolete_files.extend(f for f in (entry.get("file"), entry.get("delta")) if f)
+            continue
+
+        frame = snapshot.drop(columns=["__snapshot_time__"])
+        merged = merged_into[index]
+        if len(merged) > 1:
+            entry["merged"] = sum(entries[i].get("merged", 1) for i in merged)
+            entry["covers_from"] = min(
+                entries[i].get("covers_from", entries[i]["snapshot_time"]) for i in merged
+            )
+
+        if newer_frame is not None:
+            delta = _compute_delta(frame, newer_frame)
+            delta_file = f"{entry['id']}.delta.pkl"
+            delta_path = os.path.join(partition, delta_file)
+            pd.to_pickle(delta, delta_path + ".tmp")
+            os.replace(delta_path + ".tmp", delta_path)
+            entry.update({"delta": delta_file, "added": len(delta["added"]), "removed": len(delta["removed"])})
+
+            changed = len(delta["added"]) + len(delta["removed"])
+            keep_full = changed > MAX_DELTA_RATIO * max(len(frame), 1) or deltas_since_full >= MAX_DELTA_CHAIN
+            if keep_full and not entry.get("file"):
+                entry["file"] = f"{entry['id']}.pkl"
+                frame.to_pickle(os.path.join(partition, entry["file"]))
+            elif not keep_full and entry.get("file"):
+                obsolete_files.append(entry["file"])
+                entry["file"] = None
+            deltas_since_full = 0 if entry.get("file") else deltas_since_full + 1
+
+        new_entries.append(entry)
+        newer_frame = frame
+
+    catalog["snapshots"] = new_entries[::-1]
+    _write_catalog(partition, catalog)
+
+    for filename in obsolete_files:
+        try:
+            os.remove(os.path.join(partition, filename))
+        except OSError:
+            pass
+
+    return {"kept": len(new_entries), "removed": len(entries) - len(new_entries)}
+
+
+def _compact_legacy_files(now: datetime, policy) -> int:
+    """تطبيق نفس السياسة على ملفات CSV القديمة (حسب وقت التعديل)"""
+    groups = {}
+    for f in os.listdir(MEMORY_FOLDER):
+        path = os.path.join(MEMORY_FOLDER, f)
+        if f.endswith(".csv") and os.path.isfile(path):
+            prefix = f.rsplit("_", 2)[0]
+            groups.setdefault(prefix, []).append((os.path.getmtime(path), path))
+
+    removed = 0
+    for files in groups.values():
+        kept = {}
+        for mtime, path in sorted(files):
+            bucket = _retention_bucket(datetime.fromtimestamp(mtime), now, policy)
+            key = path if bucket is None else bucket
+            if key in kept:
+                os.remove(kept[key])
+                removed += 1
+            kept[key] = path
+    return removed
+
+
+def compact_market_memory(policy=None, now: datetime = None) -> dict:
+    """
+    🧹 مهمة الدمج الدورية لكل الأقسام (تُشغّل من المجدول أو يدوياً)
+    تكلفة التخزين والقراءة تبقى ثابتة تقريباً مهما طالت فترة التشغيل
+    """
+    policy = policy or RETENTION_POLICY
+    now = now or datetime.now()
+    report = {"partitions": 0, "kept": 0, "removed": 0, "legacy_removed": 0}
+    if not os.path.isdir(MEMORY_FOLDER):
+        return report
+
+    for city_dir in os.listdir(MEMORY_FOLDER):
+        city_path = os.path.join(MEMORY_FOLDER, city_dir)
+        if not os.path.isdir(city_path):
+            continue
+        for type_dir in os.listdir(city_path):
+            partition = os.path.join(city_path, type_dir)
+            catalog = _read_catalog(partition)
+            if not catalog.get("snapshots"):
+                continue
+            try:
+                stats = compact_partition(
+                    catalog.get("city", city_dir), catalog.get("property_type", type_dir), policy, now
+                )
+            except Exception as e:
+                print(f"⚠️ تعذر دمج لقطات {city_dir} - {type_dir}: {e}")
+                continue
+            report["partitions"] += 1
+            report["kept"] += stats["kept"]
+            report["removed"] += stats["removed"]
+
+    report["legacy_removed"] = _compact_legacy_files(now, policy)
+    print(
+        f"🧹 دمج ذاكرة السوق: {report['partitions']} قسم، "
+        f"حُذفت {report['removed']} لقطة (+{report['legacy_removed']} CSV)، بقيت {report['kept']}"
+    )
+    return report
+
+
 # للاختبار المستقل (اختياري)
 if __name__ == "__main__":
     # بيانات تجريبية للاختبار
@@ -90,15 +756,15 @@ if __name__ == "__main__":
         "area": [80, 100, 120, 150, 180],
         "date": [datetime.now().strftime("%Y-%m-%d")] * 5
     })
-    
+
     # تخزين لقطة اختبار
     path = store_snapshot(test_data, "الرياض", "شقة")
     print(f"✅ تم تخزين اللقطة في: {path}")
-    
+
     # تحميل آخر لقطتين
     snapshots = load_last_snapshots("الرياض", "شقة", limit=2)
     print(f"📊 تم تحميل {len(snapshots)} لقطة")
-    
+
     # عرض محتوى اللقطات إذا وجدت
     for i, snapshot in enumerate(snapshots):
         print(f"\n🔍 محتوى اللقطة {i+1}:")
@@ -0,0 +1,134 @@
+# market_watcher.py
+# =========================================
+# Market Watcher – مراقب البيانات وخط التنبيهات التلقائي
+# =========================================
+# عملية طويلة التشغيل تراقب ملف الصفقات، وعند تغيره:
+# 1️⃣ استيعاب تزايدي للصفقات الجديدة فقط (data_store)
+# 2️⃣ لقطات سوق جديدة للأزواج (مدينة × نوع) التي ظهرت فيها الصفقات الجديدة
+#    (من نفس التحميل الدقيق الذي يستخدمه زر التحديث في الواجهة)
+# 3️⃣ تنبيهات هذه الأزواج فقط وحفظها في قاعدة التنبيهات
+# 4️⃣ دمج ذاكرة السوق حسب سياسة الاحتفاظ (مرة يومياً)
+# الواجهة تقرأ التنبيهات المحسوبة مسبقاً ولا تنتظر أي حساب
+#
+# التشغيل:
+#   python market_watcher.py            (مراقبة مستمرة)
+#   python market_watcher.py --once     (دورة واحدة ثم خروج)
+# =========================================
+
+import argparse
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from government_data_provider import (
+    DATA_PATH, STORE_DIR,
+    ingest_government_data_incremental, load_government_data, source_changed,
+)
+from snapshot_runner import affected_pairs, collect_and_store_all
+from market_memory import compact_market_memory
+from alerts_system import CITIES, PROPERTY_TYPES, generate_all_alerts, record_watcher_heartbeat
+
+# الفاصل بين فحوصات الملف (ثوانٍ)
+POLL_INTERVAL_SECONDS = 60
+
+# كل كم يُدمج مخزن ذاكرة السوق
+COMPACT_INTERVAL = timedelta(hours=24)
+
+
+def _read_new_rows(store_dir: Path, part_files) -> pd.DataFrame:
+    """الصفوف المطبّعة التي أضافها آخر استيعاب (أجزاء المخزن الجديدة فقط)"""
+    frames = [pd.read_pickle(Path(store_dir) / part) for part in part_files]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def run_pipeline_once(source_path: Path = DATA_PATH, store_dir: Path = STORE_DIR,
+                      max_workers=None) -> dict:
+    """
+    🔁 دورة واحدة: استيعاب ← لقطات الأزواج المتأثرة ← تنبيهاتها
+    يعيد ملخص الدورة (الحالة، عدد الصفوف الجديدة، الأزواج، عدد التنبيهات)
+    """
+    report = {"status": "unchanged", "new_rows": 0, "pairs": [], "alerts": 0}
+
+    if not source_changed(source_path, store_dir):
+        return report
+
+    ingest = ingest_government_data_incremental(source_path, store_dir)
+    if ingest is None:
+        report["status"] = "failed"
+        return report
+
+    report["status"] = ingest["status"]
+    report["new_rows"] = ingest["new_rows"]
+    if not ingest["new_rows"]:
+        print("ℹ️ تغير الملف بدون صفقات جديدة - لا حاجة لتحديث اللقطات")
+        return report
+
+    # الأزواج التي تخصها الصفقات الجديدة فقط
+    new_rows = _read_new_rows(store_dir, ingest["new_parts"])
+    pairs = affected_pairs(new_rows, CITIES, PROPERTY_TYPES)
+    report["pairs"] = pairs
+    if not pairs:
+        print("ℹ️ الصفقات الجديدة خارج المدن المراقبة")
+        return report
+
+    print(f"📡 {ingest['new_rows']:,} صفقة جديدة تمس {len(pairs)} زوج (مدينة × نوع)")
+
+    # اللقطات من التحميل الدقيق نفسه الذي يستخدمه زر التحديث (update_market_and_check_alerts)
+    # حتى لا تختلط في ذاكرة السوق لقطات من مصدرين: المخزن يملأ الفراغات بوسيط تقريبي
+    # المخزن يحدد الأزواج المتأثرة فقط، وتحميل الملف المطبّع يُحفظ في الذاكرة المؤقتة للواجهة
+    exact_rows = load_government_data(source=source_path)
+    collect_and_store_all(CITIES, PROPERTY_TYPES, df=exact_rows, pairs=pairs)
+
+    alerts = generate_all_alerts(max_workers=max_workers, pairs=pairs)
+    report["alerts"] = len(alerts)
+    return report
+
+
+def watch_market_data(source_path: Path = DATA_PATH, store_dir: Path = STORE_DIR,
+                      interval: int = POLL_INTERVAL_SECONDS, once: bool = False):
+    """
+    👀 المراقبة المستمرة: فحص الملف كل interval ثانية وتشغيل الدورة عند تغيره
+    كل فحص يسجل نبضة في قاعدة التنبيهات حتى تعرف الواجهة أن المراقب يعمل
+    """
+    print(f"👀 مراقبة {source_path} كل {interval} ثانية (Ctrl+C للإيقاف)")
+    last_compaction = None
+
+    try:
+        while True:
+            try:
+                report = run_pipeline_once(source_path, store_dir)
+                if report["status"] != "unchanged":
+                    print(
+                        f"✅ دورة المراقب: {report['status']} | {report['new_rows']:,} صف جديد | "
+                        f"{len(report['pairs'])} زوج | {report['alerts']} تنبيه"
+                    )
+
+                now = datetime.now()
+                if last_compaction is None or now - last_compaction >= COMPACT_INTERVAL:
+                    compact_market_memory(now=now)
+                    last_compaction = now
+
+                record_watcher_heartbeat(report)
+            except Exception as e:
+                # خطأ في دورة واحدة لا يوقف المراقب
+                print(f"❌ خطأ في دورة المراقب: {e}")
+
+            if once:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("🛑 تم إيقاف المراقب")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="مراقب ملف الصفقات وخط التنبيهات التلقائي")
+    parser.add_argument("--source", default=str(DATA_PATH), help="ملف الصفقات المراقب")
+    parser.add_argument("--interval", type=int, default=POLL_INTERVAL_SECONDS, help="الفاصل بين الفحوصات (ثوانٍ)")
+    parser.add_argument("--once", action="store_true", help="دورة واحدة ثم خروج")
+    args = parser.parse_args()
+
+    watch_market_data(Path(args.source), interval=args.interval, once=args.once)
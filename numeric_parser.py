@@ -0,0 +1,106 @@
+# numeric_parser.py
+# =========================================
+# Numeric Parser – محلل الأرقام العربية الموحد
+# =========================================
+# يحول نصوص الأسعار والمساحات بصيغها المختلفة إلى أرقام:
+# - فواصل الآلاف: مسافة، مسافة غير منقسمة (NBSP)، "٬"، الفاصلة، النقطة
+# - الفاصلة العشرية: "," أو "٫" أو "."
+# - الأرقام العربية الهندية (٠-٩) والفارسية (۰-۹)
+# أمثلة: "100 000" → 100000 | "619,7" → 619.7 | "17 875,00" → 17875.0 | "١٢٠٫٥" → 120.5
+#
+# التحليل يتم على القيم الفريدة فقط ثم يُوزع على كل الصفوف،
+# لذلك يبقى سريعاً حتى مع ملايين الخلايا المتكررة
+# =========================================
+
+import numpy as np
+import pandas as pd
+
+# الأرقام العربية الهندية والفارسية ← أرقام لاتينية، والفواصل العربية ← رموز موحدة
+_CHAR_TABLE = {
+    **{ord(ch): str(i) for i, ch in enumerate("٠١٢٣٤٥٦٧٨٩")},
+    **{ord(ch): str(i) for i, ch in enumerate("۰۱۲۳۴۵۶۷۸۹")},
+    ord("٬"): "",       # فاصل الآلاف العربي
+    ord("٫"): ".",      # الفاصلة العشرية العربية
+    ord("،"): ",",      # الفاصلة العربية
+    ord("\u00a0"): "",  # مسافة غير منقسمة (NBSP)
+    ord("\u202f"): "",  # مسافة ضيقة غير منقسمة
+    ord("\u2009"): "",  # مسافة رفيعة
+    ord(" "): "",
+    ord("'"): "",
+}
+
+# أول رقم في النص (يسمح بالفواصل داخله، وبالأس العلمي في آخره: "1.5E+06")
+_NUMBER_PATTERN = r"(-?\d[\d.,]*(?:[eE][+-]?\d+)?)"
+
+
+def _parse_unique_strings(values: pd.Series) -> pd.Series:
+    """🔢 تحويل قيم نصية (فريدة) إلى أرقام حسب قواعد الفواصل"""
+    text = values.astype(str).str.translate(_CHAR_TABLE)
+    token = text.str.extract(_NUMBER_PATTERN, expand=False).fillna("")
+    token = token.str.rstrip(".,")
+
+    # الصيغة العلمية لا تمر بقواعد الفواصل: pd.to_numeric مباشرة (وغير الصالح NaN)
+    is_exponent = token.str.contains(r"[eE]", regex=True)
+    exponent_values = pd.to_numeric(token.where(is_exponent), errors="coerce")
+
+    last_dot = token.str.rfind(".")
+    last_comma = token.str.rfind(",")
+    dot_count = token.str.count(r"\.")
+    comma_count = token.str.count(",")
+    digits_after_comma = token.str.len() - last_comma - 1
+
+    # الفاصل الأخير هو العشري إذا سبقه الفاصل الآخر، أو إذا ظهر مرة واحدة فقط
+    # (فاصلة واحدة يتبعها 3 أرقام بالضبط تُعتبر فاصل آلاف: "1,250" → 1250)
+    comma_is_decimal = (last_comma > last_dot) & (
+        (dot_count > 0) | ((comma_count == 1) & (digits_after_comma != 3))
+    )
+    dot_is_decimal = (last_dot > last_comma) & ((comma_count > 0) | (dot_count == 1))
+
+    without_dots = token.str.replace(".", "", regex=False)
+    without_commas = token.str.replace(",", "", regex=False)
+    cleaned = np.select(
+        [comma_is_decimal.to_numpy(), dot_is_decimal.to_numpy()],
+        [without_dots.str.replace(",", ".", regex=False).to_numpy(), without_commas.to_numpy()],
+        default=without_commas.str.replace(".", "", regex=False).to_numpy(),
+    )
+    parsed = pd.to_numeric(pd.Series(cleaned, index=values.index), errors="coerce")
+    return parsed.mask(is_exponent, exponent_values)
+
+
+def parse_numeric(values) -> pd.Series:
+    """
+    🔢 تحويل عمود (أسعار / مساحات) إلى أرقام عشرية مع دعم الصيغ العربية
+    القيم غير القابلة للتحويل تصبح NaN
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+
+    # ⚡ المسار السريع: العمود رقمي أصلاً
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        return pd.to_numeric(series, errors="coerce").astype(float)
+
+    codes, uniques = pd.factorize(series)
+    if len(uniques) == 0:
+        return pd.Series(np.nan, index=series.index, dtype=float)
+
+    unique_values = pd.Series(np.asarray(uniques, dtype=object))
+    numeric_mask = unique_values.map(lambda v: isinstance(v, (int, float, np.number)) and not isinstance(v, bool))
+
+    parsed = pd.Series(np.nan, index=unique_values.index, dtype=float)
+    if numeric_mask.any():
+        parsed[numeric_mask] = pd.to_numeric(unique_values[numeric_mask], errors="coerce")
+    if (~numeric_mask).any():
+        parsed[~numeric_mask] = _parse_unique_strings(unique_values[~numeric_mask])
+
+    result = parsed.to_numpy()[codes]
+    result[codes == -1] = np.nan
+    return pd.Series(result, index=series.index, dtype=float)
+
+
+# للاختبار المستقل
+if __name__ == "__main__":
+    samples = pd.Series([
+        "100 000", "619,7", "17 875,00", "1 680,00", "١٢٠٫٥", "٢٥٠٬٠٠٠",
+        "1,250,000", "1.234,5", "1,234.5", "150 م²", None, "غير متاح", 750,
+        "1e5", "1.5E+06", "2,5e3",
+    ])
+    print(pd.DataFrame({"raw": samples, "parsed": parse_numeric(samples)}))
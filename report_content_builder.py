@@ -8,7 +8,7 @@ Version: 3.0.6 (City Projects Table - Professional Final)
 # =========================
 # ✅ IMPORT PROJECTS LOADER
 # =========================
-from government_data_provider import load_projects_data
+from data_repository import get_repository
 
 # =========================
 # PACKAGES DEFINITION
@@ -2148,8 +2148,8 @@ def build_complete_report(user_info):
     package = PACKAGE_ALIASES.get(raw_pkg, "free")
     user_info["package"] = package
 
-    # ✅ تحميل بيانات المشاريع
-    projects_data = load_projects_data()
+    # ✅ بيانات المشاريع من المستودع المشترك (بدون قراءة من القرص بعد أول تحميل)
+    projects_data = get_repository().projects()
     
     # ✅ إضافة بيانات المشاريع إلى user_info لاستخدامها في الفصول
     if projects_data is not None and not projects_data.empty:
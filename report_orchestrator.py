@@ -8,6 +8,7 @@ from market_data_core import get_market_data
 from investment_scorecard import calculate_investment_score
 from scorecard_visualizer import build_scorecard_text
 from data_repair_engine import repair_market_data
+from numeric_parser import parse_numeric
 
 from district_metrics_engine import (
     prepare_district_data,
@@ -62,9 +63,9 @@ def unify_columns_for_charts(df):
     # ✅ التعديل 1: إصلاح الأعمدة الرقمية والتواريخ
     # تحويل الأعمدة الرقمية
     if "price" in df.columns:
-        df["price"] = pd.to_numeric(df["price"], errors="coerce")
+        df["price"] = parse_numeric(df["price"])
     if "area" in df.columns:
-        df["area"] = pd.to_numeric(df["area"], errors="coerce")
+        df["area"] = parse_numeric(df["area"])
     
     # إصلاح القيم الناقصة
     if "price" in df.columns:
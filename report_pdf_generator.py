@@ -173,19 +173,50 @@ def clean_text(text: str) -> str:
 # =========================
 # Plotly → Image
 # =========================
+class RenderedChart:
+    """
+    رسم مُصدَّر مسبقاً إلى PNG - يُمرَّر في charts_by_chapter بدل الشكل نفسه
+    حتى تعيد عدة تقارير استخدام نفس الصورة بدون تشغيل kaleido لكل تقرير
+    """
+
+    def __init__(self, fig):
+        self.is_indicator = (
+            fig is not None
+            and hasattr(fig, 'data')
+            and len(fig.data) > 0
+            and isinstance(fig.data[0], go.Indicator)
+        )
+        try:
+            self.png = fig.to_image(
+                format="png",
+                width=1600,
+                height=1000,
+                scale=2,
+                engine="kaleido"
+            )
+        except Exception as e:
+            print("Chart export error:", e)
+            self.png = None
+
+
 def plotly_to_image(fig, width_cm, height_cm):
     if fig is None:
         return None
 
     tmp = None
     try:
-        img_bytes = fig.to_image(
-            format="png",
-            width=1600,
-            height=1000,
-            scale=2,
-            engine="kaleido"
-        )
+        if isinstance(fig, RenderedChart):
+            if fig.png is None:
+                return None
+            img_bytes = fig.png
+        else:
+            img_bytes = fig.to_image(
+                format="png",
+                width=1600,
+                height=1000,
+                scale=2,
+                engine="kaleido"
+            )
 
         tmp = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
         tmp.write(img_bytes)
@@ -206,6 +237,14 @@ def plotly_to_image(fig, width_cm, height_cm):
         return None
 
 
+def warm_up_chart_export():
+    """تشغيل محرك kaleido مسبقاً (أول تصدير صورة هو الأبطأ) - لعمال مصنع التقارير"""
+    try:
+        go.Figure().to_image(format="png", width=10, height=10, engine="kaleido")
+    except Exception as e:
+        print("Chart export warm-up error:", e)
+
+
 # =========================
 # MAP: District & Projects Map
 # =========================
@@ -392,6 +431,30 @@ def add_footer(canvas, doc):
     canvas.restoreState()
 
 
+# =========================
+# FONT: تسجيل خط Amiri مرة واحدة لكل عملية
+# =========================
+def register_arabic_font():
+    if "Amiri" in pdfmetrics.getRegisteredFontNames():
+        return
+
+    font_path = None
+    for p in [
+        "Amiri-Regular.ttf",
+        "fonts/Amiri-Regular.ttf",
+        os.path.join(os.getcwd(), "Amiri-Regular.ttf"),
+        os.path.join(os.getcwd(), "fonts", "Amiri-Regular.ttf"),
+    ]:
+        if os.path.exists(p):
+            font_path = p
+            break
+
+    if not font_path:
+        raise FileNotFoundError("Amiri font not found")
+
+    pdfmetrics.registerFont(TTFont("Amiri", font_path))
+
+
 # =========================
 # MAIN PDF GENERATOR
 # =========================
@@ -413,21 +476,7 @@ def create_pdf_from_content(
     # -------------------------
     # FONT
     # -------------------------
-    font_path = None
-    for p in [
-        "Amiri-Regular.ttf",
-        "fonts/Amiri-Regular.ttf",
-        os.path.join(os.getcwd(), "Amiri-Regular.ttf"),
-        os.path.join(os.getcwd(), "fonts", "Amiri-Regular.ttf"),
-    ]:
-        if os.path.exists(p):
-            font_path = p
-            break
-
-    if not font_path:
-        raise FileNotFoundError("Amiri font not found")
-
-    pdfmetrics.registerFont(TTFont("Amiri", font_path))
+    register_arabic_font()
 
     # -------------------------
     # DOCUMENT
@@ -858,12 +907,15 @@ def create_pdf_from_content(
 
                 if cursor < len(charts):
                     fig = charts[cursor]
-                    is_indicator = (
-                        fig is not None
-                        and hasattr(fig, 'data')
-                        and len(fig.data) > 0
-                        and isinstance(fig.data[0], go.Indicator)
-                    )
+                    if isinstance(fig, RenderedChart):
+                        is_indicator = fig.is_indicator
+                    else:
+                        is_indicator = (
+                            fig is not None
+                            and hasattr(fig, 'data')
+                            and len(fig.data) > 0
+                            and isinstance(fig.data[0], go.Indicator)
+                        )
                     img = plotly_to_image(fig, 17.5 if is_indicator else 16.8,
                                            9.5 if is_indicator else 9)
                     if img:
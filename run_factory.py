@@ -1,13 +1,16 @@
 from district_report_factory import generate_all_district_reports
 from government_data_provider import load_government_data
 
-print("🚀 تشغيل المصنع...")
 
-df = load_government_data()
+# الحماية ضرورية: عمال المصنع (spawn) يستوردون هذا الملف من جديد
+if __name__ == "__main__":
+    print("🚀 تشغيل المصنع...")
 
-# تقليل البيانات لتفادي التعليق
-df = df.head(100)
+    df = load_government_data()
 
-generate_all_district_reports(df)
+    # تقليل البيانات لتفادي التعليق
+    df = df.head(100)
 
-print("✅ انتهى")
+    generate_all_district_reports(df)
+
+    print("✅ انتهى")
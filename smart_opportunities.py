@@ -31,60 +31,74 @@ class SmartOpportunityFinder:
             return False
         return all(col in df.columns for col in required_cols)
     
-    def find_undervalued_properties(self, real_data, city):
-        """اكتشاف العقارات تحت السوق"""
-        try:
-            if real_data.empty:
-                return []
-            
-            # التحقق من وجود الأعمدة المطلوبة
-            required = ['price_per_sqm', 'district']
-            if not self._has_required_columns(real_data, required):
-                print("⚠️ الأعمدة المطلوبة غير موجودة: price_per_sqm, district")
-                return []
-            
-            # حساب متوسط السعر للمنطقة
-            area_avg_prices = real_data.groupby('district')['price_per_sqm'].mean()
-            
-            undervalued = []
-            for _, property in real_data.iterrows():
-                district = self._safe_col(property, 'district', 'المنطقة')
-                if district is None:
-                    continue
-                
-                price_per_sqm = self._safe_col(property, 'price_per_sqm', 'سعر_المتر')
-                if price_per_sqm is None:
-                    continue
-                
-                area_avg = area_avg_prices.get(district, price_per_sqm)
-                
-                # إذا السعر أقل من المتوسط بـ 15%
-                if price_per_sqm < area_avg * 0.85:
-                    discount = ((area_avg - price_per_sqm) / area_avg) * 100
-                    
-                    # استخراج باقي الحقول بأمان
-                    property_name = self._safe_col(property, 'العقار', 'property_name', 'name') or f"عقار في {district}"
-                    current_price = self._safe_col(property, 'price', 'السعر')
-                    expected_return = self._safe_col(property, 'العائد_المتوقع', 'expected_return', 'return')
-                    risk_level = self._safe_col(property, 'مستوى_الخطورة', 'risk_level', 'risk')
-                    
-                    undervalued.append({
-                        'العقار': property_name,
-                        'المنطقة': district, 
-                        'السعر_الحالي': current_price,
-                        'سعر_المتر': price_per_sqm,
-                        'متوسط_المنطقة': area_avg,
-                        'الخصم': f"{discount:.1f}%",
-                        'العائد_المتوقع': expected_return if expected_return is not None else 'N/A',
-                        'مستوى_الخطورة': risk_level if risk_level is not None else 'غير محدد'
-                    })
+    def _first_available(self, df, *names):
+        """
+        النسخة العمودية من _safe_col: أول قيمة غير فارغة من الأعمدة المتاحة لكل صف
+        """
+        result = None
+        for name in names:
+            if name in df.columns:
+                result = df[name] if result is None else result.fillna(df[name])
+        return result
+    
+    def find_undervalued_properties(self, real_data, city, top_n=10):
+        """
+        اكتشاف العقارات تحت السوق
+        ⚡ متجه بالكامل: متوسط الحي عبر groupby-transform ثم قناع ثم أعلى top_n خصم،
+        والقواميس تُبنى فقط للعقارات المختارة
+        الأخطاء غير المتوقعة تُرفع للمستدعي (لا تتحول إلى قائمة فارغة بصمت)
+        """
+        if real_data.empty:
+            return []
+        
+        # التحقق من وجود الأعمدة المطلوبة
+        required = ['price_per_sqm', 'district']
+        if not self._has_required_columns(real_data, required):
+            print("⚠️ الأعمدة المطلوبة غير موجودة: price_per_sqm, district")
+            return []
+        
+        # فهرس موضعي: التسميات المكررة في فهرس الجدول لا تُرجع Series بدل قيمة واحدة
+        real_data = real_data.reset_index(drop=True)
+        
+        # حساب متوسط السعر للمنطقة (لكل صف)
+        district = real_data['district']
+        price_per_sqm = pd.to_numeric(self._first_available(real_data, 'price_per_sqm', 'سعر_المتر'), errors='coerce')
+        area_avg = real_data.groupby('district', observed=True)['price_per_sqm'].transform('mean')
+        
+        # إذا السعر أقل من المتوسط بـ 15%
+        mask = district.notna() & price_per_sqm.notna() & (price_per_sqm < area_avg * 0.85)
+        if not mask.any():
+            return []
+        
+        discount = ((area_avg[mask] - price_per_sqm[mask]) / area_avg[mask]) * 100
+        # الترتيب على الخصم المقرب لخانة واحدة (كما يظهر للمستخدم)، والتعادل بترتيب الظهور
+        top_index = discount.round(1).nlargest(top_n, keep='first').index
+        
+        undervalued = []
+        for idx in top_index:
+            property = real_data.loc[idx]
+            district_name = property['district']
             
-            return sorted(undervalued, key=lambda x: float(x['الخصم'][:-1]), reverse=True)[:10]
+            # استخراج باقي الحقول بأمان
+            property_name = self._safe_col(property, 'العقار', 'property_name', 'name') or f"عقار في {district_name}"
+            current_price = self._safe_col(property, 'price', 'السعر')
+            expected_return = self._safe_col(property, 'العائد_المتوقع', 'expected_return', 'return')
+            risk_level = self._safe_col(property, 'مستوى_الخطورة', 'risk_level', 'risk')
             
-        except Exception as e:
-            print(f"خطأ في اكتشاف العقارات المخفضة: {e}")
-            return []
-    
+            undervalued.append({
+                'العقار': property_name,
+                'المنطقة': district_name, 
+                'السعر_الحالي': current_price,
+                'سعر_المتر': price_per_sqm[idx],
+                'متوسط_المنطقة': area_avg[idx],
+                'الخصم': f"{discount[idx]:.1f}%",
+                'نسبة_الخصم': round(float(discount[idx]), 1),
+                'العائد_المتوقع': expected_return if expected_return is not None else 'N/A',
+                'مستوى_الخطورة': risk_level if risk_level is not None else 'غير محدد'
+            })
+        
+        return undervalued
+
     def predict_rising_areas(self, real_data, city):
         """تحليل المناطق الصاعدة"""
         try:
@@ -98,13 +112,13 @@ class SmartOpportunityFinder:
                 return []
             
             # تحليل النمو بالمناطق
-            area_growth = real_data.groupby('district').agg({
+            area_growth = real_data.groupby('district', observed=True).agg({
                 'price_per_sqm': ['mean', 'count'],
             }).round(2)
             
             # إضافة العائد المتوقع إذا كان موجوداً
             if 'expected_return' in real_data.columns:
-                area_growth['expected_return'] = real_data.groupby('district')['expected_return'].mean()
+                area_growth['expected_return'] = real_data.groupby('district', observed=True)['expected_return'].mean()
             else:
                 area_growth['expected_return'] = 5.0  # قيمة افتراضية
             
@@ -154,10 +168,11 @@ class SmartOpportunityFinder:
     def analyze_all_opportunities(self, user_info, market_data, real_data):
         """تحليل شامل لكل الفرص"""
         city = user_info.get('city', 'المدينة')
+        undervalued = self.find_undervalued_properties(real_data, city)
         
         return {
-            'عقارات_مخفضة': self.find_undervalued_properties(real_data, city),
+            'عقارات_مخفضة': undervalued,
             'مناطق_صاعدة': self.predict_rising_areas(real_data, city),
             'توقيت_الاستثمار': self.get_golden_timing(market_data),
-            'ملخص_الفرص': f"تم اكتشاف {len(self.find_undervalued_properties(real_data, city))} فرصة استثمارية في {city}"
+            'ملخص_الفرص': f"تم اكتشاف {len(undervalued)} فرصة استثمارية في {city}"
         }
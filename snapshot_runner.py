@@ -1,6 +1,14 @@
-from government_data_provider import load_government_data
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from government_data_provider import load_government_data, filter_government_data
 from market_memory import store_snapshot
 
+# الأنواع التي يفلتر بها مزود البيانات فعلياً (باقي الأنواع تعيد بيانات المدينة كاملة)
+FILTERABLE_TYPES = ['سكني', 'تجاري', 'أرض']
+
 def collect_and_store(city, property_type):
 
     df = load_government_data(
@@ -17,3 +25,70 @@ def collect_and_store(city, property_type):
     print(f"✅ تم حفظ لقطة سوق جديدة: {city} - {property_type}")
 
     return df
+
+
+def partition_market_data(df, cities, property_types):
+    """
+    تقسيم البيانات المطبّعة إلى (مدينة، نوع) بتجميع واحد على المدينة
+    نفس نتيجة load_government_data(city, property_type) لكل زوج:
+    المدينة بمطابقة جزئية، والنوع يُفلتر فقط إذا كان سكني / تجاري / أرض
+    """
+    city_groups = df.groupby("city", observed=True).indices
+    type_values = df["property_type"].to_numpy()
+
+    partitions = {}
+    for city in cities:
+        pattern = re.compile(city.strip(), re.IGNORECASE)
+        matched = [positions for name, positions in city_groups.items() if pattern.search(str(name).strip())]
+        city_positions = np.sort(np.concatenate(matched)) if matched else np.array([], dtype=int)
+
+        for property_type in property_types:
+            positions = city_positions
+            if property_type in FILTERABLE_TYPES:
+                positions = positions[type_values[positions] == property_type]
+            partitions[(city, property_type)] = filter_government_data(df.iloc[positions])
+
+    return partitions
+
+
+def affected_pairs(changed_df, cities, property_types):
+    """
+    الأزواج (مدينة، نوع) التي تظهر فيها صفوف البيانات المتغيرة
+    (نفس منطق التقسيم، فالزوج متأثر إذا لم يكن قسمه من هذه الصفوف فارغاً)
+    """
+    if changed_df is None or changed_df.empty:
+        return []
+    partitions = partition_market_data(changed_df, cities, property_types)
+    return [pair for pair, frame in partitions.items() if not frame.empty]
+
+
+def collect_and_store_all(cities, property_types, max_workers=4, df=None, pairs=None):
+    """
+    جمع لقطات كل أزواج (المدينة × النوع) من تحميل واحد للبيانات
+    اللقطات تُكتب بالتوازي (كل زوج في قسم مستقل من ذاكرة السوق)
+    df: بيانات مطبّعة جاهزة (مثل مخزن الاستيعاب التزايدي) بدل إعادة التحميل
+    pairs: تقييد الحفظ بأزواج محددة فقط (الأزواج المتأثرة بتحديث البيانات)
+    """
+    if df is None:
+        df = load_government_data()
+    if df is None or df.empty:
+        print("⚠️ لا توجد بيانات لجمع اللقطات")
+        return {}
+
+    partitions = partition_market_data(df, cities, property_types)
+    if pairs is not None:
+        wanted = set(pairs)
+        partitions = {pair: frame for pair, frame in partitions.items() if pair in wanted}
+
+    def store(item):
+        (city, property_type), frame = item
+        if frame.empty:
+            print(f"⚠️ لا توجد بيانات لـ {city} - {property_type}")
+            return
+        store_snapshot(frame, city, property_type)
+        print(f"✅ تم حفظ لقطة سوق جديدة: {city} - {property_type}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(store, partitions.items()))
+
+    return partitions
@@ -1,5 +1,6 @@
 import streamlit as st
-from government_data_provider import load_government_data, load_projects_data, load_districts_data
+from data_repository import get_repository
+from numeric_parser import parse_numeric
 
 st.set_page_config(
     page_title="التحليل العقاري الذهبي | Warda Intelligence",
@@ -75,7 +76,9 @@ os.makedirs(PREMIUM_FOLDER, exist_ok=True)
 os.makedirs(LOGS_FOLDER, exist_ok=True)
 
 # ===== تحميل البيانات الحكومية =====
-df_raw = load_government_data(selected_city=None, selected_property_type=None)
+# المستودع المشترك يحمّل الملف مرة واحدة للعملية - إعادة تشغيل الصفحة لا تعيد القراءة
+# (نسخة كسولة: تنظيف أسماء المدن أدناه لا يعدّل جدول المستودع)
+df_raw = get_repository().transactions()
 
 # ===== التحقق من أن البيانات تم تحميلها بشكل صحيح =====
 if df_raw is None or df_raw.empty:
@@ -150,7 +153,8 @@ try:
         format_alert_for_display,
         refresh_alerts,
         get_alerts_stats,
-        update_market_and_check_alerts
+        update_market_and_check_alerts,
+        is_watcher_active
     )
     ALERTS_AVAILABLE = True
     print("✅ نظام التنبيهات الموحد متصل بنجاح")
@@ -180,6 +184,9 @@ except ImportError as e:
     def update_market_and_check_alerts(city, property_type):
         st.error("⚠️ نظام التنبيهات غير متوفر")
         return []
+    
+    def is_watcher_active(max_age_minutes=10):
+        return False
 
 # ===== استيراد الأنظمة المتخصصة =====
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -836,8 +843,8 @@ def generate_advanced_market_data(city, property_type, status, real_data):
     df = real_data.copy()
 
     df = df.dropna(subset=["price", "area"])
-    df["price"] = pd.to_numeric(df["price"], errors="coerce")
-    df["area"] = pd.to_numeric(df["area"], errors="coerce")
+    df["price"] = parse_numeric(df["price"])
+    df["area"] = parse_numeric(df["area"])
     df = df.dropna()
 
     if df.empty:
@@ -925,10 +932,8 @@ if st.button("🚀 تشغيل المصنع الآن", key="factory_simple_btn",
         from district_report_factory import generate_all_district_reports
         st.success("✅ تم استيراد المصنع بنجاح")
         
-        st.write("📌 3. تنظيف المتجر القديم...")
-        if os.path.exists(REPORTS_STORE):
-            shutil.rmtree(REPORTS_STORE)
-            st.write("✅ تم حذف المتجر القديم")
+        # المتجر لا يُحذف: التقارير التي لم تتغير مدخلاتها (بصمة البيانات) تُتخطى تلقائياً
+        st.write("📌 3. التقارير غير المتغيرة ستُتخطى - يُعاد فقط ما تغيرت بياناته")
         
         st.write("📌 4. إنشاء مجلدات جديدة...")
         os.makedirs(METADATA_FOLDER, exist_ok=True)
@@ -951,7 +956,8 @@ if st.button("🚀 تشغيل المصنع الآن", key="factory_simple_btn",
         
         st.write("📌 7. جاري تشغيل المصنع... (قد يستغرق 5-15 دقيقة حسب حجم البيانات)")
         
-        result = generate_all_district_reports(df_sample)
+        # workers=1: بدون عمليات فرعية داخل خادم Streamlit (متعدد الخيوط)
+        result = generate_all_district_reports(df_sample, workers=1)
         
         if result and isinstance(result, tuple) and len(result) >= 1:
             total_reports = result[0]
@@ -1059,7 +1065,9 @@ if page == "📊 التحليل الكامل":
                 else:
                     with st.spinner("جاري جلب بيانات حقيقية وتحليل السوق..."):
                         try:
-                            real_df = load_government_data(
+                            # 🔄 زر التحديث: إعادة تحميل صريحة للصفقات (نسخة جديدة في المستودع)
+                            get_repository().reload("transactions")
+                            real_df = get_repository().transactions(
                                 selected_city=city_select,
                                 selected_property_type=property_type_select
                             )
@@ -1067,10 +1075,14 @@ if page == "📊 التحليل الكامل":
                             if real_df.empty:
                                 st.error(f"❌ لا توجد بيانات للمدينة {city_select}")
                             else:
-                                alerts = update_market_and_check_alerts(
-                                    city_select,
-                                    property_type_select
-                                )
+                                # المراقب (market_watcher) يحسب التنبيهات عند تغير البيانات - نكتفي بقراءتها
+                                if is_watcher_active():
+                                    alerts = get_today_alerts()
+                                else:
+                                    alerts = update_market_and_check_alerts(
+                                        city_select,
+                                        property_type_select
+                                    )
 
                                 st.session_state.daily_alerts = alerts
                                 st.session_state.last_alert_refresh = datetime.now()
@@ -1119,7 +1131,10 @@ if page == "📊 التحليل الكامل":
             if st.button("🔄 تحديث", key="refresh_alerts"):
                 with st.spinner("جاري تحديث السوق..."):
                     try:
-                        alerts = update_market_and_check_alerts(city_select, property_type_select)
+                        if is_watcher_active():
+                            alerts = get_today_alerts()
+                        else:
+                            alerts = update_market_and_check_alerts(city_select, property_type_select)
                         st.session_state.daily_alerts = alerts
                         st.session_state.last_alert_refresh = datetime.now()
                         st.rerun()
@@ -1276,7 +1291,7 @@ if page == "📊 التحليل الكامل":
         if robo_needs_update or "robo_knowledge" not in st.session_state:
             with st.spinner("🧠 تحديث المستشار الذكي..."):
                 try:
-                    real_data = load_government_data(
+                    real_data = get_repository().transactions(
                         selected_city=city,
                         selected_property_type=property_type
                     )
@@ -1487,7 +1502,7 @@ if page == "📊 التحليل الكامل":
         if st.button("🎯 إنشاء التقرير المتقدم (PDF)", key="generate_report", use_container_width=True):
             with st.spinner("🔄 جاري إنشاء التقرير الاحترافي..."):
                 try:
-                    real_data = load_government_data(
+                    real_data = get_repository().transactions(
                         selected_city=city,
                         selected_property_type=property_type
                     )
@@ -1508,11 +1523,11 @@ if page == "📊 التحليل الكامل":
                     # =========================================================
                     district_name = None  # يمكن تعديله إذا كان المستخدم يختار حياً
                     
-                    projects_df = load_projects_data()
+                    projects_df = get_repository().projects()
                     if projects_df is None:
                         projects_df = []  # Fail-safe handling
 
-                    districts_df = load_districts_data()
+                    districts_df = get_repository().districts()
 
                     # استخراج إحداثيات الحي إذا كان موجود
                     district_lat = None